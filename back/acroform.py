@@ -0,0 +1,232 @@
+"""
+Direct filling of fillable (AcroForm) PDFs.
+
+find_fields lists the widgets of a form with a short id, a type and a label:
+the widget's tooltip when it has one, otherwise the words printed next to it
+on the page, so a field called "Text7" is still recognisable as "Surname".
+The model only has to map the user's data onto that list. fill_fields then
+writes the answers into the original widgets, which keeps the layout, fonts
+and every page of the form exactly as they were.
+
+Needs PyMuPDF; without it no PDF is treated as fillable.
+"""
+import asyncio
+import re
+import time
+from tempfile import SpooledTemporaryFile
+from typing import Any, Dict, List, Optional, Union
+
+from back.document_cache import DOCUMENT_CACHE, content_hash
+from back.pdf_rendering import PDF_SPOOL_MAX_BYTES
+
+try:
+    import fitz  # PyMuPDF
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+ACROFORM_STATS: Dict[str, Any] = {
+    "checked": 0,
+    "fillable": 0,
+    "fields": 0,
+    "filled": 0,
+    "detect_ms": 0.0,
+    "fill_ms": 0.0,
+    "cache_hits": 0,
+}
+
+# printed text this far (points) to the left of a widget is taken as its label
+LABEL_REACH = 220.0
+# a length limit is only worth mentioning in the prompt when a real value could hit it
+PROMPT_MAX_LEN = 64
+FIELD_FLAG_READ_ONLY = 1
+TRUTHY = {"1", "true", "yes", "y", "x", "on", "checked"}
+
+_TYPES = {}
+if HAS_PYMUPDF:
+    _TYPES = {
+        fitz.PDF_WIDGET_TYPE_TEXT: "text",
+        fitz.PDF_WIDGET_TYPE_CHECKBOX: "checkbox",
+        fitz.PDF_WIDGET_TYPE_RADIOBUTTON: "radio",
+        fitz.PDF_WIDGET_TYPE_COMBOBOX: "choice",
+        fitz.PDF_WIDGET_TYPE_LISTBOX: "choice",
+    }
+
+
+def _open(data: Union[bytes, memoryview]) -> "fitz.Document":
+    return fitz.open(stream=data, filetype="pdf")
+
+
+def _clean_name(name: str) -> str:
+    # "topmostSubform[0].Page1[0].Surname_1[0]" -> "Surname 1"
+    last = re.sub(r"\[\d+\]", "", name).split(".")[-1]
+    return " ".join(last.replace("_", " ").split())
+
+
+def _printed_label(words: List[tuple], rect: "fitz.Rect") -> str:
+    """Words on the widget's line just left of it, else the line right above it."""
+    middle = (rect.y0 + rect.y1) / 2
+    left = [w for w in words if w[1] <= middle <= w[3] and rect.x0 - LABEL_REACH <= w[0] and w[2] <= rect.x0 + 2]
+    if not left:
+        left = [
+            w for w in words
+            if rect.y0 - 16 <= w[3] <= rect.y0 + 2 and w[0] < rect.x1 and w[2] > rect.x0 - 20
+        ]
+    return " ".join(w[4] for w in sorted(left, key=lambda w: (round(w[1]), w[0])))
+
+
+def _choices(widget) -> List[str]:
+    # entries are either "value" or ["export value", "display text"]
+    return [c[0] if isinstance(c, (list, tuple)) else c for c in widget.choice_values or []]
+
+
+def find_fields(data: Union[bytes, memoryview]) -> Dict[str, Any]:
+    """
+    The fillable fields of a PDF.
+
+    Returns {"fields": [{"id", "name", "type", "label", "page", "options",
+    "max_len"}], "total_pages", "ms"}. Read-only, push-button and signature
+    widgets are left out; the buttons of a radio group become one field.
+    """
+    start = time.perf_counter()
+    fields: Dict[str, Dict[str, Any]] = {}
+    with _open(data) as doc:
+        total = doc.page_count
+        if doc.is_form_pdf:
+            for page in doc:
+                words = None
+                for widget in page.widgets():
+                    kind = _TYPES.get(widget.field_type)
+                    if kind is None or widget.field_flags & FIELD_FLAG_READ_ONLY or not widget.field_name:
+                        continue
+                    field = fields.get(widget.field_name)
+                    if field is None:
+                        if words is None:
+                            words = page.get_text("words")
+                        label = (widget.field_label or "").strip() or _printed_label(words, widget.rect).rstrip(":")
+                        field = fields[widget.field_name] = {
+                            "id": f"f{len(fields) + 1}",
+                            "name": widget.field_name,
+                            "type": kind,
+                            "label": label or _clean_name(widget.field_name),
+                            "page": page.number,
+                            "options": [],
+                            "max_len": widget.text_maxlen or 0,
+                        }
+                    if kind == "choice":
+                        field["options"] = _choices(widget)
+                    elif kind in ("radio", "checkbox"):
+                        state = widget.on_state()
+                        if state and state not in field["options"]:
+                            field["options"].append(state)
+    return {"fields": list(fields.values()), "total_pages": total, "ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+def prompt_fields(fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The compact description of the fields that goes into the prompt."""
+    compact = []
+    for field in fields:
+        item: Dict[str, Any] = {"id": field["id"], "label": field["label"]}
+        if field["type"] != "text":
+            item["type"] = field["type"]
+        if field["type"] in ("radio", "choice") and field["options"]:
+            item["options"] = field["options"]
+        if 0 < field["max_len"] <= PROMPT_MAX_LEN:
+            item["max_len"] = field["max_len"]
+        compact.append(item)
+    return compact
+
+
+def _matching(options: List[str], value: str) -> Optional[str]:
+    wanted = value.strip().lower()
+    for option in options:
+        if option.strip().lower() == wanted:
+            return option
+    return None
+
+
+def fill_fields(data: Union[bytes, memoryview], fields: List[Dict[str, Any]], values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write `values` ({field id: value}) into the form's widgets.
+
+    Returns {"pdf" (a SpooledTemporaryFile, rewound), "filled" (ids), "ms"}.
+    Values that don't fit a field (an unknown option, an empty string) are
+    skipped, so the field stays as it was.
+    """
+    start = time.perf_counter()
+    by_name = {field["name"]: field for field in fields if values.get(field["id"]) not in (None, "")}
+    filled = set()
+    with _open(data) as doc:
+        for page in doc:
+            for widget in page.widgets():
+                field = by_name.get(widget.field_name)
+                if field is None or widget.field_flags & FIELD_FLAG_READ_ONLY:
+                    continue
+                value = values[field["id"]]
+                kind = _TYPES.get(widget.field_type)
+                if kind == "text":
+                    text = str(value).strip()
+                    widget.field_value = text[: field["max_len"]] if field["max_len"] else text
+                elif kind == "checkbox":
+                    on = widget.on_state() or "Yes"
+                    if value is not True and str(value).strip().lower() not in TRUTHY | {on.lower()}:
+                        continue
+                    widget.field_value = on
+                elif kind == "radio":
+                    # every button of the group is visited; only the chosen one is switched on
+                    if _matching([widget.on_state() or ""], str(value)) is None:
+                        continue
+                    widget.field_value = True
+                elif kind == "choice":
+                    option = _matching(field["options"], str(value))
+                    if option is None:
+                        continue
+                    widget.field_value = option
+                else:
+                    continue
+                widget.update()
+                filled.add(field["id"])
+
+        data = doc.tobytes(garbage=1, deflate=True)
+    pdf = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+    pdf.write(data)
+    pdf.seek(0)
+    return {"pdf": pdf, "filled": sorted(filled, key=lambda i: int(i[1:])), "ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+async def detect_form_fields(source: Union[bytes, memoryview], digest: Optional[str] = None) -> Dict[str, Any]:
+    """find_fields off the event loop, cached by content (forms without fields too)."""
+    if not HAS_PYMUPDF:
+        return {"fields": [], "total_pages": 0, "ms": 0.0, "cached": False}
+    key = f"{digest or content_hash(source)}:acroform"
+    cached = DOCUMENT_CACHE.get(key)
+    if cached is not None:
+        ACROFORM_STATS["cache_hits"] += 1
+        return dict(cached, cached=True)
+
+    result = await asyncio.get_running_loop().run_in_executor(None, find_fields, source)
+    ACROFORM_STATS["checked"] += 1
+    ACROFORM_STATS["detect_ms"] += result["ms"]
+    DOCUMENT_CACHE.set(key, result)
+    return dict(result, cached=False)
+
+
+async def fill_form_fields(
+    source: Union[bytes, memoryview], fields: List[Dict[str, Any]], values: Dict[str, Any]
+) -> Dict[str, Any]:
+    """fill_fields off the event loop."""
+    result = await asyncio.get_running_loop().run_in_executor(None, fill_fields, source, fields, values)
+    ACROFORM_STATS["fillable"] += 1
+    ACROFORM_STATS["fields"] += len(fields)
+    ACROFORM_STATS["filled"] += len(result["filled"])
+    ACROFORM_STATS["fill_ms"] += result["ms"]
+    return result
+
+
+def acroform_stats() -> Dict[str, Any]:
+    return {
+        **ACROFORM_STATS,
+        "detect_ms": round(ACROFORM_STATS["detect_ms"], 1),
+        "fill_ms": round(ACROFORM_STATS["fill_ms"], 1),
+        "pymupdf": HAS_PYMUPDF,
+    }
@@ -0,0 +1,151 @@
+import asyncio
+import math
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Dict, List
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+load_dotenv()
+
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "64"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+# Share of a model's slots one request may hold with its own parallel calls
+# (batch translation chunks and the like), so it never queues behind itself.
+LLM_FAN_OUT_SHARE = float(os.getenv("LLM_FAN_OUT_SHARE", "0.25"))
+
+
+class Overloaded(HTTPException):
+    """Raised instead of queueing forever; FastAPI turns it into 429/503 + Retry-After."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+def _model_setting(name: str, model: str, default: float) -> float:
+    suffix = re.sub(r"[^A-Z0-9]+", "_", model.upper()).strip("_")
+    raw = os.getenv(f"{name}_{suffix}")
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+class ModelGate:
+    """Per-model concurrency limit with a bounded, deadline-limited wait queue."""
+
+    def __init__(self, model: str, concurrency: int, queue_size: int, queue_timeout: float):
+        self.model = model
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._sem = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.service_avg = 0.0
+
+    def retry_after(self) -> int:
+        per_slot = self.service_avg or 1.0
+        return max(1, min(60, math.ceil(per_slot * (self.waiting + 1) / self.concurrency)))
+
+    async def acquire(self) -> None:
+        start = time.perf_counter()
+        if not self._sem.locked():
+            # a free slot is taken without suspending, so bursts can't all pile into the queue
+            await self._sem.acquire()
+        elif self.waiting >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise Overloaded(429, f"Too many requests for {self.model}, please retry later.", self.retry_after())
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise Overloaded(503, f"{self.model} is overloaded, please retry later.", self.retry_after())
+            finally:
+                self.waiting -= 1
+        waited = time.perf_counter() - start
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.admitted += 1
+        self.in_flight += 1
+
+    def release(self, service_time: float) -> None:
+        self.in_flight -= 1
+        self._sem.release()
+        # exponential moving average is enough for Retry-After hints
+        self.service_avg = service_time if not self.service_avg else 0.9 * self.service_avg + 0.1 * service_time
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_ms_avg": round(self.wait_total / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "wait_ms_max": round(self.wait_max * 1000, 1),
+            "service_ms_avg": round(self.service_avg * 1000, 1),
+        }
+
+
+GATES: Dict[str, ModelGate] = {}
+
+
+def gate_for(model: str) -> ModelGate:
+    gate = GATES.get(model)
+    if gate is None:
+        gate = GATES[model] = ModelGate(
+            model,
+            concurrency=int(_model_setting("LLM_CONCURRENCY", model, LLM_CONCURRENCY)),
+            queue_size=int(_model_setting("LLM_QUEUE_SIZE", model, LLM_QUEUE_SIZE)),
+            queue_timeout=_model_setting("LLM_QUEUE_TIMEOUT", model, LLM_QUEUE_TIMEOUT),
+        )
+    return gate
+
+
+@asynccontextmanager
+async def admit(model: str):
+    gate = gate_for(model or "default")
+    await gate.acquire()
+    start = time.perf_counter()
+    try:
+        yield gate
+    finally:
+        gate.release(time.perf_counter() - start)
+
+
+def fan_out_slots(model: str) -> asyncio.Semaphore:
+    """
+    Bound for the calls one request makes to `model` in parallel.
+
+    The gate counts calls, not requests: a request that fires more calls than
+    the gate's slots plus queue rejects itself with a 429 on an idle server.
+    Share the returned semaphore across all of the request's calls.
+    """
+    gate = gate_for(model)
+    return asyncio.Semaphore(max(1, math.floor(gate.concurrency * LLM_FAN_OUT_SHARE)))
+
+
+async def gather_or_cancel(*aws: Awaitable[Any]) -> List[Any]:
+    """asyncio.gather that cancels the other awaitables as soon as one fails."""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -2,21 +2,20 @@ import os
 import json
 import base64
 import logging
-import io
-from typing import List, Optional, Tuple
+from urllib.parse import quote
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import Response
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from openai import OpenAI
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import PyPDF2
+
+from back.acroform import detect_form_fields, fill_form_fields, prompt_fields
+from back.document_cache import detect_mime
+from back.document_extraction import extract_pdf_text, normalize_image, rasterize_pdf
+from back.template_registry import compose_filled_text, get_registry as get_template_registry
+from back.uploads import UPLOAD_MAX_FORM_BYTES, ingest_upload
+from back.llm_gateway import chat_completion
+from back.pdf_rendering import pdf_response, pdf_size, render_form
 
 # Try to import PyMuPDF for PDF to image conversion
 try:
@@ -27,7 +26,6 @@ except ImportError:
     # Logger will be initialized later, so we'll log this after logger setup
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 router = APIRouter(prefix="/api", tags=["banking"])
 logger = logging.getLogger("fill_form")
@@ -49,91 +47,23 @@ if not api_key_present:
 else:
     logger.info("OPENAI_API_KEY detected in environment")
 
+# form templates are a few pages; anything past this is appendix text the model doesn't need
+FORM_TEMPLATE_MAX_TOKENS = int(os.getenv("FORM_TEMPLATE_MAX_TOKENS", "8000"))
+# fillable PDF templates get their widgets filled in place instead of a re-rendered text version
+ACROFORM_FAST_PATH = os.getenv("ACROFORM_FAST_PATH", "1") != "0"
+
 
 class FillFormResponse(BaseModel):
     filled_text: str
     missing_fields: List[str] = []
     notes: Optional[str] = None
+    # labels of the blank form's fields, when asked for (see template_registry)
+    form_fields: List[str] = []
 
 
-def create_pdf_from_text(text: str, original_filename: str = "form.pdf") -> io.BytesIO:
-    """Create a PDF file from filled form text."""
-    buffer = io.BytesIO()
-    
-    fonts_dir = os.path.join(os.path.dirname(__file__), "fonts")
-    regular_path = os.path.join(fonts_dir, "NotoSans-Regular.ttf")
-    bold_path = os.path.join(fonts_dir, "NotoSans-Bold.ttf")
-    
-    # Register fonts if not already registered
-    registered = pdfmetrics.getRegisteredFontNames()
-    if "NotoSans" not in registered and os.path.exists(regular_path):
-        pdfmetrics.registerFont(TTFont("NotoSans", regular_path))
-    if "NotoSans-Bold" not in registered and os.path.exists(bold_path):
-        pdfmetrics.registerFont(TTFont("NotoSans-Bold", bold_path))
-    
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=40,
-        rightMargin=40,
-        topMargin=40,
-        bottomMargin=40,
-    )
-    
-    styles = getSampleStyleSheet()
-    
-    # Use registered font if available, otherwise use default
-    font_name = "NotoSans" if "NotoSans" in pdfmetrics.getRegisteredFontNames() else "Helvetica"
-    bold_font_name = "NotoSans-Bold" if "NotoSans-Bold" in pdfmetrics.getRegisteredFontNames() else "Helvetica-Bold"
-    
-    normal_style = ParagraphStyle(
-        "NormalText",
-        parent=styles["Normal"],
-        fontName=font_name,
-        fontSize=11,
-        leading=14,
-        spaceAfter=6,
-        alignment=TA_LEFT,
-    )
-    
-    story = []
-    
-    # Split text into lines and create paragraphs
-    lines = text.split('\n')
-    for line in lines:
-        line = line.strip()
-        if not line:
-            story.append(Spacer(1, 6))
-        else:
-            # Preserve formatting - check for bold markers or special formatting
-            if line.startswith('# '):
-                # Heading
-                heading_style = ParagraphStyle(
-                    "Heading",
-                    parent=normal_style,
-                    fontName=bold_font_name,
-                    fontSize=14,
-                    spaceAfter=8,
-                    spaceBefore=12,
-                )
-                story.append(Paragraph(line[2:].strip(), heading_style))
-            elif line.startswith('## '):
-                # Subheading
-                subheading_style = ParagraphStyle(
-                    "Subheading",
-                    parent=normal_style,
-                    fontName=bold_font_name,
-                    fontSize=12,
-                    spaceAfter=6,
-                    spaceBefore=8,
-                )
-                story.append(Paragraph(line[3:].strip(), subheading_style))
-            else:
-                story.append(Paragraph(line, normal_style))
-    
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+class FillFieldsResponse(BaseModel):
+    values: Dict[str, Any] = {}
+    notes: Optional[str] = None
 
 
 def _truncate_for_log(text: str, length: int = 400) -> str:
@@ -145,36 +75,18 @@ def _truncate_for_log(text: str, length: int = 400) -> str:
     return text[: length - 3] + "..."
 
 
-def _pdf_to_image(pdf_bytes: bytes) -> Tuple[bytes, str]:
-    """Convert first page of PDF to PNG image."""
+async def _pdf_to_images(pdf_bytes: Union[bytes, memoryview], digest: str) -> Tuple[List[bytes], str]:
+    """Render the form's first non-blank pages to compact images (see back.rasterize)."""
     if not HAS_PYMUPDF:
         raise HTTPException(
             status_code=500,
             detail="PDF to image conversion requires PyMuPDF library. Please install it: pip install PyMuPDF"
         )
-    
+
     try:
-        # Open PDF from bytes
-        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-        
-        if len(pdf_document) == 0:
-            raise ValueError("PDF has no pages")
-        
-        # Get first page
-        page = pdf_document[0]
-        
-        # Render page to image (PNG) with high DPI for better quality
-        mat = fitz.Matrix(2.0, 2.0)  # 2x zoom for better quality
-        pix = page.get_pixmap(matrix=mat)
-        
-        # Convert to PNG bytes
-        img_bytes = pix.tobytes("png")
-        
-        pdf_document.close()
-        
-        logger.info(f"Converted PDF page to image. Image size: {len(img_bytes)} bytes")
-        return img_bytes, "image/png"
-        
+        result = await rasterize_pdf(pdf_bytes, digest=digest)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Failed to convert PDF to image")
         raise HTTPException(
@@ -182,6 +94,51 @@ def _pdf_to_image(pdf_bytes: bytes) -> Tuple[bytes, str]:
             detail=f"Failed to convert PDF to image: {str(e)}"
         )
 
+    images = result["images"]
+    for image in images:
+        logger.info(
+            "Rendered PDF page %s: %sx%s at %s dpi, %s bytes, %s ms, cropped=%s cached=%s",
+            image["page"],
+            image["width"],
+            image["height"],
+            image["dpi"],
+            image["bytes"],
+            image["ms"],
+            image["cropped"],
+            result["cached"],
+        )
+    return [image["data"] for image in images], images[0]["mime"]
+
+
+async def _prepare_image(
+    image_bytes: Union[bytes, memoryview], mime: str, digest: str, label: str
+) -> Tuple[bytes, str]:
+    """Upright, downscaled, metadata-free copy of an uploaded image (see back.image_normalization)."""
+    try:
+        result = await normalize_image(image_bytes, mime, digest=digest)
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Vision may still manage formats Pillow can't open, so send those as uploaded
+        logger.warning("Could not normalize %s image, sending it unchanged: %s", label, e)
+        return bytes(image_bytes), mime
+
+    logger.info(
+        "Normalized %s image: %s -> %s bytes (%.0f%% smaller), %sx%s -> %sx%s, rotated=%s, %s ms, cached=%s",
+        label,
+        result["original_bytes"],
+        result["bytes"],
+        (1 - result["bytes"] / result["original_bytes"]) * 100 if result["original_bytes"] else 0.0,
+        result.get("original_width"),
+        result.get("original_height"),
+        result.get("width"),
+        result.get("height"),
+        result.get("rotated"),
+        result.get("ms"),
+        result["cached"],
+    )
+    return result["data"], result["mime"]
+
 
 def _normalize_image_mime(mime: Optional[str]) -> str:
     """Normalize image MIME type for OpenAI Vision API compatibility."""
@@ -220,16 +177,17 @@ def _normalize_image_mime(mime: Optional[str]) -> str:
     return "image/png"
 
 
-def ask_ai_to_fill_form(
+async def ask_ai_to_fill_form(
     template_text: Optional[str],
     user_document_text: Optional[str],
-    template_image_b64: Optional[str],
+    template_images_b64: List[str],
     user_image_b64: Optional[str],
     template_mime: Optional[str],
     user_mime: Optional[str],
     language: str,
+    want_fields: bool = False,
 ) -> FillFormResponse:
-    use_images = bool(template_image_b64 or user_image_b64)
+    use_images = bool(template_images_b64 or user_image_b64)
 
     logger.info(
         "ask_ai_to_fill_form called. use_images=%s template_text_len=%s user_text_len=%s",
@@ -239,11 +197,12 @@ def ask_ai_to_fill_form(
     )
     logger.info("Template text preview: %s", _truncate_for_log(template_text))
     logger.info("User document text preview: %s", _truncate_for_log(user_document_text))
-    if template_image_b64:
+    if template_images_b64:
         logger.info(
-            "Template image present. mime=%s base64_len=%s",
+            "Template image present. mime=%s pages=%s base64_len=%s",
             template_mime,
-            len(template_image_b64),
+            len(template_images_b64),
+            sum(len(img) for img in template_images_b64),
         )
     if user_image_b64:
         logger.info(
@@ -268,17 +227,26 @@ def ask_ai_to_fill_form(
         "- Keep the language of the template itself unchanged (do not translate field names or labels)."
     )
 
+    # on a template's first use the field labels are collected for the registry (see template_registry)
+    form_fields_spec = ',\n  "form_fields": [string, ...]' if want_fields else ""
+    form_fields_rule = (
+        "- form_fields lists the exact labels of ALL fields of the blank form that a person fills in, "
+        "in the order they appear, copied from the template without translating them.\n"
+        if want_fields
+        else ""
+    )
     json_spec_text = (
         "Return a single JSON object with this structure:\n"
         "{\n"
         '  "filled_text": string,\n'
         '  "missing_fields": [string, ...],\n'
-        '  "notes": string\n'
+        f'  "notes": string{form_fields_spec}\n'
         "}\n\n"
         "Where:\n"
         "- filled_text is the template form fully filled with user data where possible.\n"
         "- missing_fields is a list of human-readable field names or labels that could not be filled from the user document.\n"
-        "- notes is a short explanation for the user about any uncertainties or assumptions.\n\n"
+        "- notes is a short explanation for the user about any uncertainties or assumptions.\n"
+        f"{form_fields_rule}\n"
         f"User interface language for notes and missing_fields: {language}.\n"
         "Use this language for notes and missing_fields descriptions, but keep template labels in their original language.\n\n"
     )
@@ -296,7 +264,7 @@ def ask_ai_to_fill_form(
             "Now output only the JSON object."
         )
         try:
-            resp = client.chat.completions.create(
+            resp = await chat_completion(
                 model="gpt-4o-mini",
                 response_format={"type": "json_object"},
                 messages=[
@@ -305,6 +273,8 @@ def ask_ai_to_fill_form(
                 ],
                 temperature=0.1,
             )
+        except HTTPException:
+            raise
         except Exception as e:
             logger.exception("AI request failed in text-only mode")
             raise HTTPException(status_code=500, detail=f"AI request failed: {e}")
@@ -315,27 +285,29 @@ def ask_ai_to_fill_form(
 
         user_content.append({"type": "text", "text": json_spec_text})
 
-        if template_image_b64:
+        if template_images_b64:
             try:
                 mime = _normalize_image_mime(template_mime)
                 logger.info("Adding template image to prompt. original_mime=%s normalized_mime=%s", template_mime, mime)
             except ValueError as e:
                 logger.error("Invalid MIME type for template image: %s", e)
                 raise HTTPException(status_code=400, detail=str(e))
+            pages_note = f" ({len(template_images_b64)} pages, in order)" if len(template_images_b64) > 1 else ""
             user_content.append(
                 {
                     "type": "text",
-                    "text": "BLANK FORM TEMPLATE (image below). Carefully read and identify all fields in this form:",
-                }
-            )
-            user_content.append(
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:{mime};base64,{template_image_b64}",
-                    },
+                    "text": f"BLANK FORM TEMPLATE (image below{pages_note}). Carefully read and identify all fields in this form:",
                 }
             )
+            for image_b64 in template_images_b64:
+                user_content.append(
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{mime};base64,{image_b64}",
+                        },
+                    }
+                )
         elif template_text:
             logger.info("Template provided as text only in multimodal mode")
             user_content.append(
@@ -345,7 +317,7 @@ def ask_ai_to_fill_form(
                 }
             )
         else:
-            logger.warning("No template_text or template_image_b64 provided")
+            logger.warning("No template_text or template_images_b64 provided")
 
         if user_image_b64:
             try:
@@ -387,7 +359,7 @@ def ask_ai_to_fill_form(
         )
 
         try:
-            resp = client.chat.completions.create(
+            resp = await chat_completion(
                 model="gpt-4o-mini",
                 response_format={"type": "json_object"},
                 messages=[
@@ -396,6 +368,8 @@ def ask_ai_to_fill_form(
                 ],
                 temperature=0.1,
             )
+        except HTTPException:
+            raise
         except Exception as e:
             logger.exception("AI request failed in multimodal mode")
             raise HTTPException(status_code=500, detail=f"AI request failed: {e}")
@@ -437,10 +411,174 @@ def ask_ai_to_fill_form(
         len(notes) if notes else 0,
     )
 
+    form_fields = data.get("form_fields") if want_fields else None
+    if not isinstance(form_fields, list):
+        form_fields = []
+
     return FillFormResponse(
         filled_text=filled_text,
         missing_fields=missing_fields,
         notes=notes,
+        form_fields=[str(label) for label in form_fields if label],
+    )
+
+
+async def ask_ai_to_fill_fields(
+    fields: List[Dict[str, Any]],
+    user_document_text: Optional[str],
+    user_image_b64: Optional[str],
+    user_mime: Optional[str],
+    language: str,
+) -> FillFieldsResponse:
+    """Map the user's document onto the fields of a known form: one model call, field list only."""
+    system_prompt = (
+        "You are an assistant that fills in the fields of a form from the user's personal document "
+        "(passport, ID, residence card, etc.). "
+        "You get the form's fields as a JSON list of {id, label, type, options, max_len} and the user document "
+        "as text or as an image.\n"
+        "- Give a value only for fields whose data is clearly present in the user document; never invent or guess.\n"
+        "- Text fields (no type): the value as it should be written into the form, at most max_len characters.\n"
+        "- checkbox: true to tick it.\n"
+        "- radio and choice: exactly one of the listed options.\n"
+        "- Leave out fields you cannot fill."
+    )
+    json_spec_text = (
+        "Return a single JSON object with this structure:\n"
+        '{"values": {field id: value, ...}, "notes": string}\n'
+        "where notes is a short explanation for the user about any uncertainties or assumptions, "
+        f"written in this language: {language}.\n\n"
+    )
+    compact = json.dumps(prompt_fields(fields), ensure_ascii=False, separators=(",", ":"))
+    user_content: List[Dict[str, Any]] = [{"type": "text", "text": json_spec_text + "FORM FIELDS:\n" + compact}]
+    if user_image_b64:
+        try:
+            mime = _normalize_image_mime(user_mime)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"User document file: {str(e)}")
+        user_content.append({"type": "text", "text": "\nUSER DOCUMENT (image below):"})
+        user_content.append({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{user_image_b64}"}})
+    else:
+        user_content.append({"type": "text", "text": "\nUSER DOCUMENT (text):\n--------------\n" + (user_document_text or "")})
+    user_content.append({"type": "text", "text": "\nNow output only the JSON object."})
+
+    logger.info(
+        "ask_ai_to_fill_fields called. fields=%s prompt_fields_len=%s user_text_len=%s user_image=%s",
+        len(fields),
+        len(compact),
+        len(user_document_text) if user_document_text else 0,
+        bool(user_image_b64),
+    )
+    try:
+        resp = await chat_completion(
+            model="gpt-4o-mini",
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+            temperature=0.1,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("AI request failed for form fields")
+        raise HTTPException(status_code=500, detail=f"AI request failed: {e}")
+
+    content = resp.choices[0].message.content
+    logger.info("Raw AI response (truncated): %s", _truncate_for_log(content, 600))
+    try:
+        data = json.loads(content)
+    except Exception as e:
+        logger.exception("Failed to parse AI JSON")
+        raise HTTPException(status_code=500, detail=f"AI returned invalid JSON: {e}")
+
+    values = data.get("values")
+    if not isinstance(values, dict):
+        logger.warning("values is not an object, value_type=%s", type(values))
+        values = {}
+    notes = data.get("notes")
+    return FillFieldsResponse(values=values, notes=str(notes).strip() if notes is not None else None)
+
+
+def _filled_filename(template_filename: str) -> str:
+    return template_filename.rsplit(".", 1)[0] + "_filled.pdf"
+
+
+def _notes_header(notes: Optional[str]) -> str:
+    # header values must be Latin-1 and notes come back in the user's language;
+    # the page decodes them with decodeURIComponent
+    return quote(notes or "", safe=" ,.:;!?()'/")
+
+
+async def _fill_acroform(
+    template_bytes: Union[bytes, memoryview],
+    template_filename: str,
+    fields: List[Dict[str, Any]],
+    user_document_text: Optional[str],
+    user_image_b64: Optional[str],
+    user_mime: Optional[str],
+    language: str,
+):
+    result = await ask_ai_to_fill_fields(fields, user_document_text, user_image_b64, user_mime, language)
+    try:
+        filled = await fill_form_fields(template_bytes, fields, result.values)
+    except Exception as e:
+        logger.exception("Failed to fill PDF form fields")
+        raise HTTPException(status_code=500, detail=f"Failed to fill PDF form: {e}")
+
+    filled_ids = set(filled["filled"])
+    missing_fields = [field["label"] for field in fields if field["id"] not in filled_ids]
+    logger.info(
+        "Filled PDF form fields in place. fields=%s filled=%s missing=%s fill_ms=%s",
+        len(fields),
+        len(filled_ids),
+        len(missing_fields),
+        filled["ms"],
+    )
+    return pdf_response(
+        filled["pdf"],
+        _filled_filename(template_filename),
+        headers={
+            "X-Missing-Fields": json.dumps(missing_fields),
+            "X-Notes": _notes_header(result.notes),
+            "X-Fill-Mode": "acroform",
+        },
+    )
+
+
+async def _fill_known_form(
+    record: Dict[str, Any],
+    template_filename: str,
+    user_document_text: Optional[str],
+    user_image_b64: Optional[str],
+    user_mime: Optional[str],
+    language: str,
+):
+    """A registered template whose field labels are known: fill the list, write it into the template text."""
+    fields = record["fields"]
+    result = await ask_ai_to_fill_fields(fields, user_document_text, user_image_b64, user_mime, language)
+    filled_text, filled_ids = compose_filled_text(record["text"], fields, result.values)
+    filled = set(filled_ids)
+    missing_fields = [field["label"] for field in fields if field["id"] not in filled]
+    logger.info(
+        "Filled known template from its field list. fields=%s filled=%s missing=%s",
+        len(fields),
+        len(filled),
+        len(missing_fields),
+    )
+    try:
+        pdf_file = await render_form(filled_text)
+    except Exception as e:
+        logger.exception("Failed to create PDF")
+        raise HTTPException(status_code=500, detail=f"Failed to create PDF: {e}")
+    return pdf_response(
+        pdf_file,
+        _filled_filename(template_filename),
+        headers={
+            "X-Missing-Fields": json.dumps(missing_fields),
+            "X-Notes": _notes_header(result.notes),
+            "X-Fill-Mode": "schema",
+        },
     )
 
 
@@ -466,16 +604,16 @@ async def fill_form(
         user_content_type,
     )
 
-    template_bytes = await template_file.read()
-    user_bytes = await user_document_file.read()
-    
-    # Check if template is PDF
-    template_is_pdf = template_content_type == "application/pdf" or template_filename.lower().endswith(".pdf")
+    # Streamed and hashed in chunks; the views below share the spooled upload buffers
+    template_upload = await ingest_upload(template_file, UPLOAD_MAX_FORM_BYTES)
+    user_upload = await ingest_upload(user_document_file, UPLOAD_MAX_FORM_BYTES)
+    template_bytes = template_upload.view()
+    user_bytes = user_upload.view()
 
     logger.info(
         "Read files from request. template_size=%s user_size=%s",
-        len(template_bytes) if template_bytes else 0,
-        len(user_bytes) if user_bytes else 0,
+        template_upload.size,
+        user_upload.size,
     )
 
     if not template_bytes:
@@ -485,6 +623,20 @@ async def fill_form(
         logger.warning("user_document_file is empty")
         raise HTTPException(status_code=400, detail="user_document_file is required and must not be empty")
 
+    # Content-addressed: a re-upload of the same template skips sniffing, parsing and rendering
+    template_digest = template_upload.digest
+    user_digest = user_upload.digest
+    template_content_type = detect_mime(template_bytes, template_filename, template_content_type, template_digest)
+    user_content_type = detect_mime(user_bytes, user_document_file.filename or "", user_content_type, user_digest)
+    logger.info(
+        "Detected content types: template=%s user=%s template_sha256=%s",
+        template_content_type,
+        user_content_type,
+        template_digest[:12],
+    )
+
+    # Check if template is PDF
+    template_is_pdf = template_content_type == "application/pdf" or template_filename.lower().endswith(".pdf")
     template_is_image = template_content_type.startswith("image/") and not template_is_pdf
     user_is_image = user_content_type.startswith("image/")
 
@@ -495,34 +647,75 @@ async def fill_form(
         user_is_image,
     )
 
+    # a template seen before is not parsed again (see template_registry)
+    registry = get_template_registry()
+    template_record = registry.lookup(template_digest)
+    if template_record is not None and template_record["kind"] == "acroform" and not ACROFORM_FAST_PATH:
+        template_record = None  # only its widgets were kept; parse it the slow way
+
+    # fillable PDFs skip text extraction and rendering: the model fills their widgets directly
+    acroform_fields: List[Dict[str, Any]] = []
+    if template_record is not None:
+        logger.info(
+            "Known template. kind=%s fields=%s text_len=%s images=%s",
+            template_record["kind"],
+            len(template_record["fields"]),
+            len(template_record["text"] or ""),
+            len(template_record["images"]),
+        )
+        if template_record["kind"] == "acroform":
+            acroform_fields = template_record["fields"]
+    elif template_is_pdf and ACROFORM_FAST_PATH:
+        try:
+            detected = await detect_form_fields(template_bytes, template_digest)
+            acroform_fields = detected["fields"]
+            logger.info(
+                "AcroForm check: fields=%s pages=%s ms=%s cached=%s",
+                len(acroform_fields),
+                detected["total_pages"],
+                detected["ms"],
+                detected["cached"],
+            )
+        except Exception as e:
+            logger.warning("Could not read form fields, using the template text instead: %s", e)
+
     template_text: Optional[str] = None
     user_document_text: Optional[str] = None
-    template_image_b64: Optional[str] = None
+    # one image, or one per rendered page of a PDF template
+    template_images_b64: List[str] = []
     user_image_b64: Optional[str] = None
 
+    if template_record is not None:
+        template_text = template_record["text"]
+        template_images_b64 = template_record["images"]
+        if template_images_b64:
+            template_content_type = template_record["mime"]
+            template_is_image = True
+    elif acroform_fields:
+        logger.info("Template is a fillable PDF, skipping text extraction")
     # Handle PDF template
-    if template_is_pdf:
+    elif template_is_pdf:
         try:
             # Try to extract text from PDF
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(template_bytes))
-            template_text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    template_text += page_text + "\n"
-            template_text = template_text.strip()
+            template_text = (
+                await extract_pdf_text(template_bytes, digest=template_digest, max_tokens=FORM_TEMPLATE_MAX_TOKENS)
+            ).strip()
             
             if not template_text:
                 # If no text extracted, convert PDF to image
                 logger.info("No text extracted from PDF, converting first page to image")
                 try:
-                    img_bytes, img_mime = _pdf_to_image(template_bytes)
-                    template_image_b64 = base64.b64encode(img_bytes).decode("utf-8")
+                    page_images, img_mime = await _pdf_to_images(template_bytes, template_digest)
+                    template_images_b64 = [base64.b64encode(img).decode("utf-8") for img in page_images]
                     template_text = None
                     # Update content type to image for proper handling
                     template_content_type = img_mime
                     template_is_image = True
-                    logger.info("PDF converted to image successfully. image_size=%s", len(img_bytes))
+                    logger.info(
+                        "PDF converted to images successfully. pages=%s image_size=%s",
+                        len(page_images),
+                        sum(len(img) for img in page_images),
+                    )
                 except HTTPException:
                     raise
                 except Exception as e:
@@ -540,34 +733,42 @@ async def fill_form(
             # Try to convert to image as fallback
             logger.info("Attempting to convert PDF to image as fallback")
             try:
-                img_bytes, img_mime = _pdf_to_image(template_bytes)
-                template_image_b64 = base64.b64encode(img_bytes).decode("utf-8")
+                page_images, img_mime = await _pdf_to_images(template_bytes, template_digest)
+                template_images_b64 = [base64.b64encode(img).decode("utf-8") for img in page_images]
                 template_text = None
                 template_content_type = img_mime
                 template_is_image = True
-                logger.info("PDF converted to image as fallback. image_size=%s", len(img_bytes))
+                logger.info(
+                    "PDF converted to images as fallback. pages=%s image_size=%s",
+                    len(page_images),
+                    sum(len(img) for img in page_images),
+                )
             except Exception as img_error:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Failed to process PDF file: {str(e)}. Also failed to convert to image: {str(img_error)}"
                 )
     elif template_is_image:
-        template_image_b64 = base64.b64encode(template_bytes).decode("utf-8")
+        img_bytes, template_content_type = await _prepare_image(
+            template_bytes, template_content_type, template_digest, "template"
+        )
+        template_images_b64 = [base64.b64encode(img_bytes).decode("utf-8")]
         logger.info(
             "Template treated as image. mime=%s base64_len=%s",
             template_content_type,
-            len(template_image_b64),
+            len(template_images_b64[0]),
         )
     else:
         try:
-            template_text = template_bytes.decode("utf-8", errors="ignore").strip()
+            template_text = str(template_bytes, "utf-8", errors="ignore").strip()
         except Exception as e:
             logger.exception("Failed to decode template_file as UTF-8")
             raise HTTPException(status_code=400, detail=f"Could not decode template file: {e}")
         logger.info("Template decoded as text. text_len=%s preview=%s", len(template_text), _truncate_for_log(template_text))
 
     if user_is_image:
-        user_image_b64 = base64.b64encode(user_bytes).decode("utf-8")
+        img_bytes, user_content_type = await _prepare_image(user_bytes, user_content_type, user_digest, "user document")
+        user_image_b64 = base64.b64encode(img_bytes).decode("utf-8")
         logger.info(
             "User document treated as image. mime=%s base64_len=%s",
             user_content_type,
@@ -575,7 +776,7 @@ async def fill_form(
         )
     else:
         try:
-            user_document_text = user_bytes.decode("utf-8", errors="ignore").strip()
+            user_document_text = str(user_bytes, "utf-8", errors="ignore").strip()
         except Exception as e:
             logger.exception("Failed to decode user_document_file as UTF-8")
             raise HTTPException(status_code=400, detail=f"Could not decode user document file: {e}")
@@ -593,9 +794,31 @@ async def fill_form(
         logger.warning("User document text is empty after decoding and it is not an image")
         raise HTTPException(status_code=400, detail="Could not read text from user document file")
 
+    if template_record is None:
+        template_record = registry.register(
+            template_digest,
+            "acroform" if acroform_fields else "form",
+            acroform_fields,
+            template_text,
+            template_images_b64,
+            template_content_type,
+        )
+
     lang = language or "en"
     logger.info("Resolved language parameter: %s", lang)
 
+    if acroform_fields:
+        return await _fill_acroform(
+            template_bytes, template_filename, acroform_fields, user_document_text, user_image_b64, user_content_type, lang
+        )
+    # a scanned template has no text to write the answers into, so it keeps the
+    # full path (with its rasterized pages from the registry)
+    has_text = bool(template_text and template_text.strip())
+    if template_record["fields"] and has_text:
+        return await _fill_known_form(
+            template_record, template_filename, user_document_text, user_image_b64, user_content_type, lang
+        )
+
     try:
         # Normalize MIME types for images
         normalized_template_mime = None
@@ -613,14 +836,15 @@ async def fill_form(
             except ValueError as e:
                 raise HTTPException(status_code=400, detail=f"User document file: {str(e)}")
         
-        result = ask_ai_to_fill_form(
+        result = await ask_ai_to_fill_form(
             template_text=template_text,
             user_document_text=user_document_text,
-            template_image_b64=template_image_b64,
+            template_images_b64=template_images_b64,
             user_image_b64=user_image_b64,
             template_mime=normalized_template_mime,
             user_mime=normalized_user_mime,
             language=lang,
+            want_fields=has_text,
         )
     except HTTPException as e:
         logger.error("fill_form aborted with HTTPException: status=%s detail=%s", e.status_code, e.detail)
@@ -630,30 +854,27 @@ async def fill_form(
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
     logger.info("fill_form completed successfully, creating PDF response")
+    if result.form_fields:
+        template_record = registry.learn_fields(template_record, result.form_fields)
+        logger.info("Learned template fields. count=%s", len(template_record["fields"]))
     
     # Create PDF from filled text
     try:
-        pdf_buffer = create_pdf_from_text(result.filled_text, template_filename)
-        pdf_bytes = pdf_buffer.read()
+        pdf_file = await render_form(result.filled_text)
         
-        # Generate output filename
-        output_filename = template_filename
-        if not output_filename.lower().endswith('.pdf'):
-            output_filename = output_filename.rsplit('.', 1)[0] + '_filled.pdf'
-        else:
-            output_filename = output_filename.rsplit('.', 1)[0] + '_filled.pdf'
+        output_filename = _filled_filename(template_filename)
         
-        logger.info("PDF created successfully. size=%s filename=%s", len(pdf_bytes), output_filename)
+        logger.info("PDF created successfully. size=%s filename=%s", pdf_size(pdf_file), output_filename)
         
-        # Return PDF file
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
+        # Stream the PDF file
+        return pdf_response(
+            pdf_file,
+            output_filename,
             headers={
-                "Content-Disposition": f'attachment; filename="{output_filename}"',
                 "X-Missing-Fields": json.dumps(result.missing_fields),
-                "X-Notes": result.notes or "",
-            }
+                "X-Notes": _notes_header(result.notes),
+                "X-Fill-Mode": "rendered",
+            },
         )
     except Exception as e:
         logger.exception("Failed to create PDF")
@@ -1,21 +1,23 @@
-import os
 import json
-import time
-from typing import Any, Dict, List, Optional
+from typing import List, Optional
 
-import httpx
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
+
+from back.cache import TTLCache
+from back.geocoding import geolocate_ip, reverse_geocode
+from back.llm_gateway import chat_completion
+from back.persistent_cache import namespace_ttl
+from back.single_flight import get_flight
 
 load_dotenv()
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 router = APIRouter()
 
-CACHE: Dict[str, Dict[str, Any]] = {}
 CACHE_TTL = 60 * 60
+CACHE = TTLCache("banking_info", ttl=CACHE_TTL, max_entries=2048, persistent_ttl=namespace_ttl("banking_info"))
+FLIGHT = get_flight("banking_info")
 
 class BankingLocationRequest(BaseModel):
     latitude: Optional[float] = None
@@ -46,50 +48,6 @@ class BankingInfo(BaseModel):
     banks: List[Bank]
     steps: List[BankingStep]
 
-async def reverse_geocode(lat: float, lon: float) -> Dict[str, str]:
-    try:
-        url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=json&addressdetails=1"
-        async with httpx.AsyncClient(timeout=5.0) as http_client:
-            resp = await http_client.get(url, headers={"User-Agent": "UrbanMind"})
-            data = resp.json()
-            addr = data.get("address", {})
-            return {
-                "country_code": addr.get("country_code", "").lower(),
-                "country_name": addr.get("country", "") or "Unknown",
-                "city": addr.get("city")
-                or addr.get("town")
-                or addr.get("village")
-                or addr.get("municipality")
-                or addr.get("state")
-                or "",
-            }
-    except Exception:
-        return {"country_code": "", "country_name": "Unknown", "city": ""}
-
-async def geolocate_ip(ip: str) -> Dict[str, str]:
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as http_client:
-            resp = await http_client.get(f"https://ipapi.co/{ip}/json/")
-            data = resp.json()
-            return {
-                "country_code": str(data.get("country_code", "")).lower(),
-                "country_name": data.get("country_name", "") or "Unknown",
-                "city": data.get("city", "") or data.get("region", "") or "",
-            }
-    except Exception:
-        return {"country_code": "", "country_name": "Unknown", "city": ""}
-
-def get_cache(key: str) -> Optional[Dict[str, Any]]:
-    entry = CACHE.get(key)
-    if not entry:
-        return None
-    if entry["expires"] < time.time():
-        return None
-    return entry["data"]
-
-def set_cache(key: str, data: Dict[str, Any]) -> None:
-    CACHE[key] = {"data": data, "expires": time.time() + CACHE_TTL}
-
 async def ask_ai_for_banking_info(location_text: str, language: str) -> BankingInfo:
     system_prompt = (
         "You are an expert banking assistant for migrants in European countries. "
@@ -138,7 +96,7 @@ async def ask_ai_for_banking_info(location_text: str, language: str) -> BankingI
         "- Do not include any explanatory text outside the JSON object."
     )
 
-    resp = await client.chat.completions.create(
+    resp = await chat_completion(
         model="gpt-4o-mini",
         response_format={"type": "json_object"},
         messages=[
@@ -260,10 +218,13 @@ async def get_banking_info(req: BankingLocationRequest, request: Request) -> Ban
         location_text = f"{country_name} ({country_code.upper()})"
 
     cache_key = f"{country_code}:{city}:{ui_lang}"
-    cached = get_cache(cache_key)
+    cached = CACHE.get(cache_key)
     if cached:
         return BankingInfo(**cached)
 
-    info = await ask_ai_for_banking_info(location_text, ui_lang)
-    set_cache(cache_key, info.dict())
-    return info
+    async def fetch():
+        info = await ask_ai_for_banking_info(location_text, ui_lang)
+        CACHE.set(cache_key, info.dict())
+        return info
+
+    return await FLIGHT.do(cache_key, fetch)
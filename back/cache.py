@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from back.persistent_cache import PersistentCache, get_store
+
+SWEEP_INTERVAL = 60
+
+
+def estimate_size(value: Any) -> int:
+    """Rough byte size of a cached value (JSON length for dicts/lists)."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8"))
+    except Exception:
+        return 0
+
+
+class TTLCache:
+    """LRU cache with per-entry TTL and an optional entry/byte bound."""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        max_entries: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+        persistent_ttl: Optional[float] = None,
+        store: Optional[PersistentCache] = None,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        # Second tier shared across workers/restarts; only used for JSON-serializable values.
+        self.persistent_ttl = persistent_ttl
+        self.store = store or (get_store() if persistent_ttl else None)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        CACHES[namespace] = self
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires, size = entry
+                if expires >= time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+        if self.store is not None:
+            found = self.store.get(self.namespace, key)
+            if found is not None:
+                value, expires = found
+                self._put(key, value, min(expires, time.time() + self.ttl))
+                with self._lock:
+                    self.hits += 1
+                    self.persistent_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._put(key, value, time.time() + (ttl or self.ttl))
+        if self.store is not None:
+            self.store.set(self.namespace, key, value, self.persistent_ttl)
+        if time.time() - self._last_sweep > SWEEP_INTERVAL:
+            self.purge_expired()
+
+    def _put(self, key: str, value: Any, expires: float) -> None:
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires, size)
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            self._last_sweep = now
+            expired = [k for k, (_, expires, _) in self._data.items() if expires < now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, (_, _, size) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes if self.max_bytes else None,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent_hits": self.persistent_hits,
+            "persistent": self.store is not None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+CACHES: Dict[str, TTLCache] = {}
@@ -1,20 +1,21 @@
-import os
 import re
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException
-from openai import OpenAI
 from pydantic import BaseModel
 
+from back.llm_gateway import chat_completion, chat_completion_stream
+from back.sse import stream_reply
+
 load_dotenv()
 
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 class ChatRequest(BaseModel):
     message: str
     chat_history: list = []
     ui_language: str = "en"
+    stream: bool = False
 
 
 urbanmind_system_prompt = """
@@ -49,6 +50,28 @@ def convert_markdown_links_to_html(text: str) -> str:
     return pattern.sub(r'<a href="\2">\1</a>', text)
 
 
+class MarkdownLinkStream:
+    """Incremental convert_markdown_links_to_html: holds back text from an unclosed '['."""
+
+    max_hold = 300
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, delta: str) -> str:
+        text = convert_markdown_links_to_html(self._pending + delta)
+        cut = text.rfind("[")
+        if cut == -1 or len(text) - cut > self.max_hold:
+            self._pending = ""
+            return text
+        self._pending = text[cut:]
+        return text[:cut]
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return text
+
+
 @router.post("/chat")
 async def urbanmind_chat(payload: ChatRequest):
     try:
@@ -61,7 +84,21 @@ async def urbanmind_chat(payload: ChatRequest):
 
         messages.append({"role": "user", "content": payload.message})
 
-        response = client.chat.completions.create(
+        if payload.stream:
+            deltas = chat_completion_stream(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.6,
+                max_tokens=400
+            )
+            return await stream_reply(
+                "chat",
+                deltas,
+                transform=MarkdownLinkStream(),
+                trailer=[("quick_actions", generate_quick_actions(payload.message))],
+            )
+
+        response = await chat_completion(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.6,
@@ -81,6 +118,8 @@ async def urbanmind_chat(payload: ChatRequest):
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
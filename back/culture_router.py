@@ -5,11 +5,12 @@ from typing import Optional, Dict, Any
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from openai import OpenAI
+
+from back.llm_gateway import chat_completion, chat_completion_stream
+from back.sse import stream_reply
 
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
 
 router = APIRouter()
 
@@ -26,6 +27,7 @@ class CultureChatRequest(BaseModel):
     city_code: Optional[str] = None
     lat: Optional[float] = None
     lng: Optional[float] = None
+    stream: bool = False
 
 
 culture_system_prompt = """
@@ -103,7 +105,7 @@ async def nearby_culture(req: NearbyRequest):
         "category": req.category,
     }
     try:
-        resp = client.chat.completions.create(
+        resp = await chat_completion(
             model="gpt-4.1-mini",
             messages=[
                 {"role": "system", "content": culture_system_prompt.strip()},
@@ -142,17 +144,23 @@ async def culture_chat(req: CultureChatRequest):
         "lat": req.lat,
         "lng": req.lng,
     }
+    messages = [
+        {"role": "system", "content": culture_chat_system_prompt.strip()},
+        {"role": "user", "content": json.dumps(text_payload, ensure_ascii=False)},
+    ]
+    if req.stream:
+        deltas = chat_completion_stream(model="gpt-4.1-mini", messages=messages, temperature=0.6, timeout=20)
+        return await stream_reply("culture_chat", deltas)
     try:
-        resp = client.chat.completions.create(
+        resp = await chat_completion(
             model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": culture_chat_system_prompt.strip()},
-                {"role": "user", "content": json.dumps(text_payload, ensure_ascii=False)},
-            ],
+            messages=messages,
             temperature=0.6,
             timeout=20,
         )
         reply = resp.choices[0].message.content.strip()
         return {"status": "success", "reply": reply}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Culture chat error: {str(e)}")
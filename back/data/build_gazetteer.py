@@ -0,0 +1,67 @@
+"""
+Build cities1000.csv.gz, the offline geocoder's gazetteer, from the GeoNames
+dumps (https://download.geonames.org/export/dump/, CC BY 4.0):
+
+    curl -O https://download.geonames.org/export/dump/cities1000.zip
+    curl -O https://download.geonames.org/export/dump/countryInfo.txt
+    unzip cities1000.zip
+    python back/data/build_gazetteer.py cities1000.txt countryInfo.txt
+
+cities1000 lists every place with at least 1000 inhabitants (about 170k),
+dense enough that the nearest one is usually the town the point is in.
+"""
+import argparse
+import csv
+import gzip
+import io
+import os
+import sys
+
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cities1000.csv.gz")
+# columns of the GeoNames "geoname" table
+NAME, LAT, LON, COUNTRY = 1, 4, 5, 8
+
+
+def country_names(path: str) -> dict:
+    names = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            cols = line.rstrip("\n").split("\t")
+            names[cols[0]] = cols[4]
+    return names
+
+
+def build(cities_path: str, countries_path: str, output: str = OUTPUT) -> int:
+    names = country_names(countries_path)
+    rows = []
+    with open(cities_path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            code = cols[COUNTRY]
+            if code not in names:
+                continue
+            rows.append((code.lower(), names[code], cols[NAME], f"{float(cols[LAT]):.4f}", f"{float(cols[LON]):.4f}"))
+    rows.sort()
+    # mtime=0 keeps the archive byte-identical between builds of the same data
+    with open(output, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+        with io.TextIOWrapper(gz, encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["country_code", "country_name", "city", "lat", "lon"])
+            writer.writerows(rows)
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cities", help="cities1000.txt from the GeoNames dump")
+    parser.add_argument("countries", help="countryInfo.txt from the GeoNames dump")
+    parser.add_argument("--output", default=OUTPUT)
+    args = parser.parse_args()
+    count = build(args.cities, args.countries, args.output)
+    print(f"{count} places written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Build ip_ranges.csv.gz, the local IP -> country dataset, from the Regional
+Internet Registries' delegation statistics (public, no licence key needed):
+
+    python back/data/build_ip_ranges.py
+
+downloads the five "delegated-*-extended-latest" files and writes
+back/data/ip_ranges.csv.gz. Pass --from-dir to build from files already on
+disk. The registries publish daily; re-run it from cron and the running
+server picks the new file up (see back/ip_geolocation.py).
+
+The country is the one the block is registered to, which matches where it is
+used for the large majority of addresses. Country names come from the offline
+geocoder's gazetteer, so both lookups name countries the same way. Blocks
+registered to "EU"/"AP" or not yet assigned are left out and go to ipapi.co.
+"""
+import argparse
+import csv
+import gzip
+import io
+import ipaddress
+import os
+import sys
+import urllib.request
+from typing import Dict, Iterable, List, Tuple
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT = os.path.join(DATA_DIR, "ip_ranges.csv.gz")
+GAZETTEER = os.path.join(DATA_DIR, "cities1000.csv.gz")
+SOURCES = {
+    "afrinic": "https://ftp.afrinic.net/pub/stats/afrinic/delegated-afrinic-extended-latest",
+    "apnic": "https://ftp.apnic.net/stats/apnic/delegated-apnic-extended-latest",
+    "arin": "https://ftp.arin.net/pub/stats/arin/delegated-arin-extended-latest",
+    "lacnic": "https://ftp.lacnic.net/pub/stats/lacnic/delegated-lacnic-extended-latest",
+    "ripencc": "https://ftp.ripe.net/pub/stats/ripencc/delegated-ripencc-extended-latest",
+}
+USED = ("allocated", "assigned")
+
+
+def country_names(path: str = GAZETTEER) -> Dict[str, str]:
+    names: Dict[str, str] = {}
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            names.setdefault(row["country_code"].upper(), row["country_name"])
+    return names
+
+
+def read_source(registry: str, from_dir: str) -> Iterable[str]:
+    if from_dir:
+        with open(os.path.join(from_dir, f"delegated-{registry}-extended-latest"), encoding="utf-8") as f:
+            yield from f
+        return
+    with urllib.request.urlopen(SOURCES[registry], timeout=120) as resp:
+        yield from io.TextIOWrapper(resp, encoding="utf-8")
+
+
+def parse(lines: Iterable[str], names: Dict[str, str]) -> List[Tuple[int, int, int, str]]:
+    """(version, first, last, country code) for the used blocks of one registry file."""
+    ranges = []
+    for line in lines:
+        cols = line.strip().split("|")
+        # registry|cc|type|start|value|date|status[|opaque-id]; header and summary lines are shorter or use "*"
+        if len(cols) < 7 or cols[2] not in ("ipv4", "ipv6") or cols[6] not in USED or cols[1].upper() not in names:
+            continue
+        if cols[2] == "ipv4":
+            first = int(ipaddress.IPv4Address(cols[3]))
+            ranges.append((4, first, first + int(cols[4]) - 1, cols[1].upper()))
+        else:
+            net = ipaddress.IPv6Network(f"{cols[3]}/{cols[4]}", strict=False)
+            ranges.append((6, int(net.network_address), int(net.broadcast_address), cols[1].upper()))
+    return ranges
+
+
+def merge(ranges: List[Tuple[int, int, int, str]]) -> List[Tuple[int, int, int, str]]:
+    """Adjacent blocks of the same country become one range."""
+    merged: List[Tuple[int, int, int, str]] = []
+    for version, first, last, code in sorted(ranges):
+        if merged:
+            prev = merged[-1]
+            if prev[0] == version and prev[3] == code and prev[2] + 1 >= first:
+                merged[-1] = (version, prev[1], max(prev[2], last), code)
+                continue
+        merged.append((version, first, last, code))
+    return merged
+
+
+def build(from_dir: str = "", output: str = OUTPUT) -> int:
+    names = country_names()
+    ranges = []
+    for registry in SOURCES:
+        ranges.extend(parse(read_source(registry, from_dir), names))
+    rows = merge(ranges)
+    address = {4: ipaddress.IPv4Address, 6: ipaddress.IPv6Address}
+    # write next to the target and rename, so the server never reads a half-written file
+    tmp = f"{output}.tmp"
+    with open(tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+        with io.TextIOWrapper(gz, encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["start_ip", "end_ip", "country_code", "country_name"])
+            for version, first, last, code in rows:
+                writer.writerow([address[version](first), address[version](last), code.lower(), names[code]])
+    os.replace(tmp, output)
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--from-dir", default="", help="directory with delegated-*-extended-latest files")
+    parser.add_argument("--output", default=OUTPUT)
+    args = parser.parse_args()
+    count = build(args.from_dir, args.output)
+    print(f"{count} ranges written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Lexical retrieval over extracted documents for /docs/chat-with-pdf.
+
+A document's pages are split into overlapping word windows and indexed with
+BM25 (pure Python). Indexes are cached by the sha256 of the file, and the
+digest of a path is remembered by its mtime and size, so an unchanged file is
+neither re-read nor re-indexed. For each question only the RETRIEVAL_TOP_K best
+chunks go into the prompt, in document order. Short documents are sent whole.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from back.cache import TTLCache
+from back.document_extraction import extract_document
+from back.single_flight import get_flight
+from back.tokens import TOKEN_COUNTER, count_tokens
+
+load_dotenv()
+
+RETRIEVAL_CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "200"))
+RETRIEVAL_CHUNK_OVERLAP = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP", "40"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+# only the relevant chunks reach the prompt, so far more pages can be read than DOC_MAX_PAGES
+RETRIEVAL_MAX_PAGES = int(os.getenv("RETRIEVAL_MAX_PAGES", "300"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+INDEX_CACHE = TTLCache(
+    "retrieval_index",
+    ttl=6 * 60 * 60,
+    max_entries=256,
+    max_bytes=64 * 1024 * 1024,
+    sizeof=lambda index: index.nbytes,
+)
+INDEX_FLIGHT = get_flight("retrieval_index")
+RETRIEVAL_STATS: Dict[str, int] = {
+    "queries": 0,
+    "whole_documents": 0,
+    "index_builds": 0,
+    "index_hits": 0,
+    "document_tokens": 0,
+    "context_tokens": 0,
+}
+
+# sha256 of the uploaded files, by path, mtime and size
+PATH_DIGESTS = TTLCache("retrieval_path_digest", ttl=6 * 60 * 60, max_entries=4096)
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    # case- and accent-insensitive, so "pobyt" matches "Pobyt" and "prechodny" "prechodný"
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return TOKEN_RE.findall(folded)
+
+
+def chunk_pages(pages: List[str], size: int, overlap: int) -> List[Dict[str, Any]]:
+    """Overlapping windows of `size` words; each chunk remembers the page it starts on."""
+    words: List[str] = []
+    word_pages: List[int] = []
+    for number, page in enumerate(pages):
+        page_words = page.split()
+        words.extend(page_words)
+        word_pages.extend([number] * len(page_words))
+
+    step = max(1, size - overlap)
+    chunks = []
+    for start in range(0, max(len(words) - overlap, 1), step):
+        window = words[start:start + size]
+        if not window:
+            break
+        chunks.append({"text": " ".join(window), "page": word_pages[start] + 1, "start": start})
+    return chunks
+
+
+class BM25Index:
+    def __init__(self, pages: List[str], chunks: List[Dict[str, Any]]):
+        self.pages = pages
+        self.chunks = chunks
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        for chunk_id, chunk in enumerate(chunks):
+            terms = Counter(tokenize(chunk["text"]))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((chunk_id, tf))
+        n = len(chunks)
+        self.avg_length = sum(self.lengths) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+        # what pasting the whole document into the prompt would cost
+        self.tokens = count_tokens("\n".join(pages))
+        # rough footprint for the cache bound: the text twice over plus ~64 bytes per posting
+        self.nbytes = 2 * sum(len(p) for p in pages) + 64 * sum(len(p) for p in self.postings.values())
+
+    def search(self, query: str, k: int) -> List[Tuple[float, int]]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        return sorted(((score, chunk_id) for chunk_id, score in scores.items()), reverse=True)[:k]
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+async def _path_digest(path: str) -> str:
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+    digest = PATH_DIGESTS.get(key)
+    if digest is None:
+        # reading and hashing a long PDF takes a while; keep it off the event loop
+        digest = await asyncio.get_running_loop().run_in_executor(None, _hash_file, path)
+        PATH_DIGESTS.set(key, digest)
+    return digest
+
+
+async def get_index(path: str) -> Tuple[BM25Index, bool]:
+    """The BM25 index of a PDF and whether it came from the cache."""
+    key = f"{await _path_digest(path)}:{RETRIEVAL_CHUNK_WORDS}:{RETRIEVAL_CHUNK_OVERLAP}"
+    index = INDEX_CACHE.get(key)
+    if index is not None:
+        RETRIEVAL_STATS["index_hits"] += 1
+        return index, True
+
+    async def build():
+        document = await extract_document("pdf", path, max_pages=RETRIEVAL_MAX_PAGES)
+        pages = document["pages"]
+        chunks = chunk_pages(pages, RETRIEVAL_CHUNK_WORDS, RETRIEVAL_CHUNK_OVERLAP)
+        # a few hundred ms for a long guide; keep it off the event loop
+        built = await asyncio.get_running_loop().run_in_executor(None, BM25Index, pages, chunks)
+        RETRIEVAL_STATS["index_builds"] += 1
+        INDEX_CACHE.set(key, built)
+        return built
+
+    return await INDEX_FLIGHT.do(key, build), False
+
+
+async def retrieve_context(path: str, question: str, k: Optional[int] = None) -> Dict[str, Any]:
+    """
+    The parts of the PDF at `path` worth sending with `question`.
+
+    Returns {"text", "chunks", "total_chunks", "pages", "document_tokens",
+    "context_tokens", "tokens_saved", "index_cached", "search_ms"}.
+    """
+    k = k or RETRIEVAL_TOP_K
+    index, cached = await get_index(path)
+    start = time.perf_counter()
+    if len(index.chunks) <= k:
+        # short enough to send whole
+        picked = list(range(len(index.chunks)))
+        text = "\n".join(index.pages)
+        pages = list(range(1, len(index.pages) + 1))
+        RETRIEVAL_STATS["whole_documents"] += 1
+    else:
+        hits = index.search(question, k)
+        # nothing matched (e.g. a question in another language): fall back to the opening chunks
+        picked = sorted(chunk_id for _, chunk_id in hits) if hits else list(range(k))
+        text = "\n\n".join(f"[page {index.chunks[i]['page']}] {index.chunks[i]['text']}" for i in picked)
+        pages = sorted({index.chunks[i]["page"] for i in picked})
+    context_tokens = count_tokens(text)
+
+    RETRIEVAL_STATS["queries"] += 1
+    RETRIEVAL_STATS["document_tokens"] += index.tokens
+    RETRIEVAL_STATS["context_tokens"] += context_tokens
+    return {
+        "text": text,
+        "chunks": len(picked),
+        "total_chunks": len(index.chunks),
+        "pages": pages,
+        "document_tokens": index.tokens,
+        "context_tokens": context_tokens,
+        "tokens_saved": max(0, index.tokens - context_tokens),
+        "index_cached": cached,
+        "search_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def retrieval_stats() -> Dict[str, Any]:
+    return {
+        **RETRIEVAL_STATS,
+        "tokens_saved": max(0, RETRIEVAL_STATS["document_tokens"] - RETRIEVAL_STATS["context_tokens"]),
+        "token_counter": TOKEN_COUNTER,
+    }
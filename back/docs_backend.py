@@ -1,33 +1,22 @@
+import logging
+
 from dotenv import load_dotenv
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
-import PyPDF2
 from pydantic import BaseModel
 from back.system_prompts import docs_system_prompt
-import openai
-import os
+from back.doc_retrieval import retrieve_context
+from back.llm_gateway import chat_completion, chat_completion_stream
+from back.sse import stream_reply
 
 load_dotenv()
 
 router = APIRouter()
-
-# Set OpenAI API key
-openai.api_key = os.getenv("OPENAI_API_KEY")
+logger = logging.getLogger("docs")
 
 class RequestValue(BaseModel):
     message: str
-
-def read_pdf(file_path):
-    """Read and extract text from a PDF file."""
-    text = ""
-    try:
-        with open(file_path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-    except Exception as e:
-        return f"Error reading PDF: {str(e)}"
-    return text
+    stream: bool = False
 
 async def chat_with_gpt(user_message: str, system_prompt: str):
     """
@@ -38,7 +27,7 @@ async def chat_with_gpt(user_message: str, system_prompt: str):
     :return: AI response text
     """
     try:
-        response = openai.chat.completions.create(
+        response = await chat_completion(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -48,15 +37,31 @@ async def chat_with_gpt(user_message: str, system_prompt: str):
             max_tokens=2000
         )
         return response.choices[0].message.content
+    except HTTPException:
+        raise
     except Exception as e:
         raise Exception(f"OpenAI API error: {str(e)}")
 
+async def stream_chat_with_gpt(user_message: str, system_prompt: str):
+    """Same request as chat_with_gpt, returned as an SSE stream of deltas."""
+    deltas = chat_completion_stream(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ],
+        temperature=0.7,
+        max_tokens=2000
+    )
+    return await stream_reply("docs_chat", deltas)
+
 @router.post("/chat")
 async def docs_chat(request_data: RequestValue):
     """
     Request body should be JSON like:
     {
-        "message": "user text"
+        "message": "user text",
+        "stream": false
     }
     """
     message = request_data.message.strip()
@@ -75,8 +80,12 @@ If the user is asking about a specific document, you can use the document conten
 Provide helpful and accurate information based on the request.
 """
 
+        if request_data.stream:
+            return await stream_chat_with_gpt(message, enhanced_prompt)
         reply = await chat_with_gpt(message, enhanced_prompt)
         return JSONResponse({"status": "success", "reply": reply})
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(
             {"status": "error", "message": f"Documents chat error: {str(e)}"},
@@ -89,7 +98,8 @@ async def docs_chat_with_pdf(request_data: dict):
     Request body should be JSON like:
     {
         "message": "user text",
-        "pdf_path": "path/to/document.pdf"
+        "pdf_path": "path/to/document.pdf",
+        "stream": false
     }
     """
     message = request_data.get("message", "").strip()
@@ -99,15 +109,29 @@ async def docs_chat_with_pdf(request_data: dict):
         return JSONResponse({"status": "error", "message": "Message is empty."}, status_code=400)
 
     try:
-        # Read PDF content if path is provided
+        # Only the chunks of the PDF relevant to the question go into the prompt
         pdf_content = ""
+        retrieval = None
         if pdf_path:
-            pdf_content = read_pdf(pdf_path)
-            if pdf_content.startswith("Error reading PDF"):
-                return JSONResponse(
-                    {"status": "error", "message": pdf_content},
-                    status_code=400
-                )
+            try:
+                retrieval = await retrieve_context(pdf_path, message)
+            except HTTPException as e:
+                if e.status_code in (429, 503):
+                    raise
+                return JSONResponse({"status": "error", "message": f"Error reading PDF: {e.detail}"}, status_code=400)
+            except Exception as e:
+                return JSONResponse({"status": "error", "message": f"Error reading PDF: {str(e)}"}, status_code=400)
+            pdf_content = retrieval["text"] + "\n"
+            logger.info(
+                "chat-with-pdf context: %s/%s chunks, pages %s, %s of %s tokens (%s saved), index cached=%s",
+                retrieval["chunks"],
+                retrieval["total_chunks"],
+                retrieval["pages"],
+                retrieval["context_tokens"],
+                retrieval["document_tokens"],
+                retrieval["tokens_saved"],
+                retrieval["index_cached"],
+            )
 
         # Combine document content with user message
         enhanced_message = f"""
@@ -117,8 +141,15 @@ Document Content:
 User Question: {message}
 """
 
+        if request_data.get("stream"):
+            return await stream_chat_with_gpt(enhanced_message, docs_system_prompt)
         reply = await chat_with_gpt(enhanced_message, docs_system_prompt)
-        return JSONResponse({"status": "success", "reply": reply})
+        result = {"status": "success", "reply": reply}
+        if retrieval is not None:
+            result["context"] = {key: value for key, value in retrieval.items() if key != "text"}
+        return JSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(
             {"status": "error", "message": f"Documents chat error: {str(e)}"},
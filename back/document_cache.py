@@ -0,0 +1,87 @@
+"""
+Content-addressed cache for uploaded documents.
+
+Entries are keyed by the sha256 of the raw uploaded bytes, so a re-upload of
+the same file (the same few official form templates come in over and over)
+skips sniffing, parsing and rasterization no matter what it is called.
+"""
+import hashlib
+import os
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+from back.cache import TTLCache
+
+load_dotenv()
+
+DOC_CACHE_TTL = float(os.getenv("DOC_CACHE_TTL", str(24 * 60 * 60)))
+DOC_CACHE_MAX_BYTES = int(os.getenv("DOC_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _document_size(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_document_size(v) for v in value.values()) + 64
+    if isinstance(value, (list, tuple)):
+        return sum(_document_size(v) for v in value) + 16
+    return 16
+
+
+DOCUMENT_CACHE = TTLCache(
+    "documents",
+    ttl=DOC_CACHE_TTL,
+    max_entries=4096,
+    max_bytes=DOC_CACHE_MAX_BYTES,
+    sizeof=_document_size,
+)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _sniff(data: bytes, filename: str) -> Optional[str]:
+    head = bytes(data[:16])
+    if head.startswith(b"%PDF"):
+        return "application/pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"PK\x03\x04") and filename.lower().endswith(".docx"):
+        return DOCX_MIME
+    sample = bytes(data[:4096])
+    if b"\x00" not in sample:
+        try:
+            sample.decode("utf-8")
+            return "text/plain"
+        except UnicodeDecodeError:
+            # a multi-byte character cut at the sample boundary is still text
+            if len(data) > 4096:
+                try:
+                    sample[:-4].decode("utf-8")
+                    return "text/plain"
+                except UnicodeDecodeError:
+                    pass
+    return None
+
+
+def detect_mime(data: bytes, filename: str = "", declared: Optional[str] = None, digest: Optional[str] = None) -> str:
+    """MIME type from the file's magic bytes, falling back to the client's Content-Type."""
+    key = f"{digest or content_hash(data)}:mime"
+    cached = DOCUMENT_CACHE.get(key)
+    if cached is not None:
+        return cached
+    mime = _sniff(data, filename) or declared or "application/octet-stream"
+    DOCUMENT_CACHE.set(key, mime)
+    return mime
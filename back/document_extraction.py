@@ -0,0 +1,540 @@
+"""
+Document text extraction off the event loop.
+
+PDF/DOCX parsing is CPU bound, so it runs in a bounded ProcessPoolExecutor.
+Admission goes through a ModelGate sized to the pool, so at most DOC_WORKERS
+jobs are parsed at once and the rest wait in a bounded queue (429/503
+with Retry-After when it is full or the wait times out, as for model calls). Each
+job gets DOC_EXTRACT_TIMEOUT seconds and only the first DOC_MAX_PAGES pages of
+a document are read.
+
+PDFs are read page by page with iter_pdf_pages: PyMuPDF when it is installed,
+PyPDF2 when it is missing or fails on a page. A caller that only has room for
+so much text passes max_chars/max_tokens, and reading stops once that budget
+is filled. Unbudgeted documents longer than DOC_PAGES_PER_JOB pages are split
+by page range across the workers.
+
+rasterize_pdf renders pages to compact images for the Vision prompts, and
+normalize_image shrinks uploaded photos for them, in the same pool (see
+rasterize and image_normalization).
+
+Results are cached by content (see document_cache), so a re-upload of the same
+bytes is not parsed again.
+"""
+import asyncio
+import io
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from back.admission import ModelGate, gather_or_cancel
+from back.document_cache import DOCUMENT_CACHE, content_hash
+from back.single_flight import get_flight
+from back.tokens import clip_tokens, count_tokens
+
+try:
+    import fitz  # PyMuPDF
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+load_dotenv()
+
+DOC_WORKERS = int(os.getenv("DOC_WORKERS", str(min(4, os.cpu_count() or 1))))
+DOC_QUEUE_SIZE = int(os.getenv("DOC_QUEUE_SIZE", "32"))
+DOC_QUEUE_TIMEOUT = float(os.getenv("DOC_QUEUE_TIMEOUT", "15"))
+DOC_EXTRACT_TIMEOUT = float(os.getenv("DOC_EXTRACT_TIMEOUT", "20"))
+DOC_MAX_PAGES = int(os.getenv("DOC_MAX_PAGES", "50"))
+DOC_PAGES_PER_JOB = int(os.getenv("DOC_PAGES_PER_JOB", "16"))
+
+EXTRACTION_GATE = ModelGate("document_extraction", DOC_WORKERS, DOC_QUEUE_SIZE, DOC_QUEUE_TIMEOUT)
+EXTRACTION_STATS: Dict[str, Any] = {
+    "documents": 0,
+    "pages": 0,
+    "truncated": 0,
+    "budget_stops": 0,
+    "bytes_read": 0,
+    "timeouts": 0,
+    "split_documents": 0,
+    "cache_hits": 0,
+    "parse_seconds": 0.0,
+    "engines": {"pymupdf": 0, "pypdf2": 0, "docx": 0},
+}
+
+RASTER_STATS: Dict[str, Any] = {
+    "documents": 0,
+    "pages": 0,
+    "bytes": 0,
+    "pixels": 0,
+    "legacy_pixels": 0,
+    "render_ms": 0.0,
+    "cache_hits": 0,
+}
+
+IMAGE_STATS: Dict[str, Any] = {
+    "images": 0,
+    "original_bytes": 0,
+    "bytes": 0,
+    "resized": 0,
+    "rotated": 0,
+    "ms": 0.0,
+    "cache_hits": 0,
+}
+
+EXTRACTION_FLIGHT = get_flight("document_extraction")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _read_source(source: Union[bytes, str]) -> bytes:
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    return source
+
+
+def _pages_pymupdf(source: Union[bytes, str], first: int, last: int) -> Iterator[Tuple[int, str, int, float]]:
+    # a path is opened in place, so only the objects of pages actually read are loaded
+    doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    with doc:
+        for i in range(first, min(last, doc.page_count)):
+            start = time.perf_counter()
+            text = doc[i].get_text()
+            yield i, text, doc.page_count, (time.perf_counter() - start) * 1000
+
+
+def _pages_pypdf2(source: Union[bytes, str], first: int, last: int) -> Iterator[Tuple[int, str, int, float]]:
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+    total = len(reader.pages)
+    for i in range(first, min(last, total)):
+        start = time.perf_counter()
+        text = reader.pages[i].extract_text() or ""
+        yield i, text, total, (time.perf_counter() - start) * 1000
+
+
+def _take(text: str, chars_left: Optional[int], tokens_left: Optional[int]) -> Tuple[str, int, bool]:
+    """text cut to what is left of the budget: (text, tokens, whether it was cut)."""
+    clipped = False
+    if chars_left is not None and len(text) > chars_left:
+        text, clipped = text[:max(chars_left, 0)], True
+    tokens = count_tokens(text) if tokens_left is not None else 0
+    if tokens_left is not None and tokens > tokens_left:
+        text, clipped = clip_tokens(text, tokens_left), True
+        tokens = count_tokens(text)
+    return text, tokens, clipped
+
+
+def iter_pdf_pages(
+    source: Union[bytes, str],
+    first: int = 0,
+    last: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the text of pages [first, last) of a PDF one page at a time.
+
+    Each item is {"page", "text", "total_pages", "ms", "engine", "budget_exhausted"}.
+    With `max_chars` and/or `max_tokens` the reader stops as soon as the budget
+    is used up: the page that reaches it is cut to fit and marked
+    "budget_exhausted", and later pages are never parsed. PyMuPDF is used when installed; if it fails on a
+    page, PyPDF2 carries on from that page.
+    """
+    last = DOC_MAX_PAGES if last is None else last
+    readers = [("pymupdf", _pages_pymupdf), ("pypdf2", _pages_pypdf2)] if HAS_PYMUPDF else [("pypdf2", _pages_pypdf2)]
+    chars_used = tokens_used = 0
+    next_page = first
+    for engine, reader in readers:
+        try:
+            for number, text, total, ms in reader(source, next_page, last):
+                next_page = number + 1
+                text, tokens, clipped = _take(
+                    text,
+                    None if max_chars is None else max_chars - chars_used,
+                    None if max_tokens is None else max_tokens - tokens_used,
+                )
+                chars_used += len(text)
+                tokens_used += tokens
+                exhausted = clipped or (max_chars is not None and chars_used >= max_chars) or (
+                    max_tokens is not None and tokens_used >= max_tokens
+                )
+                yield {
+                    "page": number,
+                    "text": text,
+                    "total_pages": total,
+                    "ms": ms,
+                    "engine": engine,
+                    "budget_exhausted": exhausted,
+                }
+                if exhausted:
+                    return
+            return
+        except Exception:
+            if reader is readers[-1][1]:
+                raise
+            # damaged or unusual files: PyPDF2 is more forgiving with some of them
+
+
+def _extract_pdf(
+    source: Union[bytes, str], first: int, last: int, max_chars: Optional[int] = None, max_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    texts: List[str] = []
+    page_ms: List[float] = []
+    engines = set()
+    total = 0
+    exhausted = False
+    for page in iter_pdf_pages(source, first, last, max_chars, max_tokens):
+        texts.append(page["text"])
+        page_ms.append(page["ms"])
+        engines.add(page["engine"])
+        total = page["total_pages"]
+        exhausted = page["budget_exhausted"]
+    if not texts:
+        total = _count_pages(source)
+    return {
+        "pages": texts,
+        "page_ms": page_ms,
+        "total_pages": total,
+        "engine": "+".join(sorted(engines)) or ("pymupdf" if HAS_PYMUPDF else "pypdf2"),
+        "bytes_read": sum(len(text.encode("utf-8")) for text in texts),
+        "budget_exhausted": exhausted,
+    }
+
+
+def _count_pages(source: Union[bytes, str]) -> int:
+    if HAS_PYMUPDF:
+        try:
+            with (fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")) as doc:
+                return doc.page_count
+        except Exception:
+            pass
+    import PyPDF2
+
+    return len(PyPDF2.PdfReader(source if isinstance(source, str) else io.BytesIO(source)).pages)
+
+
+def _extract_docx(
+    source: Union[bytes, str], first: int, last: int, max_chars: Optional[int] = None, max_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    import docx
+
+    start = time.perf_counter()
+    doc = docx.Document(io.BytesIO(_read_source(source)))
+    text, _, exhausted = _take("\n".join(p.text for p in doc.paragraphs), max_chars, max_tokens)
+    return {
+        "pages": [text],
+        "page_ms": [(time.perf_counter() - start) * 1000],
+        "total_pages": 1,
+        "engine": "docx",
+        "bytes_read": len(text.encode("utf-8")),
+        "budget_exhausted": exhausted,
+    }
+
+
+def _rasterize(source: Union[bytes, str], first: int, last: int, *_) -> Dict[str, Any]:
+    from back.rasterize import render_pages
+
+    return render_pages(source, first, last)
+
+
+def _normalize_image(source: Union[bytes, str], first: int, last: int, *_) -> Dict[str, Any]:
+    from back.image_normalization import normalize_image_bytes
+
+    return normalize_image_bytes(_read_source(source))
+
+
+_EXTRACTORS = {"pdf": _extract_pdf, "docx": _extract_docx, "raster": _rasterize, "image": _normalize_image}
+
+
+def _extract_in_worker(
+    kind: str, source: Union[bytes, str], first: int, last: int, max_chars: Optional[int], max_tokens: Optional[int]
+) -> Dict[str, Any]:
+    # runs in the child process; the timing covers parsing only, not queueing or pickling
+    start = time.perf_counter()
+    result = _EXTRACTORS[kind](source, first, last, max_chars, max_tokens)
+    result["parse_seconds"] = time.perf_counter() - start
+    return result
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=DOC_WORKERS)
+    return _pool
+
+
+def _pdf_page_count(source: Union[bytes, str]) -> Optional[int]:
+    try:
+        # opening only reads the xref table, so this is cheap, but not free enough for the event loop
+        with (fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")) as doc:
+            return doc.page_count
+    except Exception:
+        return None
+
+
+async def _page_ranges(kind: str, source: Union[bytes, str], limit: int, budgeted: bool) -> List[Tuple[int, int]]:
+    # a budgeted read goes front to back and stops early, so it is not split
+    if kind != "pdf" or budgeted or not HAS_PYMUPDF or DOC_WORKERS < 2:
+        return [(0, limit)]
+    count = await asyncio.get_running_loop().run_in_executor(None, _pdf_page_count, source)
+    if count is None:
+        return [(0, limit)]
+    count = min(count, limit)
+    if count <= DOC_PAGES_PER_JOB:
+        return [(0, limit)]
+    size = max(DOC_PAGES_PER_JOB, math.ceil(count / DOC_WORKERS))
+    return [(first, min(first + size, count)) for first in range(0, count, size)]
+
+
+async def _run_job(
+    kind: str,
+    source: Union[bytes, str],
+    first: int,
+    last: int,
+    timeout: float,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    await EXTRACTION_GATE.acquire()
+    start = time.perf_counter()
+    try:
+        future = asyncio.get_running_loop().run_in_executor(
+            get_pool(), _extract_in_worker, kind, source, first, last, max_chars, max_tokens
+        )
+    except Exception:
+        EXTRACTION_GATE.release(0.0)
+        raise
+    # A worker can't be interrupted, so the slot is only freed when it really
+    # finishes, even if the caller has already given up on it.
+    future.add_done_callback(lambda _: EXTRACTION_GATE.release(time.perf_counter() - start))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+    except asyncio.TimeoutError:
+        EXTRACTION_STATS["timeouts"] += 1
+        raise HTTPException(status_code=422, detail="Document is too complex to process in time.")
+
+
+def _source_key(source: Union[bytes, memoryview, str], digest: Optional[str]) -> str:
+    if isinstance(source, str):
+        st = os.stat(source)
+        return f"path:{os.path.abspath(source)}:{st.st_mtime_ns}:{st.st_size}"
+    return digest or content_hash(source)
+
+
+async def extract_document(
+    kind: str,
+    source: Union[bytes, memoryview, str],
+    max_pages: Optional[int] = None,
+    timeout: Optional[float] = None,
+    digest: Optional[str] = None,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Parse a "pdf" or "docx" document (bytes, a memoryview or a file path) in the worker pool.
+
+    Returns {"text", "pages" (text per page), "page_ms", "total_pages", "engine",
+    "bytes_read", "budget_exhausted", "pages_per_second", "parse_seconds",
+    "wall_seconds", "jobs", "cached"}. Pass `digest` when the sha256 of the
+    bytes is already known. With `max_chars`/`max_tokens` pages are read only
+    until that much text has been collected (see iter_pdf_pages). Parser
+    errors are re-raised as they are; a job that exceeds the timeout raises a 422.
+    """
+    limit = max_pages or DOC_MAX_PAGES
+    key = f"{_source_key(source, digest)}:{kind}:{limit}:{max_chars}:{max_tokens}"
+    cached = DOCUMENT_CACHE.get(key)
+    if cached is not None:
+        EXTRACTION_STATS["cache_hits"] += 1
+        return dict(cached, cached=True)
+
+    async def fetch():
+        result = await _extract(kind, source, limit, timeout, max_chars, max_tokens)
+        DOCUMENT_CACHE.set(key, result)
+        return result
+
+    return dict(await EXTRACTION_FLIGHT.do(key, fetch), cached=False)
+
+
+async def _extract(
+    kind: str,
+    source: Union[bytes, memoryview, str],
+    limit: int,
+    timeout: Optional[float],
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    if isinstance(source, memoryview):
+        source = source.tobytes()  # arguments to the worker pool are pickled
+    ranges = await _page_ranges(kind, source, limit, max_chars is not None or max_tokens is not None)
+    # the jobs of one document fit the gate's slots; if one is still rejected,
+    # the others stop waiting for a slot instead of parsing for nothing
+    parts = await gather_or_cancel(
+        *(
+            _run_job(kind, source, first, last, timeout or DOC_EXTRACT_TIMEOUT, max_chars, max_tokens)
+            for first, last in ranges
+        )
+    )
+
+    pages = [text for part in parts for text in part["pages"]]
+    engines = sorted({engine for part in parts for engine in part["engine"].split("+")})
+    parse_seconds = sum(part["parse_seconds"] for part in parts)
+    result = {
+        "text": "\n".join(pages),
+        "pages": pages,
+        "page_ms": [round(ms, 2) for part in parts for ms in part["page_ms"]],
+        "total_pages": parts[0]["total_pages"],
+        "engine": "+".join(engines),
+        "bytes_read": sum(part["bytes_read"] for part in parts),
+        "budget_exhausted": any(part["budget_exhausted"] for part in parts),
+        "pages_per_second": round(len(pages) / parse_seconds, 1) if parse_seconds else 0.0,
+        "parse_seconds": parse_seconds,
+        "wall_seconds": time.perf_counter() - start,
+        "jobs": len(parts),
+    }
+
+    EXTRACTION_STATS["documents"] += 1
+    EXTRACTION_STATS["pages"] += len(pages)
+    EXTRACTION_STATS["bytes_read"] += result["bytes_read"]
+    EXTRACTION_STATS["parse_seconds"] += parse_seconds
+    for engine in engines:
+        EXTRACTION_STATS["engines"][engine] += 1
+    if len(parts) > 1:
+        EXTRACTION_STATS["split_documents"] += 1
+    if result["budget_exhausted"]:
+        EXTRACTION_STATS["budget_stops"] += 1
+    elif len(pages) < result["total_pages"]:
+        EXTRACTION_STATS["truncated"] += 1
+    return result
+
+
+async def extract_pdf_text(
+    source: Union[bytes, memoryview, str],
+    max_pages: Optional[int] = None,
+    digest: Optional[str] = None,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    result = await extract_document("pdf", source, max_pages, digest=digest, max_chars=max_chars, max_tokens=max_tokens)
+    return result["text"]
+
+
+async def rasterize_pdf(
+    source: Union[bytes, memoryview, str], digest: Optional[str] = None, max_pages: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Render the first non-blank pages of a PDF to images in the worker pool.
+
+    Returns rasterize.render_pages' result plus "cached". Only the first
+    `max_pages` (DOC_MAX_PAGES) pages are looked at.
+    """
+    from back.rasterize import raster_settings
+
+    key = f"{_source_key(source, digest)}:raster:{raster_settings()}"
+    cached = DOCUMENT_CACHE.get(key)
+    if cached is not None:
+        RASTER_STATS["cache_hits"] += 1
+        return dict(cached, cached=True)
+
+    async def fetch():
+        payload = source.tobytes() if isinstance(source, memoryview) else source
+        result = await _run_job("raster", payload, 0, max_pages or DOC_MAX_PAGES, DOC_EXTRACT_TIMEOUT)
+        RASTER_STATS["documents"] += 1
+        for image in result["images"]:
+            RASTER_STATS["pages"] += 1
+            RASTER_STATS["bytes"] += image["bytes"]
+            RASTER_STATS["pixels"] += image["width"] * image["height"]
+            RASTER_STATS["legacy_pixels"] += image["legacy_pixels"]
+            RASTER_STATS["render_ms"] += image["ms"]
+        DOCUMENT_CACHE.set(key, result)
+        return result
+
+    return dict(await EXTRACTION_FLIGHT.do(key, fetch), cached=False)
+
+
+def raster_stats() -> Dict[str, Any]:
+    pages = RASTER_STATS["pages"]
+    return {
+        **RASTER_STATS,
+        "render_ms": round(RASTER_STATS["render_ms"], 1),
+        "ms_per_page": round(RASTER_STATS["render_ms"] / pages, 2) if pages else 0.0,
+        "bytes_per_page": RASTER_STATS["bytes"] // pages if pages else 0,
+        "pixels_saved": RASTER_STATS["legacy_pixels"] - RASTER_STATS["pixels"],
+    }
+
+
+async def normalize_image(
+    source: Union[bytes, memoryview], mime: str, digest: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Upright, downscaled, metadata-free re-encode of an uploaded image, made in
+    the worker pool. Returns image_normalization.normalize_image_bytes' result
+    plus "cached"; without Pillow the image comes back as it was.
+    """
+    from back.image_normalization import HAS_PILLOW, image_settings
+
+    if not HAS_PILLOW:
+        data = bytes(source)
+        return {"data": data, "mime": mime, "original_bytes": len(data), "bytes": len(data), "cached": False}
+
+    key = f"{_source_key(source, digest)}:image:{image_settings()}"
+    cached = DOCUMENT_CACHE.get(key)
+    if cached is not None:
+        IMAGE_STATS["cache_hits"] += 1
+        return dict(cached, cached=True)
+
+    async def fetch():
+        payload = source.tobytes() if isinstance(source, memoryview) else source
+        result = await _run_job("image", payload, 0, 1, DOC_EXTRACT_TIMEOUT)
+        IMAGE_STATS["images"] += 1
+        IMAGE_STATS["original_bytes"] += result["original_bytes"]
+        IMAGE_STATS["bytes"] += result["bytes"]
+        IMAGE_STATS["resized"] += result["resized"]
+        IMAGE_STATS["rotated"] += result["rotated"]
+        IMAGE_STATS["ms"] += result["ms"]
+        DOCUMENT_CACHE.set(key, result)
+        return result
+
+    return dict(await EXTRACTION_FLIGHT.do(key, fetch), cached=False)
+
+
+def image_stats() -> Dict[str, Any]:
+    original = IMAGE_STATS["original_bytes"]
+    return {
+        **IMAGE_STATS,
+        "ms": round(IMAGE_STATS["ms"], 1),
+        "bytes_saved": original - IMAGE_STATS["bytes"],
+        "size_ratio": round(IMAGE_STATS["bytes"] / original, 3) if original else 0.0,
+    }
+
+
+def extraction_stats() -> Dict[str, Any]:
+    docs = EXTRACTION_STATS["documents"]
+    pages = EXTRACTION_STATS["pages"]
+    return {
+        **EXTRACTION_STATS,
+        "parse_seconds": round(EXTRACTION_STATS["parse_seconds"], 3),
+        "parse_ms_avg": round(EXTRACTION_STATS["parse_seconds"] / docs * 1000, 1) if docs else 0.0,
+        "parse_ms_per_page": round(EXTRACTION_STATS["parse_seconds"] / pages * 1000, 2) if pages else 0.0,
+        "pages_per_second": round(pages / EXTRACTION_STATS["parse_seconds"], 1) if EXTRACTION_STATS["parse_seconds"] else 0.0,
+        "pymupdf": HAS_PYMUPDF,
+        "workers": DOC_WORKERS,
+        "max_pages": DOC_MAX_PAGES,
+        "gate": EXTRACTION_GATE.stats(),
+        "raster": raster_stats(),
+        "images": image_stats(),
+    }
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,133 @@
+import os
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from back.cache import TTLCache
+from back.ip_geolocation import lookup_ip
+from back.offline_geocoder import get_offline_geocoder
+from back.single_flight import get_flight
+from back.traffic_replay import recorded
+
+load_dotenv()
+
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+IPAPI_URL = os.getenv("IPAPI_URL", "https://ipapi.co")
+GEOCODE_TIMEOUT = float(os.getenv("GEOCODE_TIMEOUT", "3"))
+# 2 decimals is roughly 1 km: plenty for country/city and keeps the cache small
+GEOCODE_PRECISION = int(os.getenv("GEOCODE_PRECISION", "2"))
+FAILURE_TTL = 60
+# Offline gazetteer / local IP ranges answer first; Nominatim and ipapi.co are only fallbacks.
+OFFLINE_GEOCODER = os.getenv("OFFLINE_GEOCODER", "1") != "0"
+GEOCODE_NETWORK_FALLBACK = os.getenv("GEOCODE_NETWORK_FALLBACK", "1") != "0"
+
+REVERSE_CACHE = TTLCache("reverse_geocode", ttl=24 * 60 * 60, max_entries=20000)
+IP_CACHE = TTLCache("ip_geolocation", ttl=6 * 60 * 60, max_entries=20000)
+REVERSE_FLIGHT = get_flight("reverse_geocode")
+IP_FLIGHT = get_flight("ip_geolocation")
+
+_http: Optional[httpx.AsyncClient] = None
+
+
+def unknown_location() -> Dict[str, str]:
+    return {"country_code": "", "country_name": "Unknown", "city": ""}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=httpx.Timeout(GEOCODE_TIMEOUT, connect=min(GEOCODE_TIMEOUT, 2.0)),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            headers={"User-Agent": "UrbanMind"},
+        )
+    return _http
+
+
+def quantize(lat: float, lon: float) -> tuple:
+    return round(lat, GEOCODE_PRECISION), round(lon, GEOCODE_PRECISION)
+
+
+async def _fetch_reverse(lat: float, lon: float) -> Dict[str, str]:
+    try:
+        resp = await get_http_client().get(
+            f"{NOMINATIM_URL}/reverse",
+            params={"lat": lat, "lon": lon, "format": "json", "addressdetails": 1},
+        )
+        data = resp.json()
+        addr = data.get("address", {})
+        return {
+            "country_code": addr.get("country_code", "").lower(),
+            "country_name": addr.get("country", "") or "Unknown",
+            "city": addr.get("city")
+            or addr.get("town")
+            or addr.get("village")
+            or addr.get("municipality")
+            or addr.get("state")
+            or "",
+        }
+    except Exception:
+        return unknown_location()
+
+
+async def _fetch_ip(ip: str) -> Dict[str, str]:
+    try:
+        resp = await get_http_client().get(f"{IPAPI_URL}/{ip}/json/")
+        data = resp.json()
+        return {
+            "country_code": str(data.get("country_code", "")).lower(),
+            "country_name": data.get("country_name", "") or "Unknown",
+            "city": data.get("city", "") or data.get("region", "") or "",
+        }
+    except Exception:
+        return unknown_location()
+
+
+async def reverse_geocode(lat: float, lon: float) -> Dict[str, str]:
+    if OFFLINE_GEOCODER:
+        geo = get_offline_geocoder().lookup(lat, lon)
+        if geo is not None:
+            return geo
+        if not GEOCODE_NETWORK_FALLBACK:
+            return unknown_location()
+
+    qlat, qlon = quantize(lat, lon)
+    key = f"{qlat}:{qlon}"
+    cached = REVERSE_CACHE.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    async def fetch():
+        geo = await recorded("reverse_geocode", {"lat": qlat, "lon": qlon}, lambda: _fetch_reverse(qlat, qlon))
+        # failures are cached briefly so a dead upstream is not hammered
+        REVERSE_CACHE.set(key, geo, ttl=None if geo["country_code"] else FAILURE_TTL)
+        return geo
+
+    return dict(await REVERSE_FLIGHT.do(key, fetch))
+
+
+async def geolocate_ip(ip: str) -> Dict[str, str]:
+    geo = lookup_ip(ip)
+    if geo is not None:
+        return geo
+    if not GEOCODE_NETWORK_FALLBACK:
+        return unknown_location()
+
+    cached = IP_CACHE.get(ip)
+    if cached is not None:
+        return dict(cached)
+
+    async def fetch():
+        geo = await recorded("ip_geolocation", {"ip": ip}, lambda: _fetch_ip(ip))
+        IP_CACHE.set(ip, geo, ttl=None if geo["country_code"] else FAILURE_TTL)
+        return geo
+
+    return dict(await IP_FLIGHT.do(ip, fetch))
+
+
+async def aclose() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
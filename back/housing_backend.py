@@ -1,20 +1,22 @@
-import os
 import json
-import time
-import requests
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from back.cache import TTLCache
+from back.geocoding import geolocate_ip, reverse_geocode
+from back.llm_gateway import chat_completion
+from back.persistent_cache import namespace_ttl
+from back.single_flight import get_flight
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 router = APIRouter()
 
-CACHE: Dict[str, Dict[str, Any]] = {}
 CACHE_TTL = 60 * 60
+CACHE = TTLCache("housing_sites", ttl=CACHE_TTL, max_entries=2048, persistent_ttl=namespace_ttl("housing_sites"))
+FLIGHT = get_flight("housing_sites")
 
 
 class LocationRequest(BaseModel):
@@ -24,40 +26,7 @@ class LocationRequest(BaseModel):
     language: Optional[str] = None
 
 
-def reverse_geocode(lat: float, lon: float) -> Dict[str, str]:
-    try:
-        url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=json&addressdetails=1"
-        resp = requests.get(url, headers={"User-Agent": "UrbanMind"}, timeout=10)
-        data = resp.json()
-        addr = data.get("address", {})
-        return {
-            "country_code": addr.get("country_code", "").lower(),
-            "country_name": addr.get("country", "") or "Unknown",
-            "city": addr.get("city")
-            or addr.get("town")
-            or addr.get("village")
-            or addr.get("municipality")
-            or addr.get("state")
-            or "",
-        }
-    except Exception:
-        return {"country_code": "", "country_name": "Unknown", "city": ""}
-
-
-def geolocate_ip(ip: str) -> Dict[str, str]:
-    try:
-        resp = requests.get(f"https://ipapi.co/{ip}/json/", timeout=10)
-        data = resp.json()
-        return {
-            "country_code": str(data.get("country_code", "")).lower(),
-            "country_name": data.get("country_name", "") or "Unknown",
-            "city": data.get("city", "") or data.get("region", "") or "",
-        }
-    except Exception:
-        return {"country_code": "", "country_name": "Unknown", "city": ""}
-
-
-def ask_ai_for_housing_sites(location_text: str, ui_language: str) -> List[Dict[str, Any]]:
+async def ask_ai_for_housing_sites(location_text: str, ui_language: str) -> List[Dict[str, Any]]:
     ui_language = "en"
     system_prompt = """
 You are an expert housing-market assistant. Given the user's location (city, region, country), return the best relevant online long-term housing and rental websites.
@@ -76,7 +45,7 @@ Rules:
         "Return JSON array only with fields: name, url, description, country_or_region, primary_language."
     )
 
-    resp = client.chat.completions.create(
+    resp = await chat_completion(
         model="gpt-4.1-mini",
         temperature=0.4,
         messages=[
@@ -108,23 +77,12 @@ Rules:
     return result
 
 
-def get_cache(key: str):
-    entry = CACHE.get(key)
-    if entry and entry["expires"] > time.time():
-        return entry["data"]
-    return None
-
-
-def set_cache(key: str, data: Dict[str, Any]):
-    CACHE[key] = {"data": data, "expires": time.time() + CACHE_TTL}
-
-
 @router.post("/get_housing_sites")
 async def get_housing_sites(req: LocationRequest, request: Request):
     ui_lang = "en"
 
     if req.latitude and req.longitude:
-        geo = reverse_geocode(req.latitude, req.longitude)
+        geo = await reverse_geocode(req.latitude, req.longitude)
     elif req.country_code:
         geo = {
             "country_code": req.country_code.lower(),
@@ -133,7 +91,7 @@ async def get_housing_sites(req: LocationRequest, request: Request):
         }
     else:
         ip = request.client.host
-        geo = geolocate_ip(ip)
+        geo = await geolocate_ip(ip)
 
     country_code = geo["country_code"]
     country_name = geo["country_name"]
@@ -149,19 +107,22 @@ async def get_housing_sites(req: LocationRequest, request: Request):
     )
 
     cache_key = f"{country_code}:{city}:{ui_lang}"
-    cached = get_cache(cache_key)
+    cached = CACHE.get(cache_key)
     if cached:
         return cached
 
-    sites = ask_ai_for_housing_sites(location_text, ui_lang)
+    async def fetch():
+        sites = await ask_ai_for_housing_sites(location_text, ui_lang)
+
+        response = {
+            "country_code": country_code,
+            "country_name": country_name,
+            "city": city,
+            "location_text_used": location_text,
+            "sites": sites,
+        }
 
-    response = {
-        "country_code": country_code,
-        "country_name": country_name,
-        "city": city,
-        "location_text_used": location_text,
-        "sites": sites,
-    }
+        CACHE.set(cache_key, response)
+        return response
 
-    set_cache(cache_key, response)
-    return response
+    return await FLIGHT.do(cache_key, fetch)
@@ -0,0 +1,107 @@
+"""
+Normalization of uploaded photos (passports, IDs) before they go to Vision.
+
+Each image is rotated upright from its EXIF orientation and scaled down so its
+longer edge is at most IMAGE_MAX_EDGE. It is then re-encoded as JPEG (or WebP
+with IMAGE_FORMAT=webp) at IMAGE_QUALITY with no metadata, so GPS tags and
+camera details are not passed on. JPEGs are decoded at reduced size where
+possible, which makes a 12 MP phone photo much cheaper to open.
+
+Needs Pillow; without it images are passed through unchanged.
+normalize_image_bytes runs in the document worker pool (see
+document_extraction.normalize_image).
+"""
+import io
+import os
+import time
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+try:
+    from PIL import Image, ImageOps
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+load_dotenv()
+
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1600"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "jpeg").lower()
+
+_LOSSLESS = {"PNG", "GIF"}
+
+
+def image_settings() -> str:
+    """Identifies the output of normalize_image_bytes, for cache keys."""
+    return f"{IMAGE_MAX_EDGE}:{IMAGE_QUALITY}:{IMAGE_FORMAT}:{int(HAS_PILLOW)}"
+
+
+def _flatten(image: "Image.Image") -> "Image.Image":
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def normalize_image_bytes(data: bytes, mime: str = "") -> Dict[str, Any]:
+    """
+    Returns {"data", "mime", "width", "height", "original_width",
+    "original_height", "original_bytes", "bytes", "rotated", "resized", "ms"}.
+    """
+    start = time.perf_counter()
+    if not HAS_PILLOW:
+        return {
+            "data": data, "mime": mime, "width": 0, "height": 0, "original_width": 0, "original_height": 0,
+            "original_bytes": len(data), "bytes": len(data), "rotated": False, "resized": False,
+            "ms": 0.0,
+        }
+
+    image = Image.open(io.BytesIO(data))
+    source_format = image.format or ""
+    original_size = image.size
+    if source_format == "JPEG":
+        # let libjpeg decode at 1/2, 1/4 or 1/8 scale when that still covers the target size
+        image.draft("RGB", (IMAGE_MAX_EDGE, IMAGE_MAX_EDGE))
+
+    rotated = image.getexif().get(0x0112, 1) != 1  # EXIF Orientation
+    image = _flatten(ImageOps.exif_transpose(image))
+
+    resized = max(original_size) > IMAGE_MAX_EDGE
+    if max(image.size) > IMAGE_MAX_EDGE:
+        image.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.LANCZOS)
+
+    out = io.BytesIO()
+    if IMAGE_FORMAT == "webp":
+        image.save(out, "WEBP", quality=IMAGE_QUALITY, method=4)
+        mime = "image/webp"
+    else:
+        image.save(out, "JPEG", quality=IMAGE_QUALITY, optimize=True)
+        mime = "image/jpeg"
+    encoded = out.getvalue()
+
+    if len(encoded) >= len(data) and not resized and not rotated and source_format in _LOSSLESS:
+        # small screenshots and scans compress better losslessly; re-save without metadata
+        out = io.BytesIO()
+        image.save(out, "PNG", optimize=True)
+        if len(out.getvalue()) < len(encoded):
+            encoded, mime = out.getvalue(), "image/png"
+
+    return {
+        "data": encoded,
+        "mime": mime,
+        "width": image.width,
+        "height": image.height,
+        "original_width": original_size[0],
+        "original_height": original_size[1],
+        "original_bytes": len(data),
+        "bytes": len(encoded),
+        "rotated": rotated,
+        "resized": resized,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
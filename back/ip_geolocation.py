@@ -0,0 +1,202 @@
+"""
+Local IP -> country/city lookup over a CIDR or start/end range dataset.
+
+The dataset is a CSV with a header and either a `network` column (CIDR, as in
+GeoLite2/IP2Location "country" exports) or `start_ip` / `end_ip` columns, plus
+`country_code`, `country_name` and an optional `city`. IPv4 and IPv6 rows may
+be mixed, and the file may be gzipped. It is re-read when its mtime changes,
+so it can be replaced on disk without restarting the server.
+
+No dataset ships with the code. `python back/data/build_ip_ranges.py` builds
+data/ip_ranges.csv.gz from the Regional Internet Registries' daily delegation
+files; without it every lookup goes to ipapi.co.
+"""
+import bisect
+import csv
+import gzip
+import ipaddress
+import logging
+import os
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from back.cache import TTLCache
+
+IP_GEO_DB = os.getenv("IP_GEO_DB", os.path.join(os.path.dirname(__file__), "data", "ip_ranges.csv.gz"))
+RELOAD_CHECK_INTERVAL = 30
+
+IP_LOOKUP_CACHE = TTLCache("ip_lookup_local", ttl=6 * 60 * 60, max_entries=50000)
+
+logger = logging.getLogger("ip_geolocation")
+
+
+class _RangeTable:
+    def __init__(self, starts, ends, record_ids: array):
+        self.starts = starts
+        self.ends = ends
+        self.record_ids = record_ids
+
+    def find(self, value: int) -> int:
+        i = bisect.bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i]:
+            return self.record_ids[i]
+        return -1
+
+
+class IPGeoDatabase:
+    """Sorted, non-overlapping integer ranges per address family, searched with bisect."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = 0.0
+        self.records: List[Dict[str, str]] = []
+        self.v4 = _RangeTable(array("Q"), array("Q"), array("I"))
+        self.v6 = _RangeTable([], [], array("I"))
+        self.loaded_at = 0.0
+        self._last_check = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.v4.starts) + len(self.v6.starts)
+
+    @staticmethod
+    def _parse_row(row: Dict[str, str]) -> Optional[Tuple[int, int, int]]:
+        network = (row.get("network") or "").strip()
+        if network:
+            net = ipaddress.ip_network(network, strict=False)
+            return net.version, int(net.network_address), int(net.broadcast_address)
+        start = ipaddress.ip_address((row.get("start_ip") or "").strip())
+        end = ipaddress.ip_address((row.get("end_ip") or "").strip())
+        if start.version != end.version:
+            return None
+        return start.version, int(start), int(end)
+
+    def load(self) -> int:
+        mtime = os.path.getmtime(self.path)
+        records: List[Dict[str, str]] = []
+        record_index: Dict[Tuple[str, str, str], int] = {}
+        rows = {4: [], 6: []}
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rt", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    parsed = self._parse_row(row)
+                except ValueError:
+                    continue
+                if parsed is None:
+                    continue
+                version, start, end = parsed
+                key = (
+                    (row.get("country_code") or "").strip().lower(),
+                    (row.get("country_name") or "").strip(),
+                    (row.get("city") or "").strip(),
+                )
+                rid = record_index.get(key)
+                if rid is None:
+                    rid = record_index[key] = len(records)
+                    records.append({"country_code": key[0], "country_name": key[1] or "Unknown", "city": key[2]})
+                rows[version].append((start, end, rid))
+
+        for version in rows:
+            rows[version].sort()
+        v4 = _RangeTable(
+            array("Q", (r[0] for r in rows[4])),
+            array("Q", (r[1] for r in rows[4])),
+            array("I", (r[2] for r in rows[4])),
+        )
+        v6 = _RangeTable([r[0] for r in rows[6]], [r[1] for r in rows[6]], array("I", (r[2] for r in rows[6])))
+
+        # swap everything at once so concurrent lookups never see a half-built table
+        with self._lock:
+            self.records, self.v4, self.v6 = records, v4, v6
+            self.mtime = mtime
+            self.loaded_at = time.time()
+        IP_LOOKUP_CACHE.clear()
+        return len(self)
+
+    def maybe_reload(self) -> None:
+        now = time.time()
+        if now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        try:
+            changed = os.path.getmtime(self.path) != self.mtime
+        except OSError:
+            return
+        if changed and not self._reloading:
+            # parsing a full dataset takes seconds; keep serving the old table meanwhile
+            self._reloading = True
+            threading.Thread(target=self._reload, daemon=True).start()
+
+    def _reload(self) -> None:
+        try:
+            self.load()
+        except (OSError, EOFError, csv.Error):
+            pass
+        finally:
+            self._reloading = False
+
+    def lookup(self, ip: str) -> Optional[Dict[str, str]]:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if addr.version == 6 and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped
+        if not addr.is_global:
+            return None
+        with self._lock:
+            table = self.v4 if addr.version == 4 else self.v6
+            records = self.records
+        rid = table.find(int(addr))
+        return dict(records[rid]) if rid >= 0 else None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "path": self.path,
+            "ipv4_ranges": len(self.v4.starts),
+            "ipv6_ranges": len(self.v6.starts),
+            "records": len(self.records),
+            "loaded_at": self.loaded_at,
+        }
+
+
+_db: Optional[IPGeoDatabase] = None
+_db_missing = False
+
+
+def get_ip_database() -> Optional[IPGeoDatabase]:
+    """The local database, or None when no dataset file is available (checked once per process)."""
+    global _db, _db_missing
+    if _db is None and not _db_missing:
+        db = IPGeoDatabase(IP_GEO_DB)
+        try:
+            db.load()
+        except (OSError, EOFError, csv.Error) as e:
+            _db_missing = True
+            logger.warning(
+                "No local IP dataset at %s (%s); IP lookups go to ipapi.co. "
+                "Build one with: python back/data/build_ip_ranges.py",
+                IP_GEO_DB,
+                e.__class__.__name__,
+            )
+            return None
+        _db = db
+    return _db
+
+
+def lookup_ip(ip: str) -> Optional[Dict[str, str]]:
+    db = get_ip_database()
+    if db is None:
+        return None
+    db.maybe_reload()
+    cached = IP_LOOKUP_CACHE.get(ip)
+    if cached is not None:
+        return dict(cached) if cached else None
+    geo = db.lookup(ip)
+    # misses are cached as {} so unknown addresses don't re-run the search
+    IP_LOOKUP_CACHE.set(ip, geo or {})
+    return geo
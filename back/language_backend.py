@@ -1,15 +1,14 @@
-import os
 import json
 from typing import List, Literal, Optional, Dict, Any
 
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
-from openai import OpenAI
+
+from back.llm_gateway import chat_completion
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 router = APIRouter()
 
 COOKIE_NAME = "language_tutor_state"
@@ -194,7 +193,7 @@ async def language_chat(payload: LanguageChatRequest, request: Request, response
             messages_for_model.append({"role": m.role, "content": m.content})
 
     try:
-        resp = client.chat.completions.create(
+        resp = await chat_completion(
             model="gpt-4.1-mini",
             messages=messages_for_model,
             temperature=0.4,
@@ -202,6 +201,8 @@ async def language_chat(payload: LanguageChatRequest, request: Request, response
         )
         content = resp.choices[0].message.content
         data: Dict[str, Any] = json.loads(content)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Language tutor error: {str(e)}")
 
@@ -257,7 +258,7 @@ async def check_answers(payload: CheckRequest):
             }
         ]
 
-        resp = client.chat.completions.create(
+        resp = await chat_completion(
             model="gpt-4.1-mini",
             messages=messages,
             temperature=0.3,
@@ -267,5 +268,7 @@ async def check_answers(payload: CheckRequest):
         data = json.loads(resp.choices[0].message.content)
         return {"status": "success", "data": data}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,111 @@
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from openai.types.audio import Transcription
+from openai.types.chat import ChatCompletion
+
+from back.admission import admit
+from back.traffic_replay import dump_binary, load_binary, recorded, recorded_stream
+
+load_dotenv()
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_client() -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            ),
+        )
+        _client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=http_client,
+            max_retries=LLM_MAX_RETRIES,
+        )
+    return _client
+
+
+def _dump_transcription(result: Any) -> Dict[str, Any]:
+    # response_format="text" makes the SDK return a bare str
+    if isinstance(result, str):
+        return {"text": result, "raw": True}
+    return {"text": result.text, "raw": False}
+
+
+def _load_transcription(data: Dict[str, Any]) -> Any:
+    return data["text"] if data.get("raw") else Transcription(text=data["text"])
+
+
+async def chat_completion(timeout: Optional[float] = None, **kwargs: Any):
+    """Await a chat completion through the shared pooled client."""
+    async with admit(kwargs.get("model")):
+        return await recorded(
+            "chat",
+            kwargs,
+            lambda: get_client().chat.completions.create(timeout=timeout or LLM_TIMEOUT, **kwargs),
+            dump=lambda resp: resp.model_dump(mode="json"),
+            load=ChatCompletion.model_validate,
+        )
+
+
+async def _stream_deltas(timeout: Optional[float], kwargs: Dict[str, Any]) -> AsyncIterator[str]:
+    stream = await get_client().chat.completions.create(
+        stream=True,
+        timeout=timeout or LLM_TIMEOUT,
+        **kwargs,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def chat_completion_stream(timeout: Optional[float] = None, **kwargs: Any) -> AsyncIterator[str]:
+    """Yield content deltas of a streamed chat completion as they arrive."""
+    # the slot is held until the last delta, since the upstream is busy until then
+    async with admit(kwargs.get("model")):
+        async for delta in recorded_stream("chat_stream", kwargs, lambda: _stream_deltas(timeout, kwargs)):
+            yield delta
+
+
+async def transcribe(timeout: Optional[float] = None, **kwargs: Any):
+    async with admit(kwargs.get("model")):
+        return await recorded(
+            "transcription",
+            kwargs,
+            lambda: get_client().audio.transcriptions.create(timeout=timeout or LLM_TIMEOUT, **kwargs),
+            dump=_dump_transcription,
+            load=_load_transcription,
+        )
+
+
+async def speech(timeout: Optional[float] = None, **kwargs: Any):
+    async with admit(kwargs.get("model")):
+        return await recorded(
+            "speech",
+            kwargs,
+            lambda: get_client().audio.speech.create(timeout=timeout or LLM_TIMEOUT, **kwargs),
+            dump=dump_binary,
+            load=load_binary,
+        )
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,50 @@
+import resource
+import time
+
+from fastapi import APIRouter
+
+from back.acroform import acroform_stats
+from back.admission import GATES
+from back.cache import CACHES
+from back.doc_retrieval import retrieval_stats
+from back.document_extraction import extraction_stats
+from back.ip_geolocation import get_ip_database
+from back.pdf_rendering import render_stats
+from back.persistent_cache import get_store
+from back.single_flight import FLIGHTS
+from back.template_registry import registry_stats
+from back.sse import STREAM_STATS
+from back.traffic_replay import traffic_stats
+from back.translation_api import translation_cache_stats
+from back.uploads import UPLOAD_STATS
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    store = get_store()
+    ip_db = get_ip_database()
+    return {
+        "status": "success",
+        "data": {
+            "caches": {name: cache.stats() for name, cache in CACHES.items()},
+            "persistent_cache": store.stats() if store is not None else None,
+            "ip_database": ip_db.stats() if ip_db is not None else None,
+            "admission": {model: gate.stats() for model, gate in GATES.items()},
+            "single_flight": {name: flight.stats() for name, flight in FLIGHTS.items()},
+            "streams": STREAM_STATS,
+            "translation": translation_cache_stats(),
+            "documents": extraction_stats(),
+            "retrieval": retrieval_stats(),
+            "pdf_rendering": render_stats(),
+            "acroform": acroform_stats(),
+            "template_registry": registry_stats(),
+            "traffic": traffic_stats(),
+            "uploads": UPLOAD_STATS,
+            "process": {
+                "cpu_seconds": round(time.process_time(), 3),
+                "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            },
+        },
+    }
@@ -1,21 +1,25 @@
 import os
-import io
 import hashlib
 import json
-import time
-from typing import Optional
+from typing import Optional, Union
 from dotenv import load_dotenv
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from .cache import TTLCache
+from .document_extraction import extract_document
+from .uploads import UPLOAD_MAX_CV_BYTES, ingest_upload
+from .pdf_rendering import pdf_response
 from .resume_generator import analyze_cv_text, get_missing_info_prompt, generate_resume_pdf
 
 load_dotenv()
 
 router = APIRouter()
 
-CACHE = {}
 CACHE_TTL = 3600
+CACHE = TTLCache("neurohr_analysis", ttl=CACHE_TTL, max_entries=512, max_bytes=32 * 1024 * 1024)
+# pages of a CV upload are read only until this much text has been collected
+CV_MAX_TOKENS = int(os.getenv("CV_MAX_TOKENS", "8000"))
 
 
 class ResumeMissingRequest(BaseModel):
@@ -39,40 +43,23 @@ def get_hash(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
-def extract_text_from_file(filename: str, data: bytes) -> str:
+async def extract_text_from_file(filename: str, data: Union[bytes, memoryview], digest: Optional[str] = None) -> str:
     name_lower = filename.lower()
     if name_lower.endswith(".txt"):
-        return data.decode("utf-8", errors="ignore")
+        return str(data, "utf-8", errors="ignore")
     if name_lower.endswith(".pdf"):
-        from PyPDF2 import PdfReader
-        reader = PdfReader(io.BytesIO(data))
-        text = "\n".join(page.extract_text() or "" for page in reader.pages).strip()
+        text = (await extract_document("pdf", data, digest=digest, max_tokens=CV_MAX_TOKENS))["text"].strip()
         if not text:
             raise HTTPException(status_code=400, detail="Cannot extract text from PDF.")
         return text
     if name_lower.endswith(".docx"):
-        import docx
-        doc = docx.Document(io.BytesIO(data))
-        text = "\n".join(p.text for p in doc.paragraphs)
+        text = (await extract_document("docx", data, digest=digest, max_tokens=CV_MAX_TOKENS))["text"]
         if not text.strip():
             raise HTTPException(status_code=400, detail="Cannot extract text from DOCX.")
         return text
     raise HTTPException(status_code=400, detail="Unsupported file type.")
 
 
-def cache_get(key: str):
-    entry = CACHE.get(key)
-    if not entry:
-        return None
-    if entry["expires"] < time.time():
-        return None
-    return entry["value"]
-
-
-def cache_set(key: str, value: dict):
-    CACHE[key] = {"value": value, "expires": time.time() + CACHE_TTL}
-
-
 @router.post("/analyze")
 async def analyze_cv(file: UploadFile = File(...)):
     filename = file.filename or "file"
@@ -81,33 +68,31 @@ async def analyze_cv(file: UploadFile = File(...)):
     if ext not in {".pdf", ".docx", ".txt"}:
         raise HTTPException(status_code=400, detail="Unsupported file type.")
 
-    data = await file.read()
-
-    if len(data) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large.")
-
-    cv_text = extract_text_from_file(filename, data)
+    upload = await ingest_upload(file, UPLOAD_MAX_CV_BYTES)
+    cv_text = await extract_text_from_file(filename, upload.view(), upload.digest)
     cv_text = normalize_text(cv_text)
 
     if len(cv_text) < 100:
         raise HTTPException(status_code=400, detail="CV text too short.")
 
     h = get_hash(cv_text)
-    cached = cache_get(h)
+    cached = CACHE.get(h)
 
     if cached:
         return JSONResponse(cached)
 
     try:
-        analysis_text = analyze_cv_text(cv_text)
+        analysis_text = await analyze_cv_text(cv_text)
         result = {
             "status": "success",
             "filename": filename,
             "analysis": analysis_text,
             "cv_text": cv_text,
         }
-        cache_set(h, result)
+        CACHE.set(h, result)
         return JSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"NeuroHR error: {str(e)}")
 
@@ -121,8 +106,10 @@ async def resume_missing(payload: ResumeMissingRequest):
         raise HTTPException(status_code=400, detail="CV text too short.")
 
     try:
-        message = get_missing_info_prompt(cv_text, language)
+        message = await get_missing_info_prompt(cv_text, language)
         return JSONResponse({"status": "success", "message": message})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"NeuroHR error: {str(e)}")
 
@@ -137,8 +124,9 @@ async def resume_generate(payload: ResumeGenerateRequest):
         raise HTTPException(status_code=400, detail="CV text too short.")
 
     try:
-        pdf_buffer = generate_resume_pdf(cv_text, extra_info, payload.format, payload.language)
-        headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-        return StreamingResponse(pdf_buffer, media_type="application/pdf", headers=headers)
+        pdf_file = await generate_resume_pdf(cv_text, extra_info, payload.format, payload.language)
+        return pdf_response(pdf_file, filename)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"NeuroHR error: {str(e)}")
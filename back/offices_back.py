@@ -1,14 +1,13 @@
-import os
 import json
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException
-from openai import OpenAI
 from pydantic import BaseModel
 
+from back.llm_gateway import chat_completion
+
 load_dotenv()
 
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 class OfficesRequest(BaseModel):
@@ -72,7 +71,7 @@ async def get_nearby_offices(payload: OfficesRequest):
             }
         ]
 
-        response = client.chat.completions.create(
+        response = await chat_completion(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.2,
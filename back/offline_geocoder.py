@@ -0,0 +1,190 @@
+import csv
+import gzip
+import math
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+GAZETTEER_PATH = os.getenv(
+    "OFFLINE_GAZETTEER",
+    os.path.join(os.path.dirname(__file__), "data", "cities1000.csv.gz"),
+)
+# The gazetteer (GeoNames places with 1000+ inhabitants, built by
+# data/build_gazetteer.py) has no borders, so the nearest place only answers
+# for points within OFFLINE_GEOCODE_ACCEPT_KM of it, and only if every place
+# of another country is clearly farther: beyond BORDER_RATIO times the distance
+# to the nearest place plus BORDER_MARGIN_KM. Near a border (Kehl and
+# Strasbourg, Vaals and Aachen) that fails and the network geocoder answers.
+OFFLINE_GEOCODE_ACCEPT_KM = float(os.getenv("OFFLINE_GEOCODE_ACCEPT_KM", "10"))
+OFFLINE_GEOCODE_BORDER_RATIO = float(os.getenv("OFFLINE_GEOCODE_BORDER_RATIO", "2"))
+OFFLINE_GEOCODE_BORDER_MARGIN_KM = float(os.getenv("OFFLINE_GEOCODE_BORDER_MARGIN_KM", "1"))
+EARTH_RADIUS_KM = 6371.0
+
+
+def _to_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def _chord2_to_km(chord2: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord2) / 2))
+
+
+class OfflineGeocoder:
+    """
+    Nearest-city reverse geocoder over a bundled gazetteer.
+
+    Points are stored as unit vectors in flat arrays and indexed by an implicit
+    k-d tree (a permutation array where each range's median is its node), so
+    Euclidean chord distance orders neighbours exactly like great-circle distance.
+    """
+
+    def __init__(self, rows: List[Tuple[str, str, str, float, float]]):
+        self.country_codes: List[str] = []
+        self.country_names: List[str] = []
+        self.cities: List[str] = []
+        self._axes = (array("d"), array("d"), array("d"))
+        codes: Dict[str, str] = {}
+        for code, country, city, lat, lon in rows:
+            self.country_codes.append(codes.setdefault(code, code.lower()))
+            self.country_names.append(country)
+            self.cities.append(city)
+            for axis, value in zip(self._axes, _to_xyz(lat, lon)):
+                axis.append(value)
+        self._tree = array("i", range(len(self.cities)))
+        self._build(0, len(self._tree), 0)
+
+    @classmethod
+    def from_csv(cls, path: str = GAZETTEER_PATH) -> "OfflineGeocoder":
+        rows = []
+        # one string object per country instead of one per city
+        shared: Dict[str, str] = {}
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            try:
+                columns = [header.index(name) for name in ("country_code", "country_name", "city", "lat", "lon")]
+            except ValueError:
+                return cls([])
+            for row in reader:
+                try:
+                    code, country, city, lat, lon = (row[i] for i in columns)
+                    rows.append((shared.setdefault(code, code), shared.setdefault(country, country), city, float(lat), float(lon)))
+                except (IndexError, ValueError):
+                    continue
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def _build(self, lo: int, hi: int, depth: int) -> None:
+        if hi - lo <= 1:
+            return
+        coords = self._axes[depth % 3]
+        self._tree[lo:hi] = array("i", sorted(self._tree[lo:hi], key=coords.__getitem__))
+        mid = (lo + hi) // 2
+        self._build(lo, mid, depth + 1)
+        self._build(mid + 1, hi, depth + 1)
+
+    def nearest(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Index of the nearest city and its distance in km (-1 if empty)."""
+        if not self.cities:
+            return -1, float("inf")
+        point = _to_xyz(lat, lon)
+        best = [float("inf"), -1]
+        self._search(0, len(self._tree), 0, point, best)
+        return best[1], _chord2_to_km(best[0])
+
+    def _search(self, lo: int, hi: int, depth: int, point: tuple, best: list) -> None:
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        idx = self._tree[mid]
+        xs, ys, zs = self._axes
+        dx = xs[idx] - point[0]
+        dy = ys[idx] - point[1]
+        dz = zs[idx] - point[2]
+        d2 = dx * dx + dy * dy + dz * dz
+        if d2 < best[0]:
+            best[0] = d2
+            best[1] = idx
+        axis = depth % 3
+        diff = point[axis] - self._axes[axis][idx]
+        if diff < 0:
+            self._search(lo, mid, depth + 1, point, best)
+            if diff * diff < best[0]:
+                self._search(mid + 1, hi, depth + 1, point, best)
+        else:
+            self._search(mid + 1, hi, depth + 1, point, best)
+            if diff * diff < best[0]:
+                self._search(lo, mid, depth + 1, point, best)
+
+    def within(self, lat: float, lon: float, km: float) -> List[Tuple[int, float]]:
+        """Indexes of the cities within `km` of the point with their distances, nearest first."""
+        if not self.cities:
+            return []
+        # chord length of the great-circle distance
+        chord = 2 * math.sin(min(math.pi / 2, km / (2 * EARTH_RADIUS_KM)))
+        found: List[Tuple[float, int]] = []
+        self._collect(0, len(self._tree), 0, _to_xyz(lat, lon), chord * chord, found)
+        return [(idx, _chord2_to_km(d2)) for d2, idx in sorted(found)]
+
+    def _collect(self, lo: int, hi: int, depth: int, point: tuple, limit2: float, found: list) -> None:
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        idx = self._tree[mid]
+        xs, ys, zs = self._axes
+        dx = xs[idx] - point[0]
+        dy = ys[idx] - point[1]
+        dz = zs[idx] - point[2]
+        d2 = dx * dx + dy * dy + dz * dz
+        if d2 <= limit2:
+            found.append((d2, idx))
+        diff = point[depth % 3] - self._axes[depth % 3][idx]
+        if diff < 0 or diff * diff <= limit2:
+            self._collect(lo, mid, depth + 1, point, limit2, found)
+        if diff >= 0 or diff * diff <= limit2:
+            self._collect(mid + 1, hi, depth + 1, point, limit2, found)
+
+    def lookup(
+        self,
+        lat: float,
+        lon: float,
+        accept_km: float = OFFLINE_GEOCODE_ACCEPT_KM,
+        border_ratio: float = OFFLINE_GEOCODE_BORDER_RATIO,
+        border_margin_km: float = OFFLINE_GEOCODE_BORDER_MARGIN_KM,
+    ) -> Optional[Dict[str, str]]:
+        """
+        The nearest place, if the answer is unambiguous: the point is within
+        accept_km of it and no place of another country is within
+        border_ratio * that distance + border_margin_km. None otherwise, for
+        the caller to ask the network geocoder.
+        """
+        idx, km = self.nearest(lat, lon)
+        if idx < 0 or km > accept_km:
+            return None
+        code = self.country_codes[idx]
+        if any(self.country_codes[other] != code for other, _ in self.within(lat, lon, border_ratio * km + border_margin_km)):
+            return None
+        return {
+            "country_code": code,
+            "country_name": self.country_names[idx],
+            "city": self.cities[idx],
+        }
+
+
+_geocoder: Optional[OfflineGeocoder] = None
+
+
+def get_offline_geocoder() -> OfflineGeocoder:
+    global _geocoder
+    if _geocoder is None:
+        try:
+            _geocoder = OfflineGeocoder.from_csv(GAZETTEER_PATH)
+        except OSError:
+            _geocoder = OfflineGeocoder([])
+    return _geocoder
@@ -0,0 +1,292 @@
+"""
+Shared PDF rendering for generated resumes and filled forms.
+
+The PdfRenderer registers the Noto Sans fonts and builds every ParagraphStyle
+once. It is created at startup (get_renderer) and then only read, so renders
+can run in parallel on a small thread pool rather than on the event loop.
+
+Finished documents are written to a SpooledTemporaryFile (kept in memory up to
+PDF_SPOOL_MAX_BYTES, written to disk above that). pdf_response streams that file to the client
+in chunks, with a Content-Length, and closes it when done.
+"""
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any, Dict, List, Optional, Union
+
+from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_LEFT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+load_dotenv()
+
+# reportlab is pure Python and holds the GIL: extra threads add little throughput
+# but each one holds a full document's working set in memory
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "1"))
+# finished PDFs above this go to disk while they are downloaded
+PDF_SPOOL_MAX_BYTES = int(os.getenv("PDF_SPOOL_MAX_BYTES", str(64 * 1024)))
+PDF_STREAM_CHUNK = int(os.getenv("PDF_STREAM_CHUNK", str(64 * 1024)))
+FONTS_DIR = os.path.join(os.path.dirname(__file__), "fonts")
+
+RENDER_STATS: Dict[str, Any] = {"resume": 0, "form": 0, "render_seconds": 0.0, "max_render_ms": 0.0}
+
+_renderer: Optional["PdfRenderer"] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _register_font(name: str, filename: str, fallback: str) -> str:
+    if name in pdfmetrics.getRegisteredFontNames():
+        return name
+    path = os.path.join(FONTS_DIR, filename)
+    if not os.path.exists(path):
+        return fallback
+    pdfmetrics.registerFont(TTFont(name, path))
+    return name
+
+
+class PdfRenderer:
+    def __init__(self):
+        regular = _register_font("NotoSans", "NotoSans-Regular.ttf", "Helvetica")
+        bold = _register_font("NotoSans-Bold", "NotoSans-Bold.ttf", "Helvetica-Bold")
+        self.regular_font = regular
+        self.bold_font = bold
+
+        styles = getSampleStyleSheet()
+        self.cv_title = ParagraphStyle(
+            "CVTitle", parent=styles["Title"], fontName=bold, fontSize=22, leading=26, alignment=TA_LEFT, spaceAfter=8
+        )
+        self.cv_heading = ParagraphStyle(
+            "SectionHeading",
+            parent=styles["Heading2"],
+            fontName=bold,
+            fontSize=12,
+            leading=15,
+            spaceBefore=8,
+            spaceAfter=4,
+            textTransform="uppercase",
+        )
+        self.cv_text = ParagraphStyle(
+            "NormalText", parent=styles["Normal"], fontName=regular, fontSize=10, leading=13, spaceAfter=2
+        )
+        self.cv_bullet = ParagraphStyle(
+            "BulletText",
+            parent=styles["Normal"],
+            fontName=regular,
+            fontSize=10,
+            leading=13,
+            leftIndent=12,
+            bulletIndent=0,
+            spaceAfter=1,
+        )
+        self.cv_dot = ParagraphStyle("Dot", fontName=bold, fontSize=10)
+
+        self.form_text = ParagraphStyle(
+            "NormalText", parent=styles["Normal"], fontName=regular, fontSize=11, leading=14, spaceAfter=6, alignment=TA_LEFT
+        )
+        self.form_heading = ParagraphStyle(
+            "Heading", parent=self.form_text, fontName=bold, fontSize=14, spaceAfter=8, spaceBefore=12
+        )
+        self.form_subheading = ParagraphStyle(
+            "Subheading", parent=self.form_text, fontName=bold, fontSize=12, spaceAfter=6, spaceBefore=8
+        )
+
+        self.table_style = [
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("LEFTPADDING", (0, 0), (-1, -1), 4),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+            ("TOPPADDING", (0, 0), (-1, -1), 2),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+            ("FONTNAME", (0, 0), (-1, -1), regular),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ]
+        self.header_style = TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, -1), colors.whitesmoke),
+                ("LEFTPADDING", (0, 0), (-1, -1), 8),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+                ("TOPPADDING", (0, 0), (-1, -1), 6),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+                ("LINEBELOW", (0, 0), (-1, -1), 1, colors.lightgrey),
+            ]
+        )
+        self.section_style = TableStyle(
+            [
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+            ]
+        )
+        self.rule_style = TableStyle([("LINEBELOW", (0, 0), (-1, -1), 0.7, colors.lightgrey)])
+
+    @staticmethod
+    def _document(buffer: IO[bytes]) -> SimpleDocTemplate:
+        return SimpleDocTemplate(buffer, pagesize=A4, leftMargin=40, rightMargin=40, topMargin=40, bottomMargin=40)
+
+    def resume(self, markdown_text: str, out: IO[bytes]) -> None:
+        """Write a CV from the model's markdown (# name, ## sections, - bullets, | tables |) to out."""
+        doc = self._document(out)
+        story: List[Any] = []
+        current_table: List[List[str]] = []
+
+        def flush_table():
+            if not current_table:
+                return
+            table = Table(list(current_table), hAlign="LEFT")
+            style_cmds = list(self.table_style)
+            if len(current_table) > 1:
+                style_cmds.append(("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey))
+                style_cmds.append(("TEXTCOLOR", (0, 0), (-1, 0), colors.black))
+            table.setStyle(TableStyle(style_cmds))
+            story.append(table)
+            story.append(Spacer(1, 6))
+            current_table.clear()
+
+        for raw_line in markdown_text.splitlines():
+            stripped = raw_line.strip()
+
+            if stripped.startswith("|") and stripped.endswith("|"):
+                current_table.append([cell.strip() for cell in stripped.strip("|").split("|")])
+                continue
+            flush_table()
+
+            if stripped == "":
+                story.append(Spacer(1, 4))
+            elif stripped.startswith("# "):
+                header_table = Table([[Paragraph(stripped[2:].strip(), self.cv_title)]], colWidths=[doc.width])
+                header_table.setStyle(self.header_style)
+                story.append(header_table)
+                story.append(Spacer(1, 10))
+            elif stripped.startswith("## "):
+                section_table = Table(
+                    [[Paragraph("•", self.cv_dot), Paragraph(stripped[3:].strip().upper(), self.cv_heading)]],
+                    colWidths=[10, doc.width - 10],
+                )
+                section_table.setStyle(self.section_style)
+                story.append(section_table)
+                story.append(Spacer(1, 2))
+                line_table = Table([[""]], colWidths=[doc.width])
+                line_table.setStyle(self.rule_style)
+                story.append(line_table)
+                story.append(Spacer(1, 4))
+            elif stripped.startswith("- "):
+                story.append(Paragraph(stripped[2:].strip(), self.cv_bullet, bulletText="•"))
+            else:
+                story.append(Paragraph(stripped, self.cv_text))
+        flush_table()
+
+        doc.build(story)
+
+    def form(self, text: str, out: IO[bytes]) -> None:
+        """Write a filled form to out: one paragraph per line, # and ## lines as headings."""
+        story: List[Any] = []
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                story.append(Spacer(1, 6))
+            elif line.startswith("# "):
+                story.append(Paragraph(line[2:].strip(), self.form_heading))
+            elif line.startswith("## "):
+                story.append(Paragraph(line[3:].strip(), self.form_subheading))
+            else:
+                story.append(Paragraph(line, self.form_text))
+        self._document(out).build(story)
+
+
+def get_renderer() -> PdfRenderer:
+    global _renderer
+    if _renderer is None:
+        _renderer = PdfRenderer()
+    return _renderer
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PDF_RENDER_WORKERS, thread_name_prefix="pdf-render")
+    return _executor
+
+
+def _timed(kind: str, text: str) -> SpooledTemporaryFile:
+    start = time.perf_counter()
+    pdf = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+    try:
+        getattr(get_renderer(), kind)(text, pdf)
+    except Exception:
+        pdf.close()
+        raise
+    pdf.seek(0)
+    elapsed = time.perf_counter() - start
+    RENDER_STATS[kind] += 1
+    RENDER_STATS["render_seconds"] += elapsed
+    RENDER_STATS["max_render_ms"] = max(RENDER_STATS["max_render_ms"], round(elapsed * 1000, 1))
+    return pdf
+
+
+async def render_resume(markdown_text: str) -> SpooledTemporaryFile:
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), _timed, "resume", markdown_text)
+
+
+async def render_form(text: str) -> SpooledTemporaryFile:
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), _timed, "form", text)
+
+
+def pdf_size(pdf: IO[bytes]) -> int:
+    size = pdf.seek(0, io.SEEK_END)
+    pdf.seek(0)
+    return size
+
+
+def pdf_response(
+    pdf: Union[SpooledTemporaryFile, IO[bytes]], filename: str, headers: Optional[Dict[str, str]] = None
+) -> StreamingResponse:
+    """Stream a rendered PDF in PDF_STREAM_CHUNK pieces and close it afterwards."""
+    size = pdf_size(pdf)
+
+    async def chunks():
+        try:
+            while True:
+                # spooled in memory, or a freshly written file still in the page cache
+                chunk = pdf.read(PDF_STREAM_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            pdf.close()
+
+    return StreamingResponse(
+        chunks(),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(size),
+            **(headers or {}),
+        },
+    )
+
+
+def render_stats() -> Dict[str, Any]:
+    renders = RENDER_STATS["resume"] + RENDER_STATS["form"]
+    return {
+        **RENDER_STATS,
+        "render_seconds": round(RENDER_STATS["render_seconds"], 3),
+        "render_ms_avg": round(RENDER_STATS["render_seconds"] / renders * 1000, 1) if renders else 0.0,
+        "workers": PDF_RENDER_WORKERS,
+    }
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
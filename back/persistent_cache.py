@@ -0,0 +1,163 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Unset or empty disables the persistent tier entirely.
+CACHE_DB_PATH = os.getenv("URBANMIND_CACHE_DB", "")
+DEFAULT_PERSISTENT_TTL = float(os.getenv("URBANMIND_CACHE_TTL", str(24 * 60 * 60)))
+# Reads run on the event loop, so they give up quickly on a locked database
+# (a miss is cheaper than a stalled loop). Writes go through a background
+# thread; beyond this many pending ones new writes are dropped.
+CACHE_READ_TIMEOUT = float(os.getenv("URBANMIND_CACHE_READ_TIMEOUT", "0.05"))
+CACHE_WRITE_QUEUE = int(os.getenv("URBANMIND_CACHE_WRITE_QUEUE", "1024"))
+
+
+def namespace_ttl(namespace: str, default: Optional[float] = None) -> float:
+    """TTL for a namespace, overridable with URBANMIND_CACHE_TTL_<NAMESPACE>."""
+    raw = os.getenv(f"URBANMIND_CACHE_TTL_{namespace.upper()}")
+    if raw:
+        try:
+            return float(raw)
+        except ValueError:
+            pass
+    return default if default is not None else DEFAULT_PERSISTENT_TTL
+
+
+class PersistentCache:
+    """
+    SQLite-backed key/value store shared by all workers on a host.
+
+    get reads on the caller's thread with a short busy timeout; set only
+    queues the write for a writer thread, so lock contention between workers
+    never blocks the event loop. Writes are best effort.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._reader = sqlite3.connect(path, timeout=CACHE_READ_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._writes: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=CACHE_WRITE_QUEUE)
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name=f"cache-writer:{path}", daemon=True)
+        self._writer.start()
+        self.counters: Dict[str, Dict[str, int]] = {}
+        atexit.register(self.close)
+
+    def _count(self, namespace: str, field: str) -> None:
+        ns = self.counters.setdefault(namespace, {"hits": 0, "misses": 0, "writes": 0, "dropped": 0, "errors": 0})
+        ns[field] += 1
+
+    def get(self, namespace: str, key: str) -> Optional[tuple]:
+        """Return (value, expires) or None."""
+        try:
+            # expired rows are left for purge_expired: a read never writes
+            with self._read_lock:
+                row = self._reader.execute(
+                    "SELECT value, expires FROM cache WHERE namespace = ? AND key = ? AND expires >= ?",
+                    (namespace, key, time.time()),
+                ).fetchone()
+        except sqlite3.Error:
+            self._count(namespace, "errors")
+            return None
+        if row is None:
+            self._count(namespace, "misses")
+            return None
+        self._count(namespace, "hits")
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            self._count(namespace, "errors")
+            return
+        try:
+            self._writes.put_nowait((namespace, key, payload, time.time() + ttl))
+        except queue.Full:
+            self._count(namespace, "dropped")
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._writes.get()
+            try:
+                if item is None:
+                    return
+                namespace, key, payload, expires = item
+                try:
+                    with self._lock:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                            (namespace, key, payload, expires),
+                        )
+                except sqlite3.Error:
+                    self._count(namespace, "errors")
+                else:
+                    self._count(namespace, "writes")
+            finally:
+                self._writes.task_done()
+
+    def flush(self) -> None:
+        """Wait until the queued writes are in the database."""
+        self._writes.join()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+        return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            with self._read_lock:
+                rows = self._reader.execute("SELECT namespace, COUNT(*) FROM cache GROUP BY namespace").fetchall()
+        except sqlite3.Error:
+            rows = []
+        sizes = dict(rows)
+        return {
+            "path": self.path,
+            "pending_writes": self._writes.qsize(),
+            "namespaces": {
+                ns: {**counters, "entries": sizes.get(ns, 0)} for ns, counters in self.counters.items()
+            },
+        }
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._writes.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+        with self._read_lock:
+            self._reader.close()
+
+
+_store: Optional[PersistentCache] = None
+
+
+def get_store() -> Optional[PersistentCache]:
+    global _store
+    if _store is None and CACHE_DB_PATH:
+        _store = PersistentCache(CACHE_DB_PATH)
+        _store.purge_expired()
+    return _store
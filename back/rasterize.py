@@ -0,0 +1,146 @@
+"""
+PDF page rasterization for the Vision prompts.
+
+The resolution of each page is picked to fit RASTER_PIXEL_BUDGET pixels
+(between RASTER_MIN_DPI and RASTER_MAX_DPI), so a large-format form is not
+sent as a multi-megabyte image. Pages are rendered in grayscale and encoded as
+JPEG, or as WebP when Pillow is installed. Blank margins are cropped away using
+the bounding boxes of what is drawn on the page. Up to RASTER_MAX_PAGES pages
+that have any content are rendered.
+
+render_pages runs in the document worker pool (see
+document_extraction.rasterize_pdf).
+"""
+import io
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from dotenv import load_dotenv
+
+try:
+    import fitz  # PyMuPDF
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+try:
+    from PIL import Image
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+load_dotenv()
+
+# high-detail Vision input is scaled down to 768 px on the short side (~0.83 Mpx for
+# A4), so pixels much beyond that are uploaded only to be thrown away
+RASTER_PIXEL_BUDGET = int(os.getenv("RASTER_PIXEL_BUDGET", str(1_000_000)))
+RASTER_MIN_DPI = float(os.getenv("RASTER_MIN_DPI", "72"))
+RASTER_MAX_DPI = float(os.getenv("RASTER_MAX_DPI", "200"))
+RASTER_FORMAT = os.getenv("RASTER_FORMAT", "jpeg").lower()
+RASTER_QUALITY = int(os.getenv("RASTER_QUALITY", "70"))
+RASTER_GRAYSCALE = os.getenv("RASTER_GRAYSCALE", "1") != "0"
+RASTER_CROP_MARGINS = os.getenv("RASTER_CROP_MARGINS", "1") != "0"
+RASTER_MAX_PAGES = int(os.getenv("RASTER_MAX_PAGES", "3"))
+# whitespace kept around the cropped content, in points
+RASTER_CROP_PADDING = 12.0
+
+# what the old renderer did: page 0 only, 2x zoom (144 dpi), RGB PNG
+LEGACY_ZOOM = 2.0
+
+
+def raster_settings() -> str:
+    """Identifies the output of render_pages, for cache keys."""
+    return (
+        f"{RASTER_PIXEL_BUDGET}:{RASTER_MIN_DPI:g}-{RASTER_MAX_DPI:g}:{output_format()}:{RASTER_QUALITY}:"
+        f"{int(RASTER_GRAYSCALE)}:{int(RASTER_CROP_MARGINS)}"
+    )
+
+
+def output_format() -> str:
+    return "webp" if RASTER_FORMAT == "webp" and HAS_PILLOW else "jpeg"
+
+
+def pick_dpi(width_pt: float, height_pt: float) -> float:
+    """The DPI at which a width x height (points) area fits the pixel budget."""
+    area_in = max(width_pt / 72.0, 1e-3) * max(height_pt / 72.0, 1e-3)
+    return max(RASTER_MIN_DPI, min(RASTER_MAX_DPI, math.sqrt(RASTER_PIXEL_BUDGET / area_in)))
+
+
+def content_rect(page) -> Optional["fitz.Rect"]:
+    """Union of everything drawn on the page, padded; None for a blank page."""
+    page_rect = page.rect
+    box = fitz.Rect()
+    for _, bbox in page.get_bboxlog():
+        rect = fitz.Rect(bbox) & page_rect
+        # white page backgrounds are drawn as a full-page fill
+        if rect.is_empty or rect.contains(page_rect):
+            continue
+        box |= rect
+    if box.is_empty:
+        return None
+    pad = RASTER_CROP_PADDING
+    return fitz.Rect(box.x0 - pad, box.y0 - pad, box.x1 + pad, box.y1 + pad) & page_rect
+
+
+def _encode(pix) -> bytes:
+    if output_format() == "webp":
+        mode = "L" if pix.n == 1 else "RGB"
+        image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+        out = io.BytesIO()
+        image.save(out, "WEBP", quality=RASTER_QUALITY, method=4)
+        return out.getvalue()
+    return pix.tobytes("jpeg", jpg_quality=RASTER_QUALITY)
+
+
+def _render(page, clip) -> Dict[str, Any]:
+    start = time.perf_counter()
+    dpi = int(pick_dpi(clip.width, clip.height))
+    colorspace = fitz.csGRAY if RASTER_GRAYSCALE else fitz.csRGB
+    pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, clip=clip, alpha=False)
+    encoded = _encode(pix)
+    return {
+        "page": page.number,
+        "data": encoded,
+        "mime": f"image/{output_format()}",
+        "dpi": dpi,
+        "width": pix.width,
+        "height": pix.height,
+        "bytes": len(encoded),
+        "legacy_pixels": int(page.rect.width * LEGACY_ZOOM) * int(page.rect.height * LEGACY_ZOOM),
+        "cropped": clip != page.rect,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def render_pages(data: Union[bytes, str], first: int = 0, last: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Render the non-blank pages in [first, last), at most RASTER_MAX_PAGES of them.
+
+    Returns {"images": [{"page", "data", "mime", "dpi", "width", "height",
+    "bytes", "legacy_pixels", "cropped", "ms"}], "total_pages", "engine"}.
+    """
+    images: List[Dict[str, Any]] = []
+    if isinstance(data, str):
+        doc = fitz.open(data)
+    else:
+        doc = fitz.open(stream=data, filetype="pdf")
+    with doc:
+        total = doc.page_count
+        if total == 0:
+            raise ValueError("PDF has no pages")
+        stop = total if last is None else min(last, total)
+        for number in range(first, stop):
+            if len(images) >= RASTER_MAX_PAGES:
+                break
+            page = doc[number]
+            clip = content_rect(page)
+            if clip is None:
+                continue
+            images.append(_render(page, clip if RASTER_CROP_MARGINS else page.rect))
+        if not images:
+            # nothing drawn anywhere: still send a page so the model can see the form is blank
+            page = doc[min(first, total - 1)]
+            images.append(_render(page, page.rect))
+    return {"images": images, "total_pages": total, "engine": "pymupdf"}
@@ -1,20 +1,22 @@
-import os
 import json
-import time
-from typing import Any, Dict, List, Optional
+from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from back.cache import TTLCache
+from back.llm_gateway import chat_completion
+from back.persistent_cache import namespace_ttl
+from back.single_flight import get_flight
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 router = APIRouter()
 
-CACHE: Dict[str, Dict[str, Any]] = {}
 CACHE_TTL = 60 * 60
+CACHE = TTLCache("registration_info", ttl=CACHE_TTL, max_entries=2048, persistent_ttl=namespace_ttl("registration_info"))
+FLIGHT = get_flight("registration_info")
 
 
 class RegistrationRequest(BaseModel):
@@ -39,20 +41,7 @@ class RegistrationInfo(BaseModel):
     immigration_sites: List[ImmigrationSite]
 
 
-def get_cache(key: str) -> Optional[Dict[str, Any]]:
-    entry = CACHE.get(key)
-    if not entry:
-        return None
-    if entry["expires"] < time.time():
-        return None
-    return entry["data"]
-
-
-def set_cache(key: str, data: Dict[str, Any]) -> None:
-    CACHE[key] = {"data": data, "expires": time.time() + CACHE_TTL}
-
-
-def ask_ai_for_registration_info(country_code: str, language: str) -> RegistrationInfo:
+async def ask_ai_for_registration_info(country_code: str, language: str) -> RegistrationInfo:
     system_prompt = (
         "You are an expert in immigration and migrant procedures in European countries. "
         "You always answer with a single JSON object describing how migrants should handle visa or residence permit applications "
@@ -91,7 +80,7 @@ def ask_ai_for_registration_info(country_code: str, language: str) -> Registrati
         "- Do not include any explanatory text outside the JSON object."
     )
 
-    resp = client.chat.completions.create(
+    resp = await chat_completion(
         model="gpt-4.1-mini",
         response_format={"type": "json_object"},
         messages=[
@@ -157,10 +146,13 @@ async def get_registration_info(req: RegistrationRequest) -> RegistrationInfo:
     language = req.language or "en"
     code = req.country_code.lower()
     cache_key = f"{code}:{language}"
-    cached = get_cache(cache_key)
+    cached = CACHE.get(cache_key)
     if cached:
         return RegistrationInfo(**cached)
 
-    info = ask_ai_for_registration_info(code, language)
-    set_cache(cache_key, info.dict())
-    return info
+    async def fetch():
+        info = await ask_ai_for_registration_info(code, language)
+        CACHE.set(cache_key, info.dict())
+        return info
+
+    return await FLIGHT.do(cache_key, fetch)
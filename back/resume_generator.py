@@ -1,11 +1,11 @@
-import os
-import io
+from tempfile import SpooledTemporaryFile
+
 from dotenv import load_dotenv
-from openai import OpenAI
 
-load_dotenv()
+from back.llm_gateway import chat_completion
+from back.pdf_rendering import render_resume
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+load_dotenv()
 
 neurohr_system_prompt = """
 You are an experienced HR specialist and CV reviewer.
@@ -86,13 +86,13 @@ Your goal:
 """
 
 
-def analyze_cv_text(cv_text: str) -> str:
+async def analyze_cv_text(cv_text: str) -> str:
     user_prompt = (
         "Here is the CV text:\n\n"
         f"{cv_text}\n\n"
         "Analyze this CV according to the system instructions."
     )
-    response = client.chat.completions.create(
+    response = await chat_completion(
         model="gpt-4.1-mini",
         messages=[
             {"role": "system", "content": neurohr_system_prompt},
@@ -102,7 +102,7 @@ def analyze_cv_text(cv_text: str) -> str:
     return response.choices[0].message.content
 
 
-def get_missing_info_prompt(cv_text: str, language: str) -> str:
+async def get_missing_info_prompt(cv_text: str, language: str) -> str:
     lang = language or "English"
     user_prompt = (
         f"The user prefers to communicate in: {lang}.\n\n"
@@ -111,7 +111,7 @@ def get_missing_info_prompt(cv_text: str, language: str) -> str:
         "Identify missing or weak sections and ask the user to provide the missing information. "
         "Write the whole answer in the preferred language."
     )
-    response = client.chat.completions.create(
+    response = await chat_completion(
         model="gpt-4.1-mini",
         messages=[
             {"role": "system", "content": resume_missing_system_prompt},
@@ -121,193 +121,7 @@ def get_missing_info_prompt(cv_text: str, language: str) -> str:
     return response.choices[0].message.content
 
 
-def build_pdf_from_text(markdown_text: str) -> io.BytesIO:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_LEFT
-    from reportlab.lib import colors
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-
-    buffer = io.BytesIO()
-
-    fonts_dir = os.path.join(os.path.dirname(__file__), "fonts")
-    regular_path = os.path.join(fonts_dir, "NotoSans-Regular.ttf")
-    bold_path = os.path.join(fonts_dir, "NotoSans-Bold.ttf")
-
-    registered = pdfmetrics.getRegisteredFontNames()
-    if "NotoSans" not in registered:
-        pdfmetrics.registerFont(TTFont("NotoSans", regular_path))
-    if "NotoSans-Bold" not in registered:
-        pdfmetrics.registerFont(TTFont("NotoSans-Bold", bold_path))
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=40,
-        rightMargin=40,
-        topMargin=40,
-        bottomMargin=40,
-    )
-
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle(
-        "CVTitle",
-        parent=styles["Title"],
-        fontName="NotoSans-Bold",
-        fontSize=22,
-        leading=26,
-        alignment=TA_LEFT,
-        spaceAfter=8,
-    )
-
-    h2_style = ParagraphStyle(
-        "SectionHeading",
-        parent=styles["Heading2"],
-        fontName="NotoSans-Bold",
-        fontSize=12,
-        leading=15,
-        spaceBefore=8,
-        spaceAfter=4,
-        textTransform="uppercase",
-    )
-
-    normal_style = ParagraphStyle(
-        "NormalText",
-        parent=styles["Normal"],
-        fontName="NotoSans",
-        fontSize=10,
-        leading=13,
-        spaceAfter=2,
-    )
-
-    bullet_style = ParagraphStyle(
-        "BulletText",
-        parent=styles["Normal"],
-        fontName="NotoSans",
-        fontSize=10,
-        leading=13,
-        leftIndent=12,
-        bulletIndent=0,
-        spaceAfter=1,
-    )
-
-    story = []
-    lines = markdown_text.splitlines()
-
-    current_table = []
-    inside_table = False
-    header_rendered = False
-
-    def flush_table():
-        nonlocal current_table, story
-        if not current_table:
-            return
-        table = Table(current_table, hAlign="LEFT")
-        style_cmds = [
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("LEFTPADDING", (0, 0), (-1, -1), 4),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-            ("TOPPADDING", (0, 0), (-1, -1), 2),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-            ("FONTNAME", (0, 0), (-1, -1), "NotoSans"),
-            ("FONTSIZE", (0, 0), (-1, -1), 9),
-        ]
-        if len(current_table) > 1:
-            style_cmds.append(("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey))
-            style_cmds.append(("TEXTCOLOR", (0, 0), (-1, 0), colors.black))
-        table.setStyle(TableStyle(style_cmds))
-        story.append(table)
-        story.append(Spacer(1, 6))
-        current_table = []
-
-    for raw_line in lines:
-        line = raw_line.rstrip("\n")
-
-        if line.strip().startswith("|") and line.strip().endswith("|"):
-            inside_table = True
-            row = [cell.strip() for cell in line.strip().strip("|").split("|")]
-            current_table.append(row)
-            continue
-        else:
-            if inside_table:
-                flush_table()
-                inside_table = False
-
-        stripped = line.strip()
-
-        if stripped == "":
-            story.append(Spacer(1, 4))
-            continue
-
-        if stripped.startswith("# "):
-            name_text = stripped[2:].strip()
-            header_table = Table([[Paragraph(name_text, title_style)]], colWidths=[doc.width])
-            header_table.setStyle(
-                TableStyle(
-                    [
-                        ("BACKGROUND", (0, 0), (-1, -1), colors.whitesmoke),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-                        ("TOPPADDING", (0, 0), (-1, -1), 6),
-                        ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                        ("LINEBELOW", (0, 0), (-1, -1), 1, colors.lightgrey),
-                    ]
-                )
-            )
-            story.append(header_table)
-            story.append(Spacer(1, 10))
-            header_rendered = True
-            continue
-
-        if stripped.startswith("## "):
-            section_title = stripped[3:].strip().upper()
-            section_table = Table(
-                [[Paragraph("•", ParagraphStyle("Dot", fontName="NotoSans-Bold", fontSize=10)), Paragraph(section_title, h2_style)]],
-                colWidths=[10, doc.width - 10],
-            )
-            section_table.setStyle(
-                TableStyle(
-                    [
-                        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 0),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
-                        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-                    ]
-                )
-            )
-            story.append(section_table)
-            story.append(Spacer(1, 2))
-            line_table = Table([[""]], colWidths=[doc.width])
-            line_table.setStyle(
-                TableStyle(
-                    [
-                        ("LINEBELOW", (0, 0), (-1, -1), 0.7, colors.lightgrey),
-                    ]
-                )
-            )
-            story.append(line_table)
-            story.append(Spacer(1, 4))
-            continue
-
-        if stripped.startswith("- "):
-            text = stripped[2:].strip()
-            story.append(Paragraph(text, bullet_style, bulletText="•"))
-        else:
-            story.append(Paragraph(stripped, normal_style))
-
-    if inside_table:
-        flush_table()
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
-
-def generate_resume_pdf(cv_text: str, extra_info: str, cv_format: str, language: str) -> io.BytesIO:
+async def generate_resume_pdf(cv_text: str, extra_info: str, cv_format: str, language: str) -> SpooledTemporaryFile:
     fmt = (cv_format or "").strip().lower() or "europass"
     lang = language or "English"
     extra = extra_info.strip() if extra_info else ""
@@ -320,7 +134,7 @@ def generate_resume_pdf(cv_text: str, extra_info: str, cv_format: str, language:
         f"{extra if extra else '(no additional info provided)'}\n\n"
         "Generate the final CV in STRICT MARKDOWN according to the system instructions."
     )
-    response = client.chat.completions.create(
+    response = await chat_completion(
         model="gpt-4.1-mini",
         messages=[
             {"role": "system", "content": resume_generate_system_prompt},
@@ -328,4 +142,4 @@ def generate_resume_pdf(cv_text: str, extra_info: str, cv_format: str, language:
         ],
     )
     resume_markdown = response.choices[0].message.content
-    return build_pdf_from_text(resume_markdown)
+    return await render_resume(resume_markdown)
@@ -0,0 +1,95 @@
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+STREAM_STATS: Dict[str, Dict[str, Any]] = {}
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _record(name: str, first_token: Optional[float], total: float, failed: bool) -> None:
+    stats = STREAM_STATS.setdefault(
+        name,
+        {"streams": 0, "errors": 0, "first_token_ms_avg": 0.0, "first_token_ms_max": 0.0, "total_ms_avg": 0.0},
+    )
+    stats["streams"] += 1
+    if failed:
+        stats["errors"] += 1
+    n = stats["streams"]
+    if first_token is not None:
+        ms = first_token * 1000
+        stats["first_token_ms_avg"] += (ms - stats["first_token_ms_avg"]) / n
+        stats["first_token_ms_max"] = max(stats["first_token_ms_max"], ms)
+    stats["total_ms_avg"] += (total * 1000 - stats["total_ms_avg"]) / n
+
+
+async def stream_reply(
+    name: str,
+    deltas: AsyncIterator[str],
+    transform: Any = None,
+    trailer: Iterable[Tuple[str, Any]] = (),
+) -> StreamingResponse:
+    """
+    Forward model deltas as `delta` events, then any trailer events and `done`.
+
+    `transform` is an optional object with feed(str) -> str and flush() -> str
+    for incremental post-processing of the text.
+    """
+    start = time.perf_counter()
+    iterator = deltas.__aiter__()
+    head: List[str] = []
+    # Pull the first delta before committing to a 200, so admission rejections
+    # (429/503 + Retry-After) and upstream failures still reach the client as
+    # real HTTP statuses, like on the non-streaming path.
+    try:
+        head.append(await iterator.__anext__())
+    except StopAsyncIteration:
+        pass
+    except HTTPException:
+        _record(name, None, time.perf_counter() - start, True)
+        raise
+    except Exception as e:
+        _record(name, None, time.perf_counter() - start, True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def all_deltas():
+        for delta in head:
+            yield delta
+        if head:
+            async for delta in iterator:
+                yield delta
+
+    async def body():
+        first_token = None
+        failed = False
+        try:
+            async for delta in all_deltas():
+                text = transform.feed(delta) if transform is not None else delta
+                if not text:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                yield sse_event("delta", {"text": text})
+            if transform is not None:
+                tail = transform.flush()
+                if tail:
+                    yield sse_event("delta", {"text": tail})
+            for event, data in trailer:
+                yield sse_event(event, data)
+            yield sse_event("done", {})
+        except Exception as e:
+            failed = True
+            yield sse_event("error", {"message": str(e)})
+        finally:
+            _record(name, first_token, time.perf_counter() - start, failed)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
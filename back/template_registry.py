@@ -0,0 +1,205 @@
+"""
+Registry of the form templates uploaded to /api/fill_form.
+
+Users fill the same few dozen official forms over and over, so every template
+is fingerprinted by the sha256 of its bytes and its parsed form is kept: the
+AcroForm fields or the field labels learned from the model, the extracted
+text, and the rasterized pages. A known template is not parsed again. Once
+the fields of a template with text are known, the model only gets the compact
+field list instead of the whole template, and compose_filled_text writes the
+answers back into the template text. Scanned templates have no text to write
+into; they still go to the model whole, but from their stored pages.
+
+Records live in a TTLCache, in memory by default. Users sometimes upload a
+form they have already filled in, and a record keeps the template's text and
+pages, so writing them to disk is opt-in: set TEMPLATE_REGISTRY_DB to a SQLite
+file and the registry survives restarts and is shared by all workers on a host.
+The reuse counters are per process.
+"""
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from back.cache import TTLCache
+from back.persistent_cache import PersistentCache
+
+load_dotenv()
+
+TEMPLATE_REGISTRY_DB = os.getenv("TEMPLATE_REGISTRY_DB", "")
+TEMPLATE_REGISTRY_TTL = float(os.getenv("TEMPLATE_REGISTRY_TTL", str(90 * 24 * 60 * 60)))
+TEMPLATE_REGISTRY_MAX_BYTES = int(os.getenv("TEMPLATE_REGISTRY_MAX_BYTES", str(64 * 1024 * 1024)))
+TEMPLATE_MAX_FIELDS = 200
+
+# blanks printed in a form for the user to write on
+BLANK_RE = re.compile(r"_{2,}|\.{3,}|…+")
+
+_registry: Optional["TemplateRegistry"] = None
+
+
+def text_fields(labels: List[Any]) -> List[Dict[str, Any]]:
+    """Field records, shaped like acroform.find_fields', for labels learned from the model."""
+    fields: List[Dict[str, Any]] = []
+    seen = set()
+    for label in labels:
+        label = " ".join(str(label or "").split()).rstrip(":").strip()
+        if not label or label.lower() in seen:
+            continue
+        seen.add(label.lower())
+        fields.append(
+            {"id": f"f{len(fields) + 1}", "name": label, "type": "text", "label": label, "page": 0, "options": [], "max_len": 0}
+        )
+        if len(fields) >= TEMPLATE_MAX_FIELDS:
+            break
+    return fields
+
+
+def _label_spot(lines: List[str], claimed: List[List[Tuple[int, int]]], label: str) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Where a value goes: (line, start of the label, start and end of the span
+    the value replaces). A label followed by nothing but a colon before its
+    blank or the end of the line wins over one with other words in between
+    ("Name (in capitals) ____"), and never takes the blank of another label
+    ("Name" in "Name of employer: ____"). Spans already taken by another
+    field are skipped.
+    """
+    # whole words only, so "Name" doesn't land on the "Surname" line
+    pattern = re.compile(r"(?<!\w)" + re.escape(label) + r"(?!\w)", re.IGNORECASE)
+    fallback = None
+    for index, line in enumerate(lines):
+        for match in pattern.finditer(line):
+            end = match.end()
+            blank = BLANK_RE.search(line, end)
+            if blank:
+                spot = (index, match.start(), blank.start(), blank.end())
+            elif line[end:].strip() in ("", ":"):
+                spot = (index, match.start(), end, len(line))
+            else:
+                continue  # the label is only mentioned in running text here
+            if any(start < spot[3] and spot[1] < stop for start, stop in claimed[index]):
+                continue
+            between = line[end: spot[2]].lstrip(" \t:")
+            if not between.strip():
+                return spot
+            if ":" in between:
+                continue  # another label ends before the blank
+            if fallback is None:
+                fallback = spot
+    return fallback
+
+
+def compose_filled_text(text: Optional[str], fields: List[Dict[str, Any]], values: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """
+    The template text with each value written after its label (over the blank
+    if the line has one). Longer labels are placed first, so "Name of
+    employer" takes its line before "Name" looks for one. Values whose label
+    isn't found are listed at the end as "Label: value". Returns (text, ids of
+    the fields that got a value).
+    """
+    lines = text.splitlines() if text else []
+    claimed: List[List[Tuple[int, int]]] = [[] for _ in lines]
+    edits: List[List[Tuple[int, int, str]]] = [[] for _ in lines]
+    wanted: List[Tuple[Dict[str, Any], str]] = []
+    for field in fields:
+        value = values.get(field["id"])
+        if value is None or value is False or str(value).strip() == "":
+            continue
+        wanted.append((field, "X" if value is True else str(value).strip()))
+
+    placed = set()
+    for field, value in sorted(wanted, key=lambda item: -len(item[0]["label"])):
+        spot = _label_spot(lines, claimed, field["label"])
+        if spot is None:
+            continue
+        index, label_start, start, stop = spot
+        blank = start < stop and BLANK_RE.fullmatch(lines[index], start, stop)
+        edits[index].append((start, stop, value if blank else ": " + value))
+        claimed[index].append((label_start, stop))
+        placed.add(field["id"])
+
+    for index, line_edits in enumerate(edits):
+        line = lines[index]
+        for start, stop, replacement in sorted(line_edits, reverse=True):
+            line = line[:start] + replacement + line[stop:]
+        lines[index] = line
+    extra = [f"{field['label']}: {value}" for field, value in wanted if field["id"] not in placed]
+    if extra and lines:
+        lines.append("")
+    return "\n".join(lines + extra), [field["id"] for field, _ in wanted]
+
+
+class TemplateRegistry:
+    def __init__(self, path: str):
+        self.store = PersistentCache(path) if path else None
+        self.records = TTLCache(
+            "template_registry",
+            ttl=TEMPLATE_REGISTRY_TTL,
+            max_entries=1024,
+            max_bytes=TEMPLATE_REGISTRY_MAX_BYTES,
+            persistent_ttl=TEMPLATE_REGISTRY_TTL if self.store is not None else None,
+            store=self.store,
+        )
+        self.stats_counters: Dict[str, int] = {"lookups": 0, "known": 0, "registered": 0, "schemas_learned": 0}
+
+    def lookup(self, digest: str) -> Optional[Dict[str, Any]]:
+        """The record of a template, counted towards the reuse rate."""
+        record = self.records.get(digest)
+        self.stats_counters["lookups"] += 1
+        if record is not None:
+            self.stats_counters["known"] += 1
+        return record
+
+    def register(
+        self,
+        digest: str,
+        kind: str,
+        fields: List[Dict[str, Any]],
+        text: Optional[str],
+        images: List[str],
+        mime: str,
+    ) -> Dict[str, Any]:
+        """Remember a parsed template: kind "acroform" or "form", images as base64 strings."""
+        record = {
+            "digest": digest,
+            "kind": kind,
+            "fields": fields,
+            "text": text,
+            "images": images,
+            "mime": mime,
+            "registered": time.time(),
+        }
+        self.records.set(digest, record)
+        self.stats_counters["registered"] += 1
+        return record
+
+    def learn_fields(self, record: Dict[str, Any], labels: List[Any]) -> Dict[str, Any]:
+        """Store the field labels the model listed for a template without AcroForm fields."""
+        fields = text_fields(labels)
+        if not fields:
+            return record
+        record = dict(record, fields=fields)
+        self.records.set(record["digest"], record)
+        self.stats_counters["schemas_learned"] += 1
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.stats_counters["lookups"]
+        return {
+            **self.stats_counters,
+            "reuse_rate": round(self.stats_counters["known"] / lookups, 3) if lookups else 0.0,
+            "templates_in_memory": len(self.records),
+            "path": self.store.path if self.store is not None else None,
+        }
+
+
+def get_registry() -> TemplateRegistry:
+    global _registry
+    if _registry is None:
+        _registry = TemplateRegistry(TEMPLATE_REGISTRY_DB)
+    return _registry
+
+
+def registry_stats() -> Dict[str, Any]:
+    return get_registry().stats()
@@ -0,0 +1,31 @@
+"""
+Prompt token counting for budgets and stats.
+
+Uses tiktoken's o200k_base encoding when tiktoken is installed, and a
+chars/4 estimate otherwise.
+"""
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # not installed, or the encoding can't be downloaded
+    _ENCODING = None
+
+CHARS_PER_TOKEN = 4  # rough average for English prose
+
+TOKEN_COUNTER = "tiktoken" if _ENCODING is not None else "chars/4"
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN
+
+
+def clip_tokens(text: str, limit: int) -> str:
+    """The longest prefix of text that is at most `limit` tokens."""
+    if limit <= 0:
+        return ""
+    if _ENCODING is not None:
+        tokens = _ENCODING.encode(text, disallowed_special=())
+        return text if len(tokens) <= limit else _ENCODING.decode(tokens[:limit])
+    return text[: limit * CHARS_PER_TOKEN]
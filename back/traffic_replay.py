@@ -0,0 +1,229 @@
+"""
+Record/replay of upstream traffic (model calls and geocoding lookups).
+
+URBANMIND_TRAFFIC_MODE=record stores every request/response pair under
+URBANMIND_TRAFFIC_DIR/<kind>/<sha256>.json, keyed by a canonical hash of the
+request. URBANMIND_TRAFFIC_MODE=replay serves them from disk without touching
+the network, sleeping for the recorded latency (URBANMIND_REPLAY_LATENCY=
+recorded, the default) or not at all (zero). A request that was never recorded
+raises ReplayMiss.
+
+Scrubbers only rewrite what is written to disk; the key is the hash of the
+original request, so replay still matches exactly.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRAFFIC_MODE = os.getenv("URBANMIND_TRAFFIC_MODE", "off").lower()
+TRAFFIC_DIR = os.getenv("URBANMIND_TRAFFIC_DIR", "recordings")
+REPLAY_LATENCY = os.getenv("URBANMIND_REPLAY_LATENCY", "recorded").lower()
+
+TRAFFIC_STATS: Dict[str, int] = {"recorded": 0, "replayed": 0, "misses": 0}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_RE = re.compile(r"(?<![\w+(])\(?\+?\d[\d ()-]{6,}\d(?!\w)")
+# "2024-01-15 10:30" and "2021-2024" look like numbers too; only real dates
+# and ranges of plausible years are let through ("0221-12 34 56" is a phone)
+DATE_RE = re.compile(r"(?<!\d)(?:19|20)\d{2}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])(?!\d)")
+YEAR_RANGE_RE = re.compile(r"(?<!\d)((?:19|20)\d{2}) ?- ?((?:19|20)\d{2})(?!\d)")
+PHONE_MIN_DIGITS = 9
+IPV4_RE = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
+
+SCRUBBERS: List[Callable[[str], str]] = []
+
+
+class ReplayMiss(RuntimeError):
+    pass
+
+
+def register_scrubber(fn: Callable[[str], str]) -> None:
+    """Add a str -> str hook applied to every string of a recording before it is written."""
+    SCRUBBERS.append(fn)
+
+
+def scrub_contacts(text: str) -> str:
+    text = EMAIL_RE.sub("<email>", text)
+    text = IPV4_RE.sub("<ip>", text)
+    return PHONE_RE.sub(_scrub_phone, text)
+
+
+def _scrub_phone(match: "re.Match[str]") -> str:
+    # an international number is always a phone; otherwise it needs enough
+    # digits and must not be a date or a range of years
+    number = match.group()
+    if number.lstrip("(").startswith("+"):
+        return "<phone>"
+    if sum(c.isdigit() for c in number) < PHONE_MIN_DIGITS or _is_date(number):
+        return number
+    return "<phone>"
+
+
+def _is_date(number: str) -> bool:
+    if DATE_RE.search(number):
+        return True
+    return any(int(first) <= int(last) for first, last in YEAR_RANGE_RE.findall(number))
+
+
+if os.getenv("URBANMIND_TRAFFIC_SCRUB", "1") != "0":
+    register_scrubber(scrub_contacts)
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(value).hexdigest(), "size": len(value)}
+    if isinstance(value, io.BytesIO):
+        return _canonical(value.getvalue())
+    if hasattr(value, "read") and hasattr(value, "seek"):
+        pos = value.tell()
+        data = value.read()
+        value.seek(pos)
+        return _canonical(data)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """sha256 of the request with sorted keys, file contents hashed and the timeout dropped."""
+    body = {k: v for k, v in request.items() if k != "timeout"}
+    raw = json.dumps([kind, _canonical(body)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _scrub(value: Any) -> Any:
+    if isinstance(value, str):
+        for fn in SCRUBBERS:
+            value = fn(value)
+        return value
+    if isinstance(value, dict):
+        return {k: _scrub(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scrub(v) for v in value]
+    return value
+
+
+def _path(kind: str, key: str) -> str:
+    return os.path.join(TRAFFIC_DIR, kind, f"{key}.json")
+
+
+def _write(kind: str, key: str, request: Dict[str, Any], response: Any, latency: float) -> None:
+    path = _path(kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = {
+        "kind": kind,
+        "request": _scrub(_canonical(request)),
+        "response": _scrub(response),
+        "latency": round(latency, 4),
+        "recorded_at": time.time(),
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    TRAFFIC_STATS["recorded"] += 1
+
+
+def _read(kind: str, key: str) -> Dict[str, Any]:
+    try:
+        with open(_path(kind, key), encoding="utf-8") as f:
+            record = json.load(f)
+    except FileNotFoundError:
+        TRAFFIC_STATS["misses"] += 1
+        raise ReplayMiss(f"no recording for {kind} request {key[:12]}")
+    TRAFFIC_STATS["replayed"] += 1
+    return record
+
+
+async def _replay_delay(seconds: float) -> None:
+    if REPLAY_LATENCY != "zero" and seconds > 0:
+        await asyncio.sleep(seconds)
+
+
+async def recorded(
+    kind: str,
+    request: Dict[str, Any],
+    call: Callable[[], Awaitable[Any]],
+    dump: Callable[[Any], Any] = lambda value: value,
+    load: Callable[[Any], Any] = lambda data: data,
+) -> Any:
+    """Run `call` live, record it, or replay it, depending on URBANMIND_TRAFFIC_MODE.
+
+    `dump` turns the live result into JSON-able data, `load` rebuilds it on replay.
+    """
+    if TRAFFIC_MODE == "off":
+        return await call()
+    key = request_key(kind, request)
+    if TRAFFIC_MODE == "replay":
+        record = _read(kind, key)
+        await _replay_delay(record.get("latency", 0.0))
+        return load(record["response"])
+    start = time.perf_counter()
+    result = await call()
+    if TRAFFIC_MODE == "record":
+        _write(kind, key, request, dump(result), time.perf_counter() - start)
+    return result
+
+
+async def recorded_stream(
+    kind: str,
+    request: Dict[str, Any],
+    stream: Callable[[], AsyncIterator[str]],
+) -> AsyncIterator[str]:
+    """Streaming variant of `recorded`; keeps the arrival offset of every delta."""
+    if TRAFFIC_MODE == "off":
+        async for delta in stream():
+            yield delta
+        return
+    key = request_key(kind, request)
+    if TRAFFIC_MODE == "replay":
+        record = _read(kind, key)
+        previous = 0.0
+        for offset, delta in record["response"]:
+            await _replay_delay(offset - previous)
+            previous = offset
+            yield delta
+        return
+    start = time.perf_counter()
+    deltas: List[List[Any]] = []
+    async for delta in stream():
+        deltas.append([round(time.perf_counter() - start, 4), delta])
+        yield delta
+    if TRAFFIC_MODE == "record":
+        _write(kind, key, request, deltas, time.perf_counter() - start)
+
+
+class RecordedBinary:
+    """Minimal stand-in for the SDK's binary response (speech) on replay."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def read(self) -> bytes:
+        return self.content
+
+
+def dump_binary(response: Any) -> Dict[str, str]:
+    return {"base64": base64.b64encode(response.read()).decode("ascii")}
+
+
+def load_binary(data: Dict[str, str]) -> RecordedBinary:
+    return RecordedBinary(base64.b64decode(data["base64"]))
+
+
+def traffic_stats() -> Dict[str, Any]:
+    return {"mode": TRAFFIC_MODE, "dir": TRAFFIC_DIR if TRAFFIC_MODE != "off" else None, **TRAFFIC_STATS}
@@ -1,16 +1,42 @@
-import os
-import io
+import re
+import json
+import asyncio
+import time
+import hashlib
+import unicodedata
 from dotenv import load_dotenv
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional
-from openai import OpenAI
+from typing import Any, Dict, List, Optional, Tuple
+
+from back.admission import fan_out_slots, gather_or_cancel
+from back.cache import TTLCache
+from back.llm_gateway import chat_completion, transcribe
+from back.persistent_cache import namespace_ttl
+from back.uploads import UPLOAD_MAX_AUDIO_BYTES, ingest_upload
 
 load_dotenv()
 
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+TRANSLATION_CACHE_TTL = 7 * 24 * 60 * 60
+TRANSLATION_CACHE = TTLCache(
+    "translation",
+    ttl=TRANSLATION_CACHE_TTL,
+    max_entries=20000,
+    max_bytes=32 * 1024 * 1024,
+    persistent_ttl=namespace_ttl("translation", 30 * 24 * 60 * 60),
+)
+TRANSLATION_STATS = {"upstream_calls": 0, "upstream_seconds": 0.0, "cache_hits": 0, "batch_calls": 0}
+
+BATCH_MAX_SEGMENTS = 500
+BATCH_MAX_TARGETS = 10
+BATCH_CHUNK_CHARS = 6000
+BATCH_CHUNK_SEGMENTS = 60
+# segments a batch reply dropped are retried in smaller batches before one by one
+BATCH_RETRY_SEGMENTS = 15
+BATCH_MODEL = "gpt-4.1-mini"
 
 
 class TranslationRequest(BaseModel):
@@ -19,6 +45,12 @@ class TranslationRequest(BaseModel):
     target_language: str
 
 
+class TranslationBatchRequest(BaseModel):
+    segments: List[str]
+    target_languages: List[str]
+    source_language: Optional[str] = "auto"
+
+
 translation_system_prompt = """
 You are an intelligent multilingual translation assistant.
 
@@ -31,6 +63,76 @@ Your responsibilities:
 - Do not add explanations, comments or quotes around the translation.
 """
 
+batch_translation_system_prompt = """
+You are an intelligent multilingual translation assistant.
+
+You receive a JSON object with source_language, target_language and a list of segments, each with an id and text.
+Translate every segment independently, naturally and fluently, preserving meaning, tone, placeholders and line breaks.
+If source_language = 'auto', detect the language of each segment.
+
+Respond ONLY with a single valid JSON object:
+{"translations": [{"id": "same id as input", "text": "translation"}, ...]}
+
+Return exactly one entry per input id. Do not add explanations.
+"""
+
+
+def normalize_for_cache(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n")
+    return "\n".join(re.sub(r"[ \t]+", " ", line).strip() for line in text.strip().split("\n"))
+
+
+def translation_cache_key(text: str, source: str, target: str) -> str:
+    digest = hashlib.sha256(normalize_for_cache(text).encode("utf-8")).hexdigest()
+    return f"{digest}:{source.lower()}:{target.lower()}"
+
+
+async def translate_text(text: str, source: str, target: str) -> Tuple[str, bool]:
+    """Translate one text, serving repeats from the cache. Returns (translation, cached)."""
+    key = translation_cache_key(text, source, target)
+    cached = TRANSLATION_CACHE.get(key)
+    if cached is not None:
+        TRANSLATION_STATS["cache_hits"] += 1
+        return cached, True
+
+    user_prompt = (
+        f"Source language: {source}\n"
+        f"Target language: {target}\n\n"
+        f"Text:\n{text}\n\n"
+        "Return only the translation."
+    )
+
+    start = time.perf_counter()
+    resp = await chat_completion(
+        model="gpt-4.1-mini",
+        messages=[
+            {"role": "system", "content": translation_system_prompt.strip()},
+            {"role": "user", "content": user_prompt},
+        ],
+        temperature=0.3,
+    )
+    TRANSLATION_STATS["upstream_calls"] += 1
+    TRANSLATION_STATS["upstream_seconds"] += time.perf_counter() - start
+
+    translated = resp.choices[0].message.content.strip()
+    if translated:
+        TRANSLATION_CACHE.set(key, translated)
+    return translated, False
+
+
+def translation_cache_stats() -> Dict[str, Any]:
+    calls = TRANSLATION_STATS["upstream_calls"]
+    hits = TRANSLATION_STATS["cache_hits"]
+    avg_latency = TRANSLATION_STATS["upstream_seconds"] / calls if calls else 0.0
+    return {
+        "hits": hits,
+        "upstream_calls": calls,
+        "hit_rate": round(hits / (hits + calls), 4) if hits + calls else 0.0,
+        "avg_upstream_ms": round(avg_latency * 1000, 1),
+        "saved_seconds_estimate": round(hits * avg_latency, 2),
+        "cache": TRANSLATION_CACHE.stats(),
+    }
+
 
 @router.post("/translation")
 async def translation_endpoint(payload: TranslationRequest):
@@ -44,30 +146,17 @@ async def translation_endpoint(payload: TranslationRequest):
         return JSONResponse({"status": "error", "message": "Target language is required."}, status_code=400)
 
     try:
-        user_prompt = (
-            f"Source language: {source}\n"
-            f"Target language: {target}\n\n"
-            f"Text:\n{text}\n\n"
-            "Return only the translation."
-        )
-
-        resp = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": translation_system_prompt.strip()},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.3,
-        )
-
-        translated = resp.choices[0].message.content.strip()
+        translated, cached = await translate_text(text, source, target)
 
         return JSONResponse(
             {
                 "status": "success",
                 "translated_text": translated,
+                "cached": cached,
             }
         )
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(
             {
@@ -78,6 +167,178 @@ async def translation_endpoint(payload: TranslationRequest):
         )
 
 
+def _chunk_segments(
+    items: List[Tuple[str, str]], max_segments: int = BATCH_CHUNK_SEGMENTS
+) -> List[List[Tuple[str, str]]]:
+    chunks: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    size = 0
+    for seg_id, text in items:
+        if current and (size + len(text) > BATCH_CHUNK_CHARS or len(current) >= max_segments):
+            chunks.append(current)
+            current, size = [], 0
+        current.append((seg_id, text))
+        size += len(text)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _translate_chunk(chunk: List[Tuple[str, str]], source: str, target: str) -> Dict[str, str]:
+    payload = {
+        "source_language": source,
+        "target_language": target,
+        "segments": [{"id": seg_id, "text": text} for seg_id, text in chunk],
+    }
+    start = time.perf_counter()
+    resp = await chat_completion(
+        model=BATCH_MODEL,
+        messages=[
+            {"role": "system", "content": batch_translation_system_prompt.strip()},
+            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+        ],
+        temperature=0.3,
+        response_format={"type": "json_object"},
+    )
+    # a batch call is an upstream call too, or the cache hit rate looks better than it is
+    TRANSLATION_STATS["batch_calls"] += 1
+    TRANSLATION_STATS["upstream_calls"] += 1
+    TRANSLATION_STATS["upstream_seconds"] += time.perf_counter() - start
+    try:
+        data = json.loads(resp.choices[0].message.content)
+    except Exception:
+        return {}
+
+    wanted = {seg_id for seg_id, _ in chunk}
+    out: Dict[str, str] = {}
+    for item in data.get("translations") or []:
+        if not isinstance(item, dict):
+            continue
+        seg_id = str(item.get("id") or "")
+        text = str(item.get("text") or "").strip()
+        if seg_id in wanted and text:
+            out[seg_id] = text
+    return out
+
+
+async def translate_batch(
+    segments: List[str], source: str, target: str, slots: Optional[asyncio.Semaphore] = None
+) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Translate segments into one target: dedupe, serve cache hits, pack the rest
+    into few calls. At most `slots` model calls run at once; pass the same
+    semaphore for every target of a request.
+    """
+    slots = slots or fan_out_slots(BATCH_MODEL)
+
+    async def bounded(call, *args):
+        async with slots:
+            return await call(*args)
+
+    # segments that differ only in whitespace or normalization share a cache key and a translation
+    keys = [translation_cache_key(seg, source, target) if seg.strip() else "" for seg in segments]
+    unique: Dict[str, Tuple[str, str]] = {}
+    for seg, key in zip(segments, keys):
+        if key and key not in unique:
+            unique[key] = (f"s{len(unique)}", seg)
+
+    results: Dict[str, str] = {}
+    pending: List[Tuple[str, str]] = []
+    by_id: Dict[str, str] = {}
+    for key, (seg_id, seg) in unique.items():
+        cached = TRANSLATION_CACHE.get(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending.append((seg_id, seg))
+            by_id[seg_id] = key
+    TRANSLATION_STATS["cache_hits"] += len(unique) - len(pending)
+
+    chunks = _chunk_segments(pending)
+    translated: Dict[str, str] = {}
+    for part in await gather_or_cancel(*(bounded(_translate_chunk, c, source, target) for c in chunks)):
+        translated.update(part)
+    # a malformed or short reply loses its segments; they get one more batch try in smaller chunks
+    retry = _chunk_segments([item for item in pending if item[0] not in translated], BATCH_RETRY_SEGMENTS)
+    for part in await gather_or_cancel(*(bounded(_translate_chunk, c, source, target) for c in retry)):
+        translated.update(part)
+
+    missing = [(key, unique[key][1]) for seg_id, key in by_id.items() if seg_id not in translated]
+    for seg_id, key in by_id.items():
+        if seg_id in translated:
+            results[key] = translated[seg_id]
+            TRANSLATION_CACHE.set(key, translated[seg_id])
+    # whatever is still missing is translated on its own
+    outcomes = await gather_or_cancel(*(bounded(translate_text, seg, source, target) for _, seg in missing))
+    for (key, _), (text, _) in zip(missing, outcomes):
+        results[key] = text
+    fallback = len(missing)
+
+    stats = {
+        "unique": len(unique),
+        "cache_hits": len(unique) - len(pending),
+        "model_calls": len(chunks) + len(retry) + fallback,
+        "retry_calls": len(retry),
+        "fallback_calls": fallback,
+    }
+    return [results.get(key, "") for key in keys], stats
+
+
+@router.post("/translation/batch")
+async def translation_batch_endpoint(payload: TranslationBatchRequest):
+    start = time.perf_counter()
+    segments = [s or "" for s in payload.segments]
+    targets = list(dict.fromkeys(t.strip() for t in payload.target_languages if t and t.strip()))
+    source = (payload.source_language or "auto").strip()
+
+    if not segments or not any(s.strip() for s in segments):
+        return JSONResponse({"status": "error", "message": "No segments to translate."}, status_code=400)
+    if not targets:
+        return JSONResponse({"status": "error", "message": "Target language is required."}, status_code=400)
+    if len(segments) > BATCH_MAX_SEGMENTS or len(targets) > BATCH_MAX_TARGETS:
+        return JSONResponse(
+            {
+                "status": "error",
+                "message": f"Batch too large (max {BATCH_MAX_SEGMENTS} segments, {BATCH_MAX_TARGETS} targets).",
+            },
+            status_code=400,
+        )
+
+    try:
+        # all targets share one bound, so a maximum batch stays within the model's admission gate
+        slots = fan_out_slots(BATCH_MODEL)
+        outcomes = await gather_or_cancel(*(translate_batch(segments, source, target, slots) for target in targets))
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(
+            {
+                "status": "error",
+                "message": f"Translation error: {str(e)}",
+            },
+            status_code=500,
+        )
+
+    results = [
+        {"id": i, "text": seg, "translations": {target: outcomes[t][0][i] for t, target in enumerate(targets)}}
+        for i, seg in enumerate(segments)
+    ]
+    per_target = {target: outcomes[t][1] for t, target in enumerate(targets)}
+    return JSONResponse(
+        {
+            "status": "success",
+            "results": results,
+            "stats": {
+                "segments": len(segments),
+                "targets": len(targets),
+                "model_calls": sum(s["model_calls"] for s in per_target.values()),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                "per_target": per_target,
+            },
+        }
+    )
+
+
 @router.post("/translation/voice")
 async def translation_voice_endpoint(
     audio: UploadFile = File(...),
@@ -91,13 +352,13 @@ async def translation_voice_endpoint(
         return JSONResponse({"status": "error", "message": "Target language is required."}, status_code=400)
 
     try:
-        raw = await audio.read()
-        if not raw:
+        upload = await ingest_upload(audio, UPLOAD_MAX_AUDIO_BYTES)
+        if not upload.size:
             return JSONResponse({"status": "error", "message": "Empty audio file."}, status_code=400)
 
-        audio_file = ("audio.webm", io.BytesIO(raw), audio.content_type or "audio/webm")
+        audio_file = ("audio.webm", upload.file, audio.content_type or "audio/webm")
 
-        transcription = client.audio.transcriptions.create(
+        transcription = await transcribe(
             model="gpt-4o-mini-transcribe",
             file=audio_file,
             response_format="text"
@@ -111,23 +372,7 @@ async def translation_voice_endpoint(
                 status_code=500,
             )
 
-        user_prompt = (
-            f"Source language: {source}\n"
-            f"Target language: {target}\n\n"
-            f"Text:\n{transcribed_text}\n\n"
-            "Return only the translation."
-        )
-
-        resp = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": translation_system_prompt.strip()},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.3,
-        )
-
-        translated = resp.choices[0].message.content.strip()
+        translated, _ = await translate_text(transcribed_text, source, target)
 
         return JSONResponse(
             {
@@ -137,6 +382,8 @@ async def translation_voice_endpoint(
             }
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(
             {
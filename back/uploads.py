@@ -0,0 +1,116 @@
+"""
+Upload ingestion with size limits.
+
+UploadLimitMiddleware counts request body bytes as they arrive and rejects a
+request with 413 as soon as it passes the limit for its path, so an oversized
+upload is never buffered in full. The multipart parser spools each file into a
+SpooledTemporaryFile (memory up to 1 MB, then disk). ingest_upload reads that
+file in chunks, applies the per-file limit and hashes it as it goes. It then
+returns an Upload that gives handlers a memoryview of the file, not another
+full `bytes` copy.
+"""
+import hashlib
+import io
+import mmap
+import os
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+load_dotenv()
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+UPLOAD_MAX_CV_BYTES = int(os.getenv("UPLOAD_MAX_CV_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_MAX_FORM_BYTES = int(os.getenv("UPLOAD_MAX_FORM_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_AUDIO_BYTES = int(os.getenv("UPLOAD_MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+# multipart boundaries, part headers and small form fields on top of the files
+MULTIPART_OVERHEAD = 64 * 1024
+
+UPLOAD_STATS: Dict[str, int] = {"uploads": 0, "bytes": 0, "rejected": 0, "spooled_to_disk": 0}
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Upload exceeds the {limit / (1024 * 1024):.3g} MB limit.")
+
+
+class Upload:
+    """A received upload file, rewound, with its size and sha256 already known."""
+
+    def __init__(self, file, filename: str, content_type: Optional[str], size: int, digest: str):
+        self.file = file
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.digest = digest
+
+    def view(self) -> memoryview:
+        """The upload's bytes without copying them: the spool's own buffer, or an mmap once on disk."""
+        buffer = getattr(self.file, "_file", self.file)
+        if isinstance(buffer, io.BytesIO):
+            # getvalue() hands out BytesIO's internal bytes object rather than a copy
+            return memoryview(buffer.getvalue())
+        if self.size == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(buffer.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+async def ingest_upload(upload: UploadFile, max_bytes: int) -> Upload:
+    """Hash and measure an UploadFile in chunks, raising 413 once it passes max_bytes."""
+    hasher = hashlib.sha256()
+    size = 0
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            UPLOAD_STATS["rejected"] += 1
+            raise UploadTooLarge(max_bytes)
+        hasher.update(chunk)
+    await upload.seek(0)
+
+    UPLOAD_STATS["uploads"] += 1
+    UPLOAD_STATS["bytes"] += size
+    if getattr(upload.file, "_rolled", False):
+        UPLOAD_STATS["spooled_to_disk"] += 1
+    return Upload(upload.file, upload.filename or "", upload.content_type, size, hasher.hexdigest())
+
+
+class UploadLimitMiddleware:
+    """Caps the request body size for the given paths while it is being received."""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope.get("headers") or []).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            UPLOAD_STATS["rejected"] += 1
+            error = UploadTooLarge(limit)
+            await JSONResponse({"detail": error.detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    UPLOAD_STATS["rejected"] += 1
+                    # raised inside the form parser, FastAPI passes HTTPExceptions through as-is
+                    raise UploadTooLarge(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,10 +1,9 @@
-import os
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File
 from fastapi.responses import JSONResponse
-from openai import OpenAI
+
+from back.llm_gateway import chat_completion, speech, transcribe
 
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 @router.post("/translation/voice")
@@ -14,7 +13,7 @@ async def voice_translation(
 ):
     try:
         # 1) SPEECH → TEXT (Whisper)
-        transcript = client.audio.transcriptions.create(
+        transcript = await transcribe(
             model="gpt-4o-mini-tts",
             file=audio.file,
             response_format="text"
@@ -23,7 +22,7 @@ async def voice_translation(
         recognized_text = transcript.strip()
 
         # 2) TEXT → TRANSLATION
-        translation_chat = client.chat.completions.create(
+        translation_chat = await chat_completion(
             model="gpt-4.1-mini",
             messages=[
                 {"role": "system", "content": "Translate the user text fluently. Return only translation."},
@@ -34,7 +33,7 @@ async def voice_translation(
         translated_text = translation_chat.choices[0].message.content.strip()
 
         # 3) TRANSLATION → SPEECH (TTS)
-        tts_response = client.audio.speech.create(
+        tts_response = await speech(
             model="gpt-4o-mini-tts",
             voice="alloy",
             input=translated_text
@@ -49,5 +48,7 @@ async def voice_translation(
             "tts_audio_base64": tts_response._content["audio_base64"]
         })
 
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
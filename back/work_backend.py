@@ -1,14 +1,14 @@
-import os
 from dotenv import load_dotenv
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from openai import OpenAI
+
+from back.llm_gateway import chat_completion, chat_completion_stream
+from back.sse import stream_reply
 
 load_dotenv()
 
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 work_system_prompt = """
 You are an AI assistant for migrants focused on work and education.
@@ -26,6 +26,7 @@ Make the candidate look professional and realistic based on the provided informa
 
 class WorkChatRequest(BaseModel):
     message: str
+    stream: bool = False
 
 class ResumeRequest(BaseModel):
     profile: str
@@ -36,16 +37,21 @@ async def work_chat(data: WorkChatRequest):
     message = data.message.strip()
     if not message:
         return JSONResponse({"status": "error", "message": "Message is empty."}, status_code=400)
+    messages = [
+        {"role": "system", "content": work_system_prompt},
+        {"role": "user", "content": message},
+    ]
+    if data.stream:
+        return await stream_reply("work_chat", chat_completion_stream(model="gpt-4.1-mini", messages=messages))
     try:
-        response = client.chat.completions.create(
+        response = await chat_completion(
             model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": work_system_prompt},
-                {"role": "user", "content": message},
-            ],
+            messages=messages,
         )
         reply = response.choices[0].message.content
         return JSONResponse({"status": "success", "reply": reply})
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse({"status": "error", "message": f"Work chat error: {str(e)}"}, status_code=500)
 
@@ -64,7 +70,7 @@ async def generate_resume(data: ResumeRequest):
             f"User profile:\n{profile}\n\n"
             f"Generate a complete resume in the target language. Return only the resume."
         )
-        response = client.chat.completions.create(
+        response = await chat_completion(
             model="gpt-4.1-mini",
             messages=[
                 {"role": "system", "content": resume_system_prompt},
@@ -79,6 +85,8 @@ async def generate_resume(data: ResumeRequest):
                 "language": target_language,
             }
         )
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(
             {"status": "error", "message": f"Resume generation error: {str(e)}"},
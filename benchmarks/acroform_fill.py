@@ -0,0 +1,87 @@
+"""
+/api/fill_form with a flat PDF template (text extraction, model writes the
+whole filled form, re-rendered with reportlab) vs. the same form as a fillable
+PDF (model gets the field list only, widgets filled in place). Starts the app
+and the OpenAI stub like load_suite and reports latency, the characters sent
+to and returned by the model, and what comes back.
+
+    python benchmarks/acroform_fill.py --pages 2 --requests 10 --latency fixed:0.5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+from load_suite import PASSPORT_TEXT, start_servers  # noqa: E402
+from pdf_corpus import make_fillable_form, make_form  # noqa: E402
+
+
+def run_mode(client: httpx.Client, stub: str, template: bytes, requests: int) -> dict:
+    before = httpx.get(f"{stub}/stub/stats").json()
+    latencies = []
+    for i in range(requests):
+        # a different user document each time, so nothing is served from a cache
+        files = {
+            "template_file": ("form.pdf", template, "application/pdf"),
+            "user_document_file": ("passport.txt", f"{PASSPORT_TEXT}Document number: AB{i:06d}\n".encode(), "text/plain"),
+        }
+        start = time.perf_counter()
+        resp = client.post("/api/fill_form", files=files, data={"language": "en"})
+        latencies.append(time.perf_counter() - start)
+        resp.raise_for_status()
+    after = httpx.get(f"{stub}/stub/stats").json()
+    with fitz.open(stream=resp.content, filetype="pdf") as doc:
+        pages, fields = doc.page_count, sum(1 for page in doc for _ in page.widgets())
+    return {
+        "mode": resp.headers.get("x-fill-mode", "?"),
+        "median_ms": statistics.median(latencies) * 1000,
+        "prompt_chars": (after.get("prompt_chars", 0) - before.get("prompt_chars", 0)) / requests,
+        "completion_chars": (after.get("completion_chars", 0) - before.get("completion_chars", 0)) / requests,
+        "pages": pages,
+        "widgets": fields,
+        "kb": len(resp.content) / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--latency", default="fixed:0.5", help="stub chat latency distribution")
+    parser.add_argument("--audio-latency", default="fixed:0.8")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    args = parser.parse_args()
+    args.traffic = None
+
+    procs = start_servers(args)
+    stub = f"http://127.0.0.1:{args.stub_port}"
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.app_port}", timeout=120.0) as client:
+            rows = [
+                ("flat PDF", run_mode(client, stub, make_form(args.pages, seed=2), args.requests)),
+                ("fillable PDF", run_mode(client, stub, make_fillable_form(args.pages, seed=2), args.requests)),
+            ]
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print(f"{args.pages}-page form, {args.requests} requests each, stub latency {args.latency}")
+    print(f"{'template':<14}{'path':<10}{'median ms':>10}{'prompt ch':>10}{'reply ch':>9}{'pages':>6}{'widgets':>8}{'KB':>6}")
+    for label, r in rows:
+        print(
+            f"{label:<14}{r['mode']:<10}{r['median_ms']:>10.0f}{r['prompt_chars']:>10.0f}{r['completion_chars']:>9.0f}"
+            f"{r['pages']:>6}{r['widgets']:>8}{r['kb']:>6.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Concurrent PDF uploads: parsing inline on the event loop (the old handlers)
+vs. the shared process-pool extraction service. A heartbeat task measures how
+long the loop is blocked, which is what every other request waits on.
+
+    python benchmarks/concurrent_pdf_uploads.py --uploads 16 --pages 50
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+import PyPDF2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back import document_extraction  # noqa: E402
+from pdf_corpus import make_form  # noqa: E402
+
+
+async def heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.01) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def inline_extract(data: bytes) -> str:
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+async def pooled_extract(data: bytes) -> str:
+    return await document_extraction.extract_pdf_text(data)
+
+
+async def run(extract, docs: list) -> dict:
+    stop = asyncio.Event()
+    lags: list = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    latencies = []
+
+    async def upload(data: bytes) -> None:
+        start = time.perf_counter()
+        await extract(data)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(d) for d in docs))
+    wall = time.perf_counter() - start
+    stop.set()
+    await beat
+    latencies.sort()
+    return {
+        "wall": wall,
+        "p50": latencies[len(latencies) // 2],
+        "max_lag": max(lags) if lags else wall,
+        "beats": len(lags),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    docs = [make_form(args.pages, seed=i) for i in range(args.uploads)]
+    print(f"{args.uploads} uploads x {args.pages} pages, {document_extraction.DOC_WORKERS} workers")
+
+    async def both():
+        # warm the pool so process start-up is not billed to the first run
+        await document_extraction.extract_pdf_text(make_form(1))
+        results = {"inline": await run(inline_extract, docs), "process pool": await run(pooled_extract, docs)}
+        document_extraction.shutdown()
+        return results
+
+    for name, r in asyncio.run(both()).items():
+        print(
+            f"{name:<13} wall {r['wall']:6.2f}s  p50 upload {r['p50']:6.2f}s  "
+            f"max loop stall {r['max_lag'] * 1000:8.1f} ms  heartbeats {r['beats']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
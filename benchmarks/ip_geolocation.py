@@ -0,0 +1,67 @@
+"""
+Load time and lookup latency of the local IP range database on a synthetic
+dataset roughly the size of a country-level GeoLite2 export.
+
+    python benchmarks/ip_geolocation.py --v4 300000 --v6 150000
+"""
+import argparse
+import ipaddress
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back.ip_geolocation import IPGeoDatabase  # noqa: E402
+
+COUNTRIES = [("sk", "Slovakia"), ("ua", "Ukraine"), ("de", "Germany"), ("pl", "Poland"), ("us", "United States")]
+
+
+def write_dataset(path: str, v4: int, v6: int) -> None:
+    """IPv4 rows as start/end ranges, IPv6 rows as /48 networks."""
+    random.seed(3)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("network,start_ip,end_ip,country_code,country_name\n")
+        step = (2**32) // v4
+        for i in range(v4):
+            code, name = random.choice(COUNTRIES)
+            start = ipaddress.IPv4Address(i * step)
+            end = ipaddress.IPv4Address(i * step + step - 1)
+            f.write(f",{start},{end},{code},{name}\n")
+        for i in range(v6):
+            code, name = random.choice(COUNTRIES)
+            f.write(f"{ipaddress.IPv6Address((0x2000 << 112) + i * 2**80)}/48,,,{code},{name}\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--v4", type=int, default=300000)
+    parser.add_argument("--v6", type=int, default=150000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ip_ranges.csv")
+        write_dataset(path, args.v4, args.v6)
+        db = IPGeoDatabase(path)
+        start = time.perf_counter()
+        db.load()
+        print(f"load: {len(db)} ranges in {time.perf_counter() - start:.2f}s")
+
+        random.seed(5)
+        v4_ips = [str(ipaddress.IPv4Address(random.getrandbits(32))) for _ in range(args.lookups)]
+        v6_ips = [
+            str(ipaddress.IPv6Address((0x2000 << 112) + random.randrange(args.v6 * 2 * 2**80)))
+            for _ in range(args.lookups)
+        ]
+        for label, ips in (("ipv4", v4_ips), ("ipv6", v6_ips)):
+            start = time.perf_counter()
+            found = sum(1 for ip in ips if db.lookup(ip))
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {elapsed / len(ips) * 1e6:.2f} us/lookup ({found}/{len(ips)} matched)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Concurrent throughput of the old per-router sync OpenAI client vs. the shared
+async gateway, against a mocked upstream with fixed latency.
+
+    python benchmarks/llm_gateway_load.py --requests 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back import llm_gateway  # noqa: E402
+
+COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "ok"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def make_sync_client(latency: float) -> OpenAI:
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return httpx.Response(200, content=json.dumps(COMPLETION))
+
+    return OpenAI(api_key="bench", http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+
+def make_async_client(latency: float) -> AsyncOpenAI:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, content=json.dumps(COMPLETION))
+
+    return AsyncOpenAI(api_key="bench", http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+async def loop_lag_probe(stop: asyncio.Event, samples: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - start - 0.01)
+
+
+async def run(name: str, handler, total: int) -> None:
+    stop = asyncio.Event()
+    lag: list = []
+    probe = asyncio.create_task(loop_lag_probe(stop, lag))
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    print(
+        f"{name:<14} requests={total} wall={elapsed:.2f}s "
+        f"throughput={total / elapsed:.1f} req/s max_loop_lag={max(lag or [0]) * 1000:.0f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    sync_client = make_sync_client(args.latency)
+
+    async def before():
+        sync_client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+
+    llm_gateway._client = make_async_client(args.latency)
+
+    async def after():
+        await llm_gateway.chat_completion(model="gpt-4o-mini", messages=MESSAGES)
+
+    await run("sync client", before, args.requests)
+    await run("async gateway", after, args.requests)
+    await llm_gateway.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,333 @@
+"""
+End-to-end load test of every UrbanMind router against the offline OpenAI stub.
+
+Starts benchmarks/openai_stub.py and the app (uvicorn main:app) as
+subprocesses, then drives each endpoint open-loop at --rps for --duration
+seconds, all endpoints at once, and reports p50/p95/p99 latency, throughput
+and error rate per endpoint.
+
+    python benchmarks/load_suite.py --rps 5 --duration 30 --latency lognormal:0.6:0.5
+    python benchmarks/load_suite.py --endpoints chat,translation --json before.json
+    python benchmarks/load_suite.py --base-url http://127.0.0.1:8000   # already running app
+
+Open-loop means requests are fired on schedule whether or not earlier ones
+finished, so queueing inside the app shows up as latency instead of as a lower
+offered load.
+
+--traffic record saves every upstream call the app makes; --traffic replay
+serves them back from disk (no stub, no network) so two builds can be compared
+on identical traffic, including app CPU time:
+
+    python benchmarks/load_suite.py --traffic record --duration 30
+    python benchmarks/load_suite.py --traffic replay --duration 30 --replay-latency zero
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import subprocess
+import sys
+import time
+import zlib
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CITIES = [(48.72, 21.26), (48.15, 17.11), (50.45, 30.52), (52.52, 13.40), (50.06, 19.94), (49.20, 16.61)]
+COUNTRIES = ["sk", "ua", "de", "pl", "cz", "at"]
+CV_TEXT = (
+    "Jane Doe, data analyst with four years of experience in Python, SQL and dashboarding. "
+    "Worked at Example s.r.o. building reporting pipelines, previously an intern at Sample a.s. "
+    "MSc in Statistics, fluent in English and Ukrainian, intermediate Slovak. "
+) * 2
+FORM_TEMPLATE = "APPLICATION FOR RESIDENCE\nName: ____\nDate of birth: ____\nNationality: ____\nPhone: ____\n"
+PASSPORT_TEXT = "PASSPORT\nSurname: DOE\nGiven names: JANE\nDate of birth: 01.02.1990\nNationality: UKRAINE\n"
+
+
+def _tiny_png() -> bytes:
+    """1x1 grayscale PNG, enough to exercise the multimodal path of /fill_form."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    ihdr = struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", zlib.compress(b"\x00\xff")) + chunk(b"IEND", b"")
+
+
+TINY_PNG = _tiny_png()
+
+
+class Endpoint:
+    def __init__(self, name: str, path: str, build: Callable[[int], Dict[str, Any]]):
+        self.name = name
+        self.path = path
+        self.build = build
+
+
+def _location(i: int) -> Dict[str, Any]:
+    lat, lon = CITIES[i % len(CITIES)]
+    # seeded per request so a recorded run can be replayed exactly
+    rng = random.Random(i)
+    return {"latitude": lat + rng.uniform(-0.05, 0.05), "longitude": lon + rng.uniform(-0.05, 0.05)}
+
+
+ENDPOINTS = [
+    Endpoint("chat", "/api/chat", lambda i: {"json": {"message": f"How do I open a bank account? #{i}"}}),
+    Endpoint("chat_stream", "/api/chat", lambda i: {"json": {"message": f"Where do I register? #{i}", "stream": True}}),
+    Endpoint("work_chat", "/work/chat", lambda i: {"json": {"message": f"How do I find an IT job? #{i}"}}),
+    Endpoint(
+        "work_resume",
+        "/work/generate-resume",
+        lambda i: {"json": {"profile": CV_TEXT + f" #{i}", "target_language": "German"}},
+    ),
+    Endpoint("docs_chat", "/docs/chat", lambda i: {"json": {"message": f"What is an apostille? #{i}"}}),
+    Endpoint(
+        "language_chat",
+        "/api/language/chat",
+        lambda i: {"json": {"messages": [{"role": "user", "content": f"I want to learn German #{i}"}], "ui_language": "en"}},
+    ),
+    Endpoint(
+        "language_check",
+        "/api/language/check",
+        lambda i: {
+            "json": {
+                "answers": {"q0": i % 3},
+                "exercises": [{"id": "q0", "question": "Ich ___ Student.", "options": ["bin", "bist", "ist"], "correct_option_index": 0}],
+                "target_language": "de",
+                "estimated_level": "A2",
+            }
+        },
+    ),
+    Endpoint("culture_nearby", "/api/culture/nearby", lambda i: {"json": {"lat": 48.72 + i * 1e-3, "lng": 21.26}}),
+    Endpoint("culture_chat", "/api/culture/chat", lambda i: {"json": {"message": f"Best museum nearby? #{i}", "city_code": "kosice"}}),
+    Endpoint("offices", "/api/offices/nearby", lambda i: {"json": {"address": f"Hlavná {i % 90 + 1}, Košice"}}),
+    Endpoint("job_sites", "/api/get_job_sites", lambda i: {"json": _location(i)}),
+    Endpoint("housing_sites", "/api/get_housing_sites", lambda i: {"json": _location(i)}),
+    Endpoint("banking_info", "/api/get_banking_info", lambda i: {"json": _location(i)}),
+    Endpoint(
+        "registration_info",
+        "/api/get_registration_info",
+        lambda i: {"json": {"country_code": COUNTRIES[i % len(COUNTRIES)], "language": "en"}},
+    ),
+    Endpoint(
+        "translation",
+        "/translation",
+        lambda i: {"json": {"text": f"Where is the foreign police office? ({i})", "target_language": "sk"}},
+    ),
+    Endpoint(
+        "translation_batch",
+        "/translation/batch",
+        lambda i: {
+            "json": {
+                "segments": [f"Button label {n}" for n in range(20)] + [f"Request {i}"],
+                "target_languages": ["sk", "uk"],
+            }
+        },
+    ),
+    Endpoint(
+        "translation_voice",
+        "/translation/voice",
+        lambda i: {"files": {"audio": ("a.webm", b"\x1a\x45\xdf\xa3" + bytes(2048), "audio/webm")}, "data": {"target_language": "sk"}},
+    ),
+    Endpoint(
+        "fill_form",
+        "/api/fill_form",
+        lambda i: {
+            "files": {
+                "template_file": ("form.txt", FORM_TEMPLATE.encode(), "text/plain"),
+                "user_document_file": (
+                    ("passport.png", TINY_PNG, "image/png") if i % 2 else ("passport.txt", PASSPORT_TEXT.encode(), "text/plain")
+                ),
+            },
+            "data": {"language": "en"},
+        },
+    ),
+    Endpoint(
+        "neurohr_analyze",
+        "/neurohr-api/analyze",
+        lambda i: {"files": {"file": ("cv.txt", (CV_TEXT + f" #{i}").encode(), "text/plain")}},
+    ),
+    Endpoint("neurohr_missing", "/neurohr-api/resume/missing", lambda i: {"json": {"cv_text": CV_TEXT + f" #{i}"}}),
+    Endpoint("neurohr_generate", "/neurohr-api/resume/generate", lambda i: {"json": {"cv_text": CV_TEXT + f" #{i}"}}),
+]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+async def drive(client: httpx.AsyncClient, endpoint: Endpoint, rps: float, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    tasks = []
+
+    async def one(i: int) -> None:
+        start = time.perf_counter()
+        try:
+            resp = await client.post(endpoint.path, **endpoint.build(i))
+            await resp.aread()
+            key = str(resp.status_code)
+        except httpx.HTTPError as e:
+            key = type(e).__name__
+        statuses[key] = statuses.get(key, 0) + 1
+        if key.startswith("2"):
+            latencies.append(time.perf_counter() - start)
+
+    total = max(1, int(rps * duration))
+    begin = time.perf_counter()
+    for i in range(total):
+        delay = begin + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - begin
+
+    latencies.sort()
+    ok = len(latencies)
+    return {
+        "sent": total,
+        "ok": ok,
+        "error_rate": round((total - ok) / total, 4),
+        "throughput_rps": round(ok / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 1),
+        "statuses": statuses,
+    }
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{proc.args} exited with {proc.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def start_servers(args) -> List[subprocess.Popen]:
+    procs: List[subprocess.Popen] = []
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=f"{stub_url}/v1",
+        OPENAI_API_KEY="sk-stub",
+        NOMINATIM_URL=stub_url,
+        IPAPI_URL=stub_url,
+    )
+    if args.traffic:
+        env.update(
+            URBANMIND_TRAFFIC_MODE=args.traffic,
+            URBANMIND_TRAFFIC_DIR=args.traffic_dir,
+            URBANMIND_REPLAY_LATENCY=args.replay_latency,
+        )
+    if args.traffic != "replay":
+        procs.append(start_stub(args, stub_url))
+
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    procs.append(app)
+    wait_ready(f"http://127.0.0.1:{args.app_port}/api/metrics", app)
+    return procs
+
+
+def start_stub(args, stub_url: str) -> subprocess.Popen:
+    stub = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(ROOT, "benchmarks", "openai_stub.py"),
+            "--port", str(args.stub_port),
+            "--latency", args.latency,
+            "--audio-latency", args.audio_latency,
+            "--error-rate", str(args.stub_error_rate),
+            "--seed", "1",
+        ],
+        cwd=ROOT,
+    )
+    wait_ready(f"{stub_url}/stub/stats", stub)
+    return stub
+
+
+async def run(args) -> Dict[str, Any]:
+    wanted = set(args.endpoints.split(",")) if args.endpoints else None
+    endpoints = [e for e in ENDPOINTS if wanted is None or e.name in wanted]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        before = (await client.get("/api/metrics")).json().get("data")
+        results = await asyncio.gather(*(drive(client, e, args.rps, args.duration) for e in endpoints))
+        metrics = (await client.get("/api/metrics")).json().get("data")
+    cpu = metrics["process"]["cpu_seconds"] - before["process"]["cpu_seconds"]
+    return {
+        "endpoints": dict(zip((e.name for e in endpoints), results)),
+        "app_cpu_seconds": round(cpu, 3),
+        "metrics": metrics,
+    }
+
+
+def report(results: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'endpoint':<20}{'sent':>6}{'ok':>6}{'err%':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  statuses"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<20}{r['sent']:>6}{r['ok']:>6}{r['error_rate'] * 100:>6.1f}%{r['throughput_rps']:>8.2f}"
+            f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}  {r['statuses']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rps", type=float, default=2.0, help="offered load per endpoint")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--endpoints", help="comma separated subset: " + ",".join(e.name for e in ENDPOINTS))
+    parser.add_argument("--latency", default="lognormal:0.6:0.5", help="stub chat latency distribution")
+    parser.add_argument("--audio-latency", default="fixed:0.8")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    parser.add_argument("--base-url", help="target an already running app instead of starting one")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="also write results and /api/metrics to this file")
+    parser.add_argument("--traffic", choices=["record", "replay"], help="record upstream traffic, or replay it without the stub")
+    parser.add_argument("--traffic-dir", default=os.path.join(ROOT, "recordings"))
+    parser.add_argument("--replay-latency", choices=["recorded", "zero"], default="recorded")
+    args = parser.parse_args()
+
+    random.seed(11)
+    procs: List[subprocess.Popen] = []
+    if not args.base_url:
+        procs = start_servers(args)
+        args.base_url = f"http://127.0.0.1:{args.app_port}"
+    try:
+        out = asyncio.run(run(args))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    report(out["endpoints"])
+    print(f"app cpu: {out['app_cpu_seconds']:.2f}s  traffic: {out['metrics'].get('traffic')}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
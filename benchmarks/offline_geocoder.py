@@ -0,0 +1,116 @@
+"""
+Offline k-d tree reverse geocoding vs. a linear scan of the same gazetteer
+vs. the network reverse_geocode path (mocked Nominatim with a fixed RTT, or
+the real service with --live), and the share of points answered offline for
+points spread around the gazetteer's places.
+
+    python benchmarks/offline_geocoder.py --points 5000 --rtt 0.15
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back import geocoding  # noqa: E402
+from back.offline_geocoder import EARTH_RADIUS_KM, _to_xyz, get_offline_geocoder  # noqa: E402
+
+# how far users are from the centre of the place they are in or near
+SPREADS_KM = (2, 5, 10, 20)
+
+
+def sample_points(geocoder, n: int, spread_km: float, country: str = "") -> list:
+    """Points uniformly spread within spread_km of random gazetteer places (of one country, if given)."""
+    xs, ys, zs = geocoder._axes
+    places = [i for i, code in enumerate(geocoder.country_codes) if not country or code == country]
+    random.seed(7)
+    points = []
+    for _ in range(n):
+        i = random.choice(places)
+        lat, lon = math.degrees(math.asin(zs[i])), math.degrees(math.atan2(ys[i], xs[i]))
+        distance = spread_km * math.sqrt(random.random())
+        bearing = random.uniform(0, 2 * math.pi)
+        dlat = math.degrees(distance * math.cos(bearing) / EARTH_RADIUS_KM)
+        dlon = math.degrees(distance * math.sin(bearing) / EARTH_RADIUS_KM) / max(0.01, math.cos(math.radians(lat)))
+        points.append((lat + dlat, lon + dlon))
+    return points
+
+
+def linear_nearest(geocoder, lat: float, lon: float) -> int:
+    px, py, pz = _to_xyz(lat, lon)
+    xs, ys, zs = geocoder._axes
+    best, best_i = float("inf"), -1
+    for i in range(len(xs)):
+        d = (xs[i] - px) ** 2 + (ys[i] - py) ** 2 + (zs[i] - pz) ** 2
+        if d < best:
+            best, best_i = d, i
+    return best_i
+
+
+async def network_path(points: list, rtt: float, live: bool) -> float:
+    if not live:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(rtt)
+            return httpx.Response(200, json={"address": {"country_code": "sk", "country": "Slovakia", "city": "Košice"}})
+
+        geocoding._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    start = time.perf_counter()
+    for lat, lon in points:
+        await geocoding._fetch_reverse(lat, lon)
+        if live:
+            await asyncio.sleep(1.0)  # Nominatim usage policy: max 1 request/second
+    elapsed = time.perf_counter() - start
+    await geocoding.aclose()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--network-points", type=int, default=20)
+    parser.add_argument("--rtt", type=float, default=0.15)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--countries", nargs="*", default=["sk", "at", "de"], help="extra per-country hit rates")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    geocoder = get_offline_geocoder()
+    print(f"load+index: {len(geocoder)} cities in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    points = sample_points(geocoder, args.points, 5)
+
+    start = time.perf_counter()
+    for lat, lon in points:
+        geocoder.lookup(lat, lon)
+    kd = time.perf_counter() - start
+
+    print(f"answered offline (the rest goes to Nominatim), {args.points} points per cell")
+    print(f"{'within':<10}" + "".join(f"{'all' if not c else c:>8}" for c in ("", *args.countries)))
+    for spread in SPREADS_KM:
+        rates = []
+        for country in ("", *args.countries):
+            sample = sample_points(geocoder, args.points, spread, country)
+            rates.append(sum(1 for lat, lon in sample if geocoder.lookup(lat, lon) is not None) / len(sample))
+        print(f"{f'{spread} km':<10}" + "".join(f"{rate:>8.0%}" for rate in rates))
+
+    linear_points = points[: max(1, args.points // 100)]
+    start = time.perf_counter()
+    for lat, lon in linear_points:
+        linear_nearest(geocoder, lat, lon)
+    linear = time.perf_counter() - start
+
+    network = asyncio.run(network_path(points[: args.network_points], args.rtt, args.live))
+
+    print(f"k-d tree   : {kd / len(points) * 1e6:8.1f} us/lookup")
+    print(f"linear scan: {linear / len(linear_points) * 1e6:8.1f} us/lookup")
+    print(f"network    : {network / args.network_points * 1e6:8.1f} us/lookup ({'live' if args.live else f'mocked rtt={args.rtt}s'})")
+
+
+if __name__ == "__main__":
+    main()
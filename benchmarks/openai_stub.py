@@ -0,0 +1,434 @@
+"""
+Local stand-in for the parts of the OpenAI API (and Nominatim / ipapi.co) that
+UrbanMind calls, so the whole backend can be load-tested offline without
+spending tokens.
+
+    python benchmarks/openai_stub.py --port 8765 --latency lognormal:0.6:0.5
+
+then start the app against it:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-stub \\
+    NOMINATIM_URL=http://127.0.0.1:8765 IPAPI_URL=http://127.0.0.1:8765 \\
+    uvicorn main:app --port 8000
+
+Chat completions pick a canned reply by a marker in the system prompt, shaped
+like what each router parses (banking info, culture places, form filling,
+tutor exercises, ...). JSON mode, streaming and multimodal (list) content are
+accepted. --fixtures points at a JSON file {marker: reply} that extends or
+overrides the built-in replies.
+
+Latency specs: fixed:S, uniform:LO:HI, normal:MEAN:SD, lognormal:MEDIAN:SIGMA,
+exp:MEAN (all seconds).
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / values[0])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+CONFIG: Dict[str, Any] = {
+    "chat_latency": parse_latency("fixed:0.5"),
+    "audio_latency": parse_latency("fixed:0.8"),
+    "geo_latency": parse_latency("fixed:0.1"),
+    "chunk_delay": 0.02,
+    "error_rate": 0.0,
+    "fixtures": {},
+}
+STATS: Dict[str, int] = {}
+
+app = FastAPI()
+
+
+def _text_of(content: Any) -> str:
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _section(text: str, start: str, end: str) -> str:
+    i = text.find(start)
+    if i < 0:
+        return text
+    i += len(start)
+    j = text.find(end, i)
+    return text[i:j] if j >= 0 else text[i:]
+
+
+def _sites(kind: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "name": f"{kind.title()} Portal {n}",
+            "url": f"https://{kind}{n}.example.com",
+            "description": f"Popular {kind} listings for newcomers.",
+            "country_or_region": "Slovakia",
+            "primary_language": "sk",
+            "focus_area": "general",
+        }
+        for n in range(1, 6)
+    ]
+
+
+def _banking(_: str) -> Any:
+    return {
+        "country_code": "sk",
+        "country_name": "Slovakia",
+        "city": "Košice",
+        "banks": [
+            {
+                "name": f"Bank {n}",
+                "tagline": "Everyday banking for newcomers",
+                "features": ["Free account for students", "English app", "Card in 3 days"],
+                "rating_value": 4.2,
+                "rating_text": "4.2/5 (about 900 reviews)",
+                "icon": "university",
+                "url": f"https://bank{n}.example.com",
+                "branches_nearby": "Two branches near the city centre",
+            }
+            for n in range(1, 9)
+        ],
+        "steps": [
+            {"number": n, "title": f"Step {n}", "description": "Bring your passport and residence permit."}
+            for n in range(1, 6)
+        ],
+    }
+
+
+def _registration(_: str) -> Any:
+    return {
+        "country_code": "sk",
+        "country_name": "Slovakia",
+        "flag": "🇸🇰",
+        "process_title": "Temporary residence",
+        "description": "Apply at the foreign police department after arrival.",
+        "deadline": "typically within 3 working days after arrival",
+        "cost": "Around 135 EUR",
+        "documents": ["Passport", "Two photos", "Proof of accommodation", "Health insurance"],
+        "immigration_sites": [{"label": "Foreign police", "url": "https://www.minv.sk"}],
+    }
+
+
+def _culture(_: str) -> Any:
+    def place(group: str, n: int, distance: float) -> Dict[str, Any]:
+        return {
+            "id": f"{group}-{n}",
+            "name": f"Place {group}/{n}",
+            "type": "Museum",
+            "description": "A calm museum with a good permanent exhibition on regional history.",
+            "image": "https://images.example.com/place.jpg",
+            "rating": 4.5,
+            "address": "Main Street 1",
+            "category": "museums",
+            "city": "Košice",
+            "city_code": "kosice",
+            "country": "Slovakia",
+            "distance_km": distance,
+        }
+
+    return {
+        "region_label": "Košice, Slovakia",
+        "city_code": "kosice",
+        "groups": {
+            "0-2": [place("0-2", n, 0.5 + n * 0.4) for n in range(3)],
+            "2-5": [place("2-5", n, 2.5 + n) for n in range(2)],
+            "5-10": [place("5-10", n, 6 + n) for n in range(2)],
+        },
+    }
+
+
+def _offices(_: str) -> Any:
+    return {
+        "offices": [
+            {
+                "name": "Foreign Police Department",
+                "type": "migration_police",
+                "category": "state",
+                "address": "Trieda SNP 1",
+                "city": "Košice",
+                "country": "Slovakia",
+                "phone": None,
+                "email": None,
+                "website": "https://www.minv.sk",
+                "lat": 48.72,
+                "lon": 21.25,
+                "distance_km_estimate": 2.0,
+            }
+        ]
+    }
+
+
+def _fill_form(user_text: str) -> Any:
+    template = _section(user_text, "BLANK FORM TEMPLATE:\n--------------------\n", "\n\nUSER DOCUMENT:")
+    reply = {
+        "filled_text": template.replace("____", "Jane Doe") or "Name: Jane Doe",
+        "missing_fields": ["Phone number"],
+        "notes": "Phone number was not present in the document.",
+    }
+    if '"form_fields"' in user_text:
+        reply["form_fields"] = [line.split(":")[0].strip() for line in template.splitlines() if ":" in line]
+    return reply
+
+
+def _fill_fields(user_text: str) -> Any:
+    try:
+        fields = json.loads(_section(user_text, "FORM FIELDS:\n", "\n"))
+    except ValueError:
+        fields = []
+    values: Dict[str, Any] = {}
+    for field in fields:
+        if "phone" in field["label"].lower():
+            continue  # leave one kind of field unfilled, like a passport would
+        if field.get("type") == "checkbox":
+            values[field["id"]] = True
+        elif field.get("options"):
+            values[field["id"]] = field["options"][0]
+        else:
+            values[field["id"]] = "Jane Doe"[: field.get("max_len") or None]
+    return {"values": values, "notes": "Phone number was not present in the document."}
+
+
+def _tutor(user_text: str) -> Any:
+    if '"answers"' in user_text:
+        return {"assistant_message": "Good work. What do you want to practise next?", "feedback": []}
+    return {
+        "assistant_message": "Let's practise. Choose the correct form. What do you want to practise next?",
+        "phase": "practice",
+        "target_language": "de",
+        "estimated_level": "A2",
+        "practice_type": "grammar",
+        "exercises": {
+            "type": "grammar",
+            "items": [
+                {"id": f"q{n}", "question": "Ich ___ Student.", "options": ["bin", "bist", "ist"], "correct_option_index": 0}
+                for n in range(3)
+            ],
+        },
+    }
+
+
+def _batch_translation(user_text: str) -> Any:
+    try:
+        payload = json.loads(user_text)
+    except ValueError:
+        return {"translations": []}
+    target = payload.get("target_language", "")
+    return {
+        "translations": [
+            {"id": seg["id"], "text": f"[{target}] {seg['text']}"} for seg in payload.get("segments", [])
+        ]
+    }
+
+
+def _translation(user_text: str) -> str:
+    target = _section(user_text, "Target language: ", "\n").strip()
+    return f"[{target}] " + _section(user_text, "Text:\n", "\n\nReturn only the translation.")
+
+
+def _markdown(_: str) -> str:
+    return (
+        "# Jane Doe\n\n## Experience\n\n- **Data analyst**, Example s.r.o. (2021-2024)\n"
+        "- Built reporting pipelines and dashboards.\n\n## Education\n\n- MSc Statistics\n"
+    )
+
+
+def _chat_text(_: str) -> str:
+    return (
+        "Here is what you can do next: register at the foreign police, open a bank account "
+        "and look at [local job boards](https://jobs.example.com). Let me know if you need details."
+    )
+
+
+# (marker in the system prompt, reply builder); first match wins
+REPLIES = [
+    ("banking assistant", _banking),
+    ("immigration and migrant procedures", _registration),
+    ("backend service for a travel web app", _culture),
+    ("migration police offices", _offices),
+    ("fills out official forms", _fill_form),
+    ("fills in the fields of a form", _fill_fields),
+    ("AI language tutor", _tutor),
+    ("list of segments", _batch_translation),
+    ("job-market analyst", lambda _: _sites("jobs")),
+    ("housing-market assistant", lambda _: _sites("housing")),
+    ("multilingual translation assistant", _translation),
+    ("professional CV writer", _markdown),
+]
+
+
+def _reply_for(messages: List[Dict[str, Any]]) -> str:
+    system = "\n".join(_text_of(m.get("content")) for m in messages if m.get("role") == "system")
+    user = _text_of(messages[-1].get("content")) if messages else ""
+    for marker, reply in CONFIG["fixtures"].items():
+        if marker in system:
+            return reply if isinstance(reply, str) else json.dumps(reply, ensure_ascii=False)
+    builder: Callable[[str], Any] = _chat_text
+    for marker, candidate in REPLIES:
+        if marker in system:
+            builder = candidate
+            break
+    reply = builder(user)
+    return reply if isinstance(reply, str) else json.dumps(reply, ensure_ascii=False)
+
+
+def _count(name: str, n: int = 1) -> None:
+    STATS[name] = STATS.get(name, 0) + n
+
+
+def _injected_error() -> Optional[JSONResponse]:
+    if CONFIG["error_rate"] and random.random() < CONFIG["error_rate"]:
+        _count("injected_errors")
+        return JSONResponse({"error": {"message": "stub: injected failure", "type": "server_error"}}, status_code=500)
+    return None
+
+
+def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish: Optional[str] = None) -> str:
+    body = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }
+    return f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    _count("chat_completions")
+    error = _injected_error()
+    if error is not None:
+        return error
+    model = body.get("model", "stub")
+    content = _reply_for(body.get("messages") or [])
+    completion_id = f"chatcmpl-stub-{STATS['chat_completions']}"
+    prompt_chars = sum(len(_text_of(m.get("content"))) for m in body.get("messages") or [])
+    _count("prompt_chars", prompt_chars)
+    _count("completion_chars", len(content))
+
+    if body.get("stream"):
+        _count("chat_streams")
+
+        async def events():
+            await asyncio.sleep(CONFIG["chat_latency"]())
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for i in range(0, len(content), 16):
+                yield _chunk(completion_id, model, {"content": content[i : i + 16]})
+                await asyncio.sleep(CONFIG["chunk_delay"])
+            yield _chunk(completion_id, model, {}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(CONFIG["chat_latency"]())
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4,
+        },
+    }
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(request: Request):
+    form = await request.form()
+    _count("transcriptions")
+    error = _injected_error()
+    if error is not None:
+        return error
+    await asyncio.sleep(CONFIG["audio_latency"]())
+    text = "Hello, I would like to register my address."
+    if form.get("response_format") == "text":
+        return PlainTextResponse(text)
+    return {"text": text}
+
+
+@app.post("/v1/audio/speech")
+async def speech(request: Request):
+    body = await request.json()
+    _count("speech")
+    error = _injected_error()
+    if error is not None:
+        return error
+    await asyncio.sleep(CONFIG["audio_latency"]())
+    # roughly 1 KB of "audio" per 10 characters of input
+    return Response(b"\xff\xfb" + b"\0" * (len(body.get("input", "")) * 100), media_type="audio/mpeg")
+
+
+@app.get("/reverse")
+async def nominatim_reverse(lat: float, lon: float):
+    _count("reverse")
+    await asyncio.sleep(CONFIG["geo_latency"]())
+    return {"address": {"country_code": "sk", "country": "Slovakia", "city": "Košice"}}
+
+
+@app.get("/stub/stats")
+async def stub_stats():
+    return STATS
+
+
+@app.get("/{ip}/json/")
+async def ipapi(ip: str):
+    _count("ipapi")
+    await asyncio.sleep(CONFIG["geo_latency"]())
+    return {"ip": ip, "country_code": "SK", "country_name": "Slovakia", "city": "Košice"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.5", help="chat completion latency (time to first token when streaming)")
+    parser.add_argument("--audio-latency", default="fixed:0.8")
+    parser.add_argument("--geo-latency", default="fixed:0.1")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of model calls answered with 500")
+    parser.add_argument("--fixtures", help="JSON file {system prompt marker: reply}")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    CONFIG.update(
+        chat_latency=parse_latency(args.latency),
+        audio_latency=parse_latency(args.audio_latency),
+        geo_latency=parse_latency(args.geo_latency),
+        chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate,
+    )
+    if args.fixtures:
+        with open(args.fixtures, encoding="utf-8") as f:
+            CONFIG["fixtures"] = json.load(f)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
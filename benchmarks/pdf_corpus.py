@@ -0,0 +1,148 @@
+"""
+Synthetic PDFs for the document benchmarks: text CVs and official-looking
+forms with labelled blank fields, built with reportlab so nothing has to be
+checked in.
+"""
+import io
+import random
+from typing import List, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+WORDS = (
+    "experience project team analysis customer delivery python reporting migration permit residence "
+    "office application document passport insurance employer contract address registration signature "
+    "education university language german slovak english management budget quality support"
+).split()
+FORM_FIELDS = [
+    "Surname", "Given names", "Date of birth", "Place of birth", "Nationality", "Passport number",
+    "Address in Slovakia", "Purpose of stay", "Employer", "Phone", "E-mail", "Signature",
+]
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_cv(pages: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    width, height = A4
+    for page in range(pages):
+        y = height - 60
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y, f"Curriculum Vitae - Jane Doe ({page + 1}/{pages})")
+        c.setFont("Helvetica", 10)
+        y -= 30
+        while y > 60:
+            c.drawString(50, y, _paragraph(rng, 14))
+            y -= 14
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def make_form(pages: int, seed: int = 0, pagesize: Tuple[float, float] = A4) -> bytes:
+    rng = random.Random(seed)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=pagesize)
+    width, height = pagesize
+    for page in range(pages):
+        y = height - 60
+        c.setFont("Helvetica-Bold", 13)
+        c.drawString(50, y, f"APPLICATION FOR TEMPORARY RESIDENCE - part {page + 1}")
+        y -= 30
+        c.setFont("Helvetica", 10)
+        for field in FORM_FIELDS:
+            c.drawString(50, y, f"{field}:")
+            c.line(200, y - 2, width - 50, y - 2)
+            y -= 24
+        while y > 80:
+            c.drawString(50, y, _paragraph(rng, 12))
+            y -= 13
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def make_fillable_form(pages: int, seed: int = 0) -> bytes:
+    """make_form with AcroForm widgets: a text field per label (named Text1, Text2, ...), a checkbox and a radio group."""
+    rng = random.Random(seed)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    width, height = A4
+    number = 0
+    for page in range(pages):
+        y = height - 60
+        c.setFont("Helvetica-Bold", 13)
+        c.drawString(50, y, f"APPLICATION FOR TEMPORARY RESIDENCE - part {page + 1}")
+        y -= 30
+        c.setFont("Helvetica", 10)
+        for field in FORM_FIELDS:
+            number += 1
+            c.drawString(50, y, f"{field}:")
+            c.acroForm.textfield(name=f"Text{number}", x=200, y=y - 5, width=width - 250, height=16, borderWidth=0.5)
+            y -= 24
+        c.drawString(50, y, "First application:")
+        c.acroForm.checkbox(name=f"First{page + 1}", x=200, y=y - 4, size=12)
+        y -= 24
+        c.drawString(50, y, "Sex:")
+        for i, value in enumerate(("M", "F")):
+            c.drawString(200 + i * 50, y, value)
+            c.acroForm.radio(name=f"Sex{page + 1}", value=value, selected=False, x=212 + i * 50, y=y - 4, size=12)
+        y -= 30
+        while y > 80:
+            c.drawString(50, y, _paragraph(rng, 12))
+            y -= 13
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+GUIDE_TOPICS = {
+    "residence": "temporary residence permit application requires proof of accommodation and a clean criminal record",
+    "employment": "employment permit is issued by the labour office after the employer reports the vacancy",
+    "insurance": "health insurance must be arranged before arrival and covers the whole stay",
+    "family": "family reunification allows spouses and minor children to join a permit holder",
+    "students": "students enrolled at a university may work up to twenty hours per week",
+    "fees": "administrative fees are paid with revenue stamps or by bank transfer before the appointment",
+    "registration": "foreign police registration must happen within three working days of arrival",
+    "renewal": "renewal applications are filed no later than the last day of the current permit",
+}
+
+
+def make_guide(pages: int, seed: int = 0) -> Tuple[bytes, List[str]]:
+    """A long guide with one topic per page (cycling), and the topic of each page."""
+    rng = random.Random(seed)
+    topics = list(GUIDE_TOPICS)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    width, height = A4
+    page_topics = []
+    for page in range(pages):
+        topic = topics[page % len(topics)]
+        page_topics.append(topic)
+        y = height - 60
+        c.setFont("Helvetica-Bold", 13)
+        c.drawString(50, y, f"Chapter {page + 1}: {topic.title()}")
+        c.setFont("Helvetica", 10)
+        y -= 26
+        while y > 60:
+            if rng.random() < 0.2:
+                c.drawString(50, y, GUIDE_TOPICS[topic] + ".")
+            else:
+                c.drawString(50, y, _paragraph(rng, 13))
+            y -= 14
+        c.showPage()
+    c.save()
+    return buf.getvalue(), page_topics
+
+
+def corpus(cvs: int = 20, forms: int = 20, seed: int = 1) -> List[Tuple[str, bytes]]:
+    """(name, pdf bytes) pairs: CVs of 1-4 pages and forms of 1-12 pages."""
+    rng = random.Random(seed)
+    docs = [(f"cv_{i}.pdf", make_cv(rng.randint(1, 4), seed=i)) for i in range(cvs)]
+    docs += [(f"form_{i}.pdf", make_form(rng.randint(1, 12), seed=1000 + i)) for i in range(forms)]
+    return docs
@@ -0,0 +1,123 @@
+"""
+Peak RSS while many clients download generated PDFs at the same time. The old
+path rendered into a BytesIO, read it back into bytes and returned a Response.
+The new path uses pdf_response, which streams the renderer's spool file in
+chunks. Each mode runs in a fresh process. Clients are slow, so every response
+stays in flight while the others are rendered.
+
+    python benchmarks/pdf_download_memory.py --downloads 64 --lines 3000
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def form_text(lines: int) -> str:
+    fields = ["Surname", "Given names", "Date of birth", "Place of birth", "Nationality", "Passport number", "Address"]
+    return "# APPLICATION\n" + "\n".join(f"{fields[i % len(fields)]}: value {i} " + "x" * 40 for i in range(lines))
+
+
+def build_app(mode: str, text: str):
+    from fastapi import FastAPI
+    from fastapi.responses import Response
+
+    from back import pdf_rendering
+
+    app = FastAPI()
+
+    @app.get("/pdf")
+    async def pdf():
+        if mode == "buffered":
+            buffer = io.BytesIO()
+            pdf_rendering.get_renderer().form(text, buffer)
+            buffer.seek(0)
+            data = buffer.read()
+            return Response(content=data, media_type="application/pdf")
+        return pdf_rendering.pdf_response(await pdf_rendering.render_form(text), "form.pdf")
+
+    return app
+
+
+async def download(app, chunk_delay: float) -> int:
+    received = 0
+
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await finished.wait()
+            return {"type": "http.disconnect"}
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            await asyncio.sleep(chunk_delay)  # slow client
+            if not message.get("more_body"):
+                finished.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/pdf", "raw_path": b"/pdf", "query_string": b"", "headers": [], "server": ("bench", 80),
+        "client": ("bench", 1), "root_path": "",
+    }
+    await app(scope, receive, send)
+    return received
+
+
+def child(mode: str, downloads: int, lines: int, chunk_delay: float) -> None:
+    text = form_text(lines)
+    app = build_app(mode, text)
+
+    async def run():
+        size = await download(app, 0)  # warm up the renderer and imports
+        base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        await asyncio.gather(*(download(app, chunk_delay) for _ in range(downloads)))
+        wall = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(json.dumps({"size": size, "rss_growth_kb": peak - base, "peak_kb": peak, "wall": wall}))
+
+    asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--downloads", type=int, default=64)
+    parser.add_argument("--lines", type=int, default=3000, help="lines of form text; sets the PDF size")
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--child", choices=["buffered", "streamed"])
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.downloads, args.lines, args.chunk_delay)
+        return
+
+    print(f"{args.downloads} concurrent downloads, {args.lines} form lines")
+    print(f"{'mode':<10}{'PDF KB':>8}{'RSS growth MB':>15}{'peak RSS MB':>13}{'wall s':>8}")
+    for mode in ("buffered", "streamed"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--downloads", str(args.downloads), "--lines", str(args.lines),
+             "--chunk-delay", str(args.chunk_delay)],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(
+            f"{mode:<10}{r['size'] / 1024:>8.0f}{r['rss_growth_kb'] / 1024:>15.1f}{r['peak_kb'] / 1024:>13.1f}{r['wall']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
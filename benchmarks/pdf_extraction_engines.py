@@ -0,0 +1,81 @@
+"""
+PyPDF2 vs. PyMuPDF text extraction over a synthetic corpus of CVs and official
+forms, plus whole-document latency of the extraction service with and without
+page-range splitting across workers.
+
+    python benchmarks/pdf_extraction_engines.py --cvs 30 --forms 30 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_corpus import corpus, make_form  # noqa: E402
+
+
+def engine_table(docs: list) -> None:
+    from back.document_extraction import _pages_pymupdf, _pages_pypdf2
+
+    totals = {}
+    for name, data in docs:
+        category = name.split("_")[0]
+        row = totals.setdefault(category, {"docs": 0, "pages": 0, "pypdf2": 0.0, "pymupdf": 0.0, "chars": [0, 0]})
+        row["docs"] += 1
+        for engine, fn in (("pypdf2", _pages_pypdf2), ("pymupdf", _pages_pymupdf)):
+            start = time.perf_counter()
+            pages = list(fn(data, 0, 10**6))
+            row[engine] += time.perf_counter() - start
+            row["chars"][engine == "pymupdf"] += sum(len(text) for _, text, _, _ in pages)
+        row["pages"] += len(pages)
+
+    print(f"{'corpus':<8}{'docs':>6}{'pages':>7}{'PyPDF2 ms/pg':>14}{'PyMuPDF ms/pg':>15}{'speedup':>9}{'chars (2/mu)':>16}")
+    for category, row in totals.items():
+        pypdf2 = row["pypdf2"] / row["pages"] * 1000
+        mupdf = row["pymupdf"] / row["pages"] * 1000
+        print(
+            f"{category:<8}{row['docs']:>6}{row['pages']:>7}{pypdf2:>14.2f}{mupdf:>15.2f}"
+            f"{pypdf2 / mupdf:>8.1f}x{row['chars'][0]:>8}/{row['chars'][1]}"
+        )
+
+
+async def split_vs_single(pages: int, repeats: int) -> None:
+    from back import document_extraction
+
+    data = make_form(pages, seed=7)
+    await document_extraction.extract_document("pdf", make_form(1))  # start the workers
+
+    results = {}
+    for label, per_job in (("single job", 10**6), (f"split by {document_extraction.DOC_PAGES_PER_JOB}", document_extraction.DOC_PAGES_PER_JOB)):
+        document_extraction.DOC_PAGES_PER_JOB = per_job
+        start = time.perf_counter()
+        for _ in range(repeats):
+            document_extraction.DOCUMENT_CACHE.clear()  # measure parsing, not the content cache
+            result = await document_extraction.extract_document("pdf", data, max_pages=pages)
+        results[label] = ((time.perf_counter() - start) / repeats, result["jobs"], result["engine"])
+    document_extraction.shutdown()
+
+    print(f"\n{pages}-page form, {document_extraction.DOC_WORKERS} workers:")
+    for label, (seconds, jobs, engine) in results.items():
+        print(f"  {label:<14} {seconds * 1000:8.1f} ms  ({jobs} jobs, {engine})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cvs", type=int, default=30)
+    parser.add_argument("--forms", type=int, default=30)
+    parser.add_argument("--workers", type=int, help="DOC_WORKERS for the split test")
+    parser.add_argument("--split-pages", type=int, default=120)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    if args.workers:
+        os.environ["DOC_WORKERS"] = str(args.workers)
+
+    engine_table(corpus(args.cvs, args.forms))
+    asyncio.run(split_vs_single(args.split_pages, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Budgeted page reading: the old read_pdf loop (PyPDF2, `text += page + "\n"`
+over every page) vs. iter_pdf_pages reading the whole document and reading
+only until a token budget is filled.
+
+    python benchmarks/pdf_page_budget.py --pages 200 --max-tokens 8000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back.document_extraction import iter_pdf_pages  # noqa: E402
+from back.tokens import TOKEN_COUNTER  # noqa: E402
+from pdf_corpus import make_guide  # noqa: E402
+
+
+def legacy_read(data: bytes) -> str:
+    import PyPDF2
+
+    text = ""
+    for page in PyPDF2.PdfReader(io.BytesIO(data)).pages:
+        text += page.extract_text() + "\n"
+    return text
+
+
+def run(pages: int, max_tokens: int, repeats: int) -> None:
+    data, _ = make_guide(pages, seed=5)
+    modes = {
+        "legacy read_pdf": lambda: [legacy_read(data)],
+        "iter_pdf_pages": lambda: [p["text"] for p in iter_pdf_pages(data, last=pages)],
+        f"budget {max_tokens} tok": lambda: [p["text"] for p in iter_pdf_pages(data, last=pages, max_tokens=max_tokens)],
+    }
+
+    print(f"{pages}-page guide ({len(data) / 1024:.0f} KB), tokens counted with {TOKEN_COUNTER}")
+    print(f"{'mode':<22}{'pages read':>11}{'text KB':>9}{'ms':>9}{'pages/s':>9}")
+    for label, read in modes.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            texts = read()
+        seconds = (time.perf_counter() - start) / repeats
+        read_pages = pages if label.startswith("legacy") else len(texts)
+        text_kb = sum(len(t.encode("utf-8")) for t in texts) / 1024
+        print(f"{label:<22}{read_pages:>11}{text_kb:>9.0f}{seconds * 1000:>9.1f}{read_pages / seconds:>9.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=8000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run(args.pages, args.max_tokens, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Form rasterization for the Vision prompt: the old renderer (page 0 only, 2x
+zoom, RGB PNG) vs. back.rasterize (adaptive DPI, grayscale JPEG/WebP, cropped
+margins, several pages), per page, on A4 and large-format forms.
+
+    python benchmarks/pdf_rasterization.py --forms 10
+    RASTER_FORMAT=webp python benchmarks/pdf_rasterization.py
+"""
+import argparse
+import os
+import sys
+import time
+
+from reportlab.lib.pagesizes import A2, A3, A4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back import rasterize  # noqa: E402
+from pdf_corpus import make_form  # noqa: E402
+
+import fitz  # noqa: E402
+
+
+def legacy(data: bytes) -> dict:
+    start = time.perf_counter()
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        png = doc[0].get_pixmap(matrix=fitz.Matrix(2.0, 2.0)).tobytes("png")
+    return {"bytes": len(png), "ms": (time.perf_counter() - start) * 1000, "pages": 1}
+
+
+def adaptive(data: bytes) -> dict:
+    start = time.perf_counter()
+    images = rasterize.render_pages(data)["images"]
+    return {
+        "bytes": sum(i["bytes"] for i in images),
+        "ms": (time.perf_counter() - start) * 1000,
+        "pages": len(images),
+        "dpi": images[0]["dpi"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--forms", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=4)
+    args = parser.parse_args()
+
+    print(
+        f"format {rasterize.output_format()}, quality {rasterize.RASTER_QUALITY}, "
+        f"budget {rasterize.RASTER_PIXEL_BUDGET} px, up to {rasterize.RASTER_MAX_PAGES} pages\n"
+    )
+    print(f"{'paper':<6}{'old KB/pg':>10}{'old ms/pg':>10}{'new KB/pg':>10}{'new ms/pg':>10}{'dpi':>5}{'pages sent':>12}{'saved/pg':>10}")
+    for paper, size in (("A4", A4), ("A3", A3), ("A2", A2)):
+        docs = [make_form(args.pages, seed=i, pagesize=size) for i in range(args.forms)]
+        old = [legacy(d) for d in docs]
+        new = [adaptive(d) for d in docs]
+        old_kb = sum(r["bytes"] for r in old) / sum(r["pages"] for r in old) / 1024
+        old_ms = sum(r["ms"] for r in old) / sum(r["pages"] for r in old)
+        new_pages = sum(r["pages"] for r in new)
+        new_kb = sum(r["bytes"] for r in new) / new_pages / 1024
+        new_ms = sum(r["ms"] for r in new) / new_pages
+        print(
+            f"{paper:<6}{old_kb:>10.0f}{old_ms:>10.1f}{new_kb:>10.0f}{new_ms:>10.1f}{new[0]['dpi']:>5}"
+            f"{new_pages / len(new):>9.1f}/{args.pages}{(1 - new_kb / old_kb) * 100:>9.0f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Renders per second of the shared PDF renderer, for resumes and filled forms:
+building fonts and styles on every call (what the old per-request functions
+did) vs. the preinitialized renderer, then concurrent renders through the
+thread pool with the event-loop stall they cause.
+
+    python benchmarks/pdf_rendering.py --renders 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back import pdf_rendering  # noqa: E402
+from concurrent_pdf_uploads import heartbeat  # noqa: E402
+
+RESUME = "\n".join(
+    ["# Jane Doe", "Bratislava | jane@example.com | +421 900 000 000", ""]
+    + [
+        line
+        for section in ("Experience", "Projects", "Education", "Skills")
+        for line in [f"## {section}"] + [f"- Delivered item {i} for the {section.lower()} section" for i in range(8)] + [""]
+    ]
+    + ["| Language | Level |", "| English | C1 |", "| German | B2 |", "| Slovak | A2 |"]
+)
+FORM = "\n".join(
+    ["# APPLICATION FOR TEMPORARY RESIDENCE", "## Part 1 - Applicant"]
+    + [f"{field}: value {i}" for i, field in enumerate(["Surname", "Given names", "Date of birth", "Nationality"] * 6)]
+)
+
+
+def per_second(fn, text: str, renders: int) -> float:
+    fn(text, io.BytesIO())
+    start = time.perf_counter()
+    for _ in range(renders):
+        fn(text, io.BytesIO())
+    return renders / (time.perf_counter() - start)
+
+
+async def concurrent(renders: int, concurrency: int) -> dict:
+    stop = asyncio.Event()
+    lags: list = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with sem:
+            if i % 2:
+                await pdf_rendering.render_form(FORM)
+            else:
+                await pdf_rendering.render_resume(RESUME)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(renders)))
+    wall = time.perf_counter() - start
+    stop.set()
+    await beat
+    pdf_rendering.shutdown()
+    return {"per_second": renders / wall, "max_lag_ms": max(lags) * 1000 if lags else wall * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    renderer = pdf_rendering.get_renderer()
+    print(f"{'document':<8}{'setup per call/s':>18}{'preinitialized/s':>18}")
+    for kind, text in (("resume", RESUME), ("form", FORM)):
+        cold = per_second(lambda t, out: getattr(pdf_rendering.PdfRenderer(), kind)(t, out), text, args.renders)
+        warm = per_second(getattr(renderer, kind), text, args.renders)
+        print(f"{kind:<8}{cold:>18.1f}{warm:>18.1f}")
+
+    result = asyncio.run(concurrent(args.renders, args.concurrency))
+    print(
+        f"\nthread pool ({pdf_rendering.PDF_RENDER_WORKERS} workers, {args.concurrency} in flight, mixed): "
+        f"{result['per_second']:.1f} renders/s, max loop stall {result['max_lag_ms']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Chunked BM25 retrieval for /docs/chat-with-pdf vs. pasting the whole
+document: prompt tokens per question, whether the chunks include a page on
+the topic asked about, index build time and cached query time.
+
+    python benchmarks/pdf_retrieval.py --pages 80 --questions 40
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back import doc_retrieval, document_extraction  # noqa: E402
+from pdf_corpus import GUIDE_TOPICS, make_guide  # noqa: E402
+
+QUESTIONS = {
+    "residence": "What do I need for a temporary residence permit?",
+    "employment": "How does the employer get an employment permit from the labour office?",
+    "insurance": "When must health insurance be arranged?",
+    "family": "Can my spouse and children join me through family reunification?",
+    "students": "How many hours per week may university students work?",
+    "fees": "How are the administrative fees paid, revenue stamps or transfer?",
+    "registration": "How many days after arrival must I register with the foreign police?",
+    "renewal": "When is the deadline to file a renewal of my permit?",
+}
+
+
+async def run(pages: int, questions: int) -> None:
+    data, page_topics = make_guide(pages, seed=3)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+        path = f.name
+    try:
+        start = time.perf_counter()
+        first = await doc_retrieval.retrieve_context(path, QUESTIONS["residence"])
+        cold = time.perf_counter() - start
+
+        rng = random.Random(1)
+        hits, context_tokens, warm = 0, 0, 0.0
+        for _ in range(questions):
+            topic = rng.choice(list(GUIDE_TOPICS))
+            start = time.perf_counter()
+            result = await doc_retrieval.retrieve_context(path, QUESTIONS[topic])
+            warm += time.perf_counter() - start
+            hits += any(page_topics[p - 1] == topic for p in result["pages"])
+            context_tokens += result["context_tokens"]
+    finally:
+        os.unlink(path)
+        document_extraction.shutdown()
+
+    print(f"{pages}-page guide, {first['total_chunks']} chunks, top {doc_retrieval.RETRIEVAL_TOP_K}, "
+          f"tokens counted with {doc_retrieval.retrieval_stats()['token_counter']}")
+    print(f"  whole document   {first['document_tokens']:>8} tokens per question")
+    print(f"  retrieved chunks {context_tokens / questions:>8.0f} tokens per question "
+          f"({(1 - context_tokens / questions / first['document_tokens']) * 100:.0f}% saved)")
+    print(f"  on-topic page among retrieved chunks: {hits}/{questions}")
+    print(f"  first question (extract + index) {cold * 1000:.0f} ms, cached index {warm / questions * 1000:.2f} ms/question")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=80)
+    parser.add_argument("--questions", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(run(args.pages, args.questions))
+
+
+if __name__ == "__main__":
+    main()
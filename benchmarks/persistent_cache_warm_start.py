@@ -0,0 +1,68 @@
+"""
+Cold vs. warm start of a location-answer cache, with and without the
+SQLite tier. A "restart" is simulated by building a fresh in-memory
+TTLCache over the same database file.
+
+    python benchmarks/persistent_cache_warm_start.py --keys 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back.cache import TTLCache  # noqa: E402
+from back.persistent_cache import PersistentCache  # noqa: E402
+
+SAMPLE = {
+    "country_code": "sk",
+    "country_name": "Slovakia",
+    "city": "Kosice",
+    "sites": [{"name": f"Site {i}", "url": f"https://example.com/{i}", "description": "x" * 80} for i in range(8)],
+}
+
+
+async def fake_llm(latency: float) -> dict:
+    await asyncio.sleep(latency)
+    return dict(SAMPLE)
+
+
+async def serve_all(cache: TTLCache, keys, latency: float) -> tuple:
+    upstream = 0
+    start = time.perf_counter()
+    for key in keys:
+        if cache.get(key) is None:
+            upstream += 1
+            cache.set(key, await fake_llm(latency))
+    return time.perf_counter() - start, upstream
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    keys = [f"sk:city{i}:en" for i in range(args.keys)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PersistentCache(os.path.join(tmp, "cache.db"))
+
+        for label, use_store in (("memory only", False), ("memory+sqlite", True)):
+            kwargs = {"persistent_ttl": 3600, "store": store} if use_store else {}
+            namespace = "bench_" + label.replace(" ", "_").replace("+", "_")
+            cold, cold_calls = await serve_all(TTLCache(namespace, ttl=3600, max_entries=None, **kwargs), keys, args.latency)
+            store.flush()  # writes are queued for a background thread
+            restarted = TTLCache(namespace, ttl=3600, max_entries=None, **kwargs)
+            warm, warm_calls = await serve_all(restarted, keys, args.latency)
+            print(
+                f"{label:<14} cold={cold:.2f}s ({cold_calls} upstream)  "
+                f"after restart={warm:.3f}s ({warm_calls} upstream)"
+            )
+        store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Repeat /api/fill_form requests for the same few templates, through an app
+restart: the first request for a template sends it whole (and learns its field
+labels), later ones send the field list only, and the registry file keeps that
+across the restart. Reports the path taken, characters sent to the model and
+latency per request, and the registry's reuse rate from /api/metrics.
+
+    python benchmarks/template_registry.py --templates 3 --repeats 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load_suite import PASSPORT_TEXT, start_servers  # noqa: E402
+from pdf_corpus import make_fillable_form, make_form  # noqa: E402
+
+
+def templates(count: int) -> list:
+    # flat PDFs (text), a plain-text form and a fillable PDF, cycled
+    out = []
+    for i in range(count):
+        if i % 3 == 0:
+            out.append((f"flat{i}.pdf", make_form(1, seed=i), "application/pdf"))
+        elif i % 3 == 1:
+            text = "RESIDENCE REGISTRATION\nSurname: ____\nGiven names: ____\nDate of birth: ____\nPhone: ____\n"
+            out.append((f"form{i}.txt", f"{text}Form number {i}\n".encode(), "text/plain"))
+        else:
+            out.append((f"fillable{i}.pdf", make_fillable_form(1, seed=i), "application/pdf"))
+    return out
+
+
+def session(args, forms: list, label: str, rows: dict) -> dict:
+    procs = start_servers(args)
+    stub = f"http://127.0.0.1:{args.stub_port}"
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.app_port}", timeout=120.0) as client:
+            for round_ in range(args.repeats):
+                for name, data, mime in forms:
+                    before = httpx.get(f"{stub}/stub/stats").json().get("prompt_chars", 0)
+                    files = {
+                        "template_file": (name, data, mime),
+                        "user_document_file": ("passport.txt", f"{PASSPORT_TEXT}No. {label}{round_}\n".encode(), "text/plain"),
+                    }
+                    start = time.perf_counter()
+                    resp = client.post("/api/fill_form", files=files, data={"language": "en"})
+                    elapsed = time.perf_counter() - start
+                    resp.raise_for_status()
+                    sent = httpx.get(f"{stub}/stub/stats").json().get("prompt_chars", 0) - before
+                    key = (label, "first" if round_ == 0 else "repeat", resp.headers.get("x-fill-mode", "?"))
+                    rows[key].append((sent, elapsed))
+            return client.get("/api/metrics").json()["data"]["template_registry"]
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=4)
+    parser.add_argument("--latency", default="fixed:0.3", help="stub chat latency distribution")
+    parser.add_argument("--audio-latency", default="fixed:0.8")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    args = parser.parse_args()
+    args.traffic = None
+
+    forms = templates(args.templates)
+    rows = defaultdict(list)
+    with tempfile.TemporaryDirectory() as tmp:
+        # persistence is opt-in; the restart half of the run needs it
+        os.environ["TEMPLATE_REGISTRY_DB"] = os.path.join(tmp, "templates.db")
+        stats = [session(args, forms, label, rows) for label in ("start", "restart")]
+
+    print(f"{len(forms)} templates x {args.repeats} requests, app restarted once")
+    print(f"{'session':<9}{'request':<8}{'path':<10}{'n':>4}{'prompt ch':>11}{'median ms':>11}")
+    for (label, which, mode), values in rows.items():
+        print(
+            f"{label:<9}{which:<8}{mode:<10}{len(values):>4}{statistics.mean(v[0] for v in values):>11.0f}"
+            f"{statistics.median(v[1] for v in values) * 1000:>11.0f}"
+        )
+    for label, s in zip(("start", "restart"), stats):
+        print(
+            f"registry after {label}: reuse rate {s['reuse_rate']:.0%} ({s['known']}/{s['lookups']}), "
+            f"registered {s['registered']}, schemas learned {s['schemas_learned']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
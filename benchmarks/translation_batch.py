@@ -0,0 +1,72 @@
+"""
+A maximum-size /translation/batch request (500 unique segments x 10 targets)
+against an idle app: it must be admitted by the model's gate and come back
+complete. Starts the app and the OpenAI stub like load_suite and reports the
+model calls, latency and what the admission gate saw. Exits non-zero if the
+batch is rejected or comes back with missing translations.
+
+    python benchmarks/translation_batch.py --latency fixed:0.5
+"""
+import argparse
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back.translation_api import BATCH_MAX_SEGMENTS, BATCH_MAX_TARGETS, BATCH_MODEL  # noqa: E402
+from load_suite import start_servers  # noqa: E402
+
+LANGUAGES = ["de", "fr", "es", "it", "pl", "cs", "hu", "uk", "ru", "tr", "ar", "zh"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, default=BATCH_MAX_SEGMENTS)
+    parser.add_argument("--targets", type=int, default=BATCH_MAX_TARGETS)
+    parser.add_argument("--latency", default="fixed:0.5", help="stub chat latency distribution")
+    parser.add_argument("--audio-latency", default="fixed:0.8")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    args = parser.parse_args()
+    args.traffic = None
+
+    segments = [f"Segment {i}: please bring your passport and the filled form {i} to the office." for i in range(args.segments)]
+    targets = LANGUAGES[: args.targets]
+    procs = start_servers(args)
+    stub = f"http://127.0.0.1:{args.stub_port}"
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.app_port}", timeout=300.0) as client:
+            before = httpx.get(f"{stub}/stub/stats").json().get("chat_completions", 0)
+            start = time.perf_counter()
+            resp = client.post(
+                "/translation/batch",
+                json={"segments": segments, "source_language": "en", "target_languages": targets},
+            )
+            elapsed = time.perf_counter() - start
+            calls = httpx.get(f"{stub}/stub/stats").json().get("chat_completions", 0) - before
+            gate = client.get("/api/metrics").json()["data"]["admission"].get(BATCH_MODEL, {})
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print(f"{args.segments} segments x {len(targets)} targets, stub latency {args.latency}")
+    print(f"status {resp.status_code} in {elapsed * 1000:.0f} ms, {calls} model calls")
+    print(
+        f"gate {BATCH_MODEL}: admitted {gate.get('admitted', 0)}, "
+        f"rejected {gate.get('rejected_queue_full', 0)} (queue full) + {gate.get('rejected_timeout', 0)} (timeout), "
+        f"max wait {gate.get('wait_ms_max', 0.0):.0f} ms"
+    )
+    if resp.status_code != 200:
+        sys.exit(f"batch rejected: {resp.text[:200]}")
+    missing = sum(1 for row in resp.json()["results"] for text in row["translations"].values() if not text)
+    if missing:
+        sys.exit(f"{missing} translations missing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Python heap allocated while taking in one upload: `await file.read()` (the old
+handlers) vs. ingest_upload + view(). Uploads above the 1 MB spool threshold
+are on disk by the time the handler runs. read() copies them back into memory,
+while view() maps the spool file.
+
+    python benchmarks/upload_memory.py --sizes 0.5 4 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tracemalloc
+from tempfile import SpooledTemporaryFile
+
+from starlette.datastructures import UploadFile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back.uploads import ingest_upload  # noqa: E402
+
+
+def spooled(size: int) -> UploadFile:
+    f = SpooledTemporaryFile(max_size=1024 * 1024)
+    f.write(os.urandom(size))
+    f.seek(0)
+    return UploadFile(f, filename="upload.pdf")
+
+
+async def read_all(upload: UploadFile) -> int:
+    data = await upload.read()
+    return len(data)
+
+
+async def ingest(upload: UploadFile) -> int:
+    view = (await ingest_upload(upload, 1 << 40)).view()
+    return len(view)
+
+
+async def peak(consume, size: int) -> float:
+    upload = spooled(size)
+    tracemalloc.start()
+    await consume(upload)
+    _, top = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await upload.close()
+    return top / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.5, 4, 10], help="upload sizes in MB")
+    args = parser.parse_args()
+
+    print(f"{'upload MB':>10}{'read() MB':>12}{'ingest MB':>12}")
+    for mb in args.sizes:
+        size = int(mb * 1024 * 1024)
+        old = asyncio.run(peak(read_all, size))
+        new = asyncio.run(peak(ingest, size))
+        print(f"{mb:>10.1f}{old:>12.2f}{new:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,20 @@ from back.housing_backend import router as housing_router
 from back.registration_routes import router as registration_router
 from back.banking_routes import router as banking_router
 from back.banking_backend import router as banking_backend_router
+from back.metrics_routes import router as metrics_router
+from back.llm_gateway import aclose as close_llm_gateway
+from back.document_extraction import shutdown as shutdown_document_workers
+from back.geocoding import aclose as close_geocoding
+from back.offline_geocoder import get_offline_geocoder
+from back.ip_geolocation import get_ip_database
+from back.pdf_rendering import get_renderer as get_pdf_renderer, shutdown as shutdown_pdf_rendering
+from back.uploads import (
+    MULTIPART_OVERHEAD,
+    UPLOAD_MAX_AUDIO_BYTES,
+    UPLOAD_MAX_CV_BYTES,
+    UPLOAD_MAX_FORM_BYTES,
+    UploadLimitMiddleware,
+)
 
 
 app = FastAPI()
@@ -121,6 +135,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/api/fill_form": 2 * UPLOAD_MAX_FORM_BYTES + MULTIPART_OVERHEAD,
+        "/neurohr-api/analyze": UPLOAD_MAX_CV_BYTES + MULTIPART_OVERHEAD,
+        "/translation/voice": UPLOAD_MAX_AUDIO_BYTES + MULTIPART_OVERHEAD,
+    },
+)
 
 app.include_router(work_router, prefix="/work")
 app.include_router(docs_router, prefix="/docs")
@@ -136,6 +158,22 @@ app.include_router(offices_router, prefix="/api")
 app.include_router(registration_router)
 app.include_router(banking_router)
 app.include_router(banking_backend_router)
+app.include_router(metrics_router, prefix="/api")
+
+
+@app.on_event("startup")
+async def startup():
+    get_offline_geocoder()
+    get_ip_database()
+    get_pdf_renderer()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_llm_gateway()
+    await close_geocoding()
+    shutdown_document_workers()
+    shutdown_pdf_rendering()
 
 
 if __name__ == "__main__":